@@ -0,0 +1,86 @@
+"""Command-line tools that work directly on the configured storage backend.
+
+    python -m app.cli import-users students.csv --format csv
+    python -m app.cli export enrollments --gzip -o enrollments.ndjson.gz
+
+Storage is chosen by the same ``APP_*`` variables as the API. With the
+memory backend, set ``APP_WAL_PATH`` or ``APP_SNAPSHOT_PATH`` (or use
+``APP_STORAGE_BACKEND=sqlite``) so the imported users outlive the command.
+"""
+import argparse
+import json
+import sys
+
+from app.core.db import get_storage
+from app.core.streaming import iter_line_chunks
+from app.schemas.user import ImportFormat
+from app.services.export import ExportService, ExportTable
+from app.services.user import DEFAULT_IMPORT_CHUNK_SIZE, MAX_IMPORT_LINE_BYTES, UserImporter
+
+READ_SIZE = 64 * 1024
+
+
+def _read_blocks(stream):
+    while True:
+        block = stream.read(READ_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def import_users(args) -> int:
+    """Stream a file into ``UserImporter`` and print its events as NDJSON."""
+    importer = UserImporter(ImportFormat(args.format))
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        for lines in iter_line_chunks(_read_blocks(source), args.chunk_size, MAX_IMPORT_LINE_BYTES):
+            for event in importer.feed(lines):
+                if event["event"] == "error" or args.progress:
+                    print(json.dumps(event), flush=True)
+            if importer.aborted:
+                break
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(json.dumps(importer.summary()), flush=True)
+    return 1 if importer.aborted else 0
+
+
+def export(args) -> int:
+    """Write a table as NDJSON (optionally gzipped) to a file or stdout."""
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in ExportService.export_table(ExportTable(args.table), args.gzip):
+            target.write(chunk)
+    finally:
+        if target is sys.stdout.buffer:
+            target.flush()
+        else:
+            target.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import-users", help="bulk import users from an NDJSON or CSV file")
+    importer.add_argument("path", help="input file, or - for stdin")
+    importer.add_argument("--format", choices=[f.value for f in ImportFormat], default=ImportFormat.NDJSON.value)
+    importer.add_argument("--chunk-size", type=int, default=DEFAULT_IMPORT_CHUNK_SIZE)
+    importer.add_argument("--progress", action="store_true", help="also print a progress event per chunk")
+    importer.set_defaults(run=import_users)
+    exporter = commands.add_parser("export", help="dump a table as NDJSON")
+    exporter.add_argument("table", choices=[t.value for t in ExportTable])
+    exporter.add_argument("-o", "--output", default="-", help="output file, or - for stdout (default)")
+    exporter.add_argument("--gzip", action="store_true", help="gzip the output")
+    exporter.set_defaults(run=export)
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    finally:
+        # Flush the write-ahead log / take the final snapshot
+        get_storage().close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
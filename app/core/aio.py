@@ -0,0 +1,39 @@
+"""Running the synchronous service layer from async request handlers.
+
+The memory backend answers reads from dicts and lists without blocking, so
+there is nothing to gain from sending them to the threadpool: ``read`` calls
+them inline on the event loop. SQLite reads block on disk and connection
+locks, and every write may wait on striped locks, a write-ahead-log fsync or
+a SQLite transaction, so those go through ``run_in_threadpool``.
+
+Profiling a request does not change where its calls run: in a profiled
+request, threadpool calls are profiled in their worker thread
+(``app.core.profiling``).
+"""
+from typing import Callable, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.db import get_storage
+from app.core.profiling import profile_call, request_profilers
+
+T = TypeVar("T")
+
+
+async def read(fn: Callable[..., T], *args) -> T:
+    """Run a read-only service call, inline when the storage backend never blocks on reads."""
+    if get_storage().inline_reads:
+        return fn(*args)
+    return await _in_threadpool(fn, *args)
+
+
+async def write(fn: Callable[..., T], *args) -> T:
+    """Run a service call that writes, off the event loop."""
+    return await _in_threadpool(fn, *args)
+
+
+async def _in_threadpool(fn: Callable[..., T], *args) -> T:
+    profilers = request_profilers.get()
+    if profilers is None:
+        return await run_in_threadpool(fn, *args)
+    return await run_in_threadpool(profile_call, profilers, fn, *args)
@@ -0,0 +1,94 @@
+"""A bounded in-process cache of rendered response bodies.
+
+Each entry is stored together with the validator of the data it was rendered
+from (the ETag from ``app.core.versions``) and is only served while that
+validator is still current. A write therefore invalidates exactly the entries
+built from what it changed, the moment it bumps their version, and a reader
+that rendered stale data just before a write can only store an entry that is
+already invalid. Entries also expire after a TTL and the least recently used
+ones are evicted once the cache is full.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    headers: dict
+    # Extra data needed to serve the entry, e.g. the access level to check
+    meta: object = None
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (validator, expires at, CachedBody)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable, validator: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != validator:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, validator: str, value: CachedBody) -> CachedBody:
+        if not self.enabled:
+            return value
+        with self._lock:
+            self._entries[key] = (validator, self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def discard(self, key: Hashable):
+        """Drop an entry known to be stale now rather than when it is next read."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
@@ -0,0 +1,121 @@
+"""A global, compacted change sequence behind ``GET /changes``.
+
+The services record every create, update and delete of a user, course or
+enrollment as a ``(entity, id)`` key stamped with the next sequence number.
+Only the newest change of each record is kept: recording a key again
+supersedes its earlier entry. An entry holds no data; the feed looks the
+record up when it is read, so a consumer gets the record as it is now, or a
+tombstone if it has been deleted. Records written concurrently may therefore
+be reported in either order, but the last change of a record is always
+reported after its last write.
+
+The log holds at most ``max_entries`` records; once full, the oldest are
+dropped and the log's ``floor`` moves past them. A consumer asking for the
+changes since a sequence below the floor may have missed some and must
+resync from the full listings. The first sequence of a log is the
+microsecond clock when it starts, so sequences keep increasing across
+restarts, and a consumer from before a restart lands below the new floor
+instead of silently skipping the changes it never saw.
+
+Like ``app.core.versions``, the log lives in this process; with SQLite shared
+by several processes, each process reports only its own writes.
+"""
+import threading
+import time
+from bisect import bisect_right
+from typing import NamedTuple
+
+from app.core.config import settings
+
+
+class ChangesExpired(Exception):
+    """The changes since the requested sequence are no longer all retained."""
+
+
+class ChangeBatch(NamedTuple):
+    # (seq, key) of each change, in sequence order
+    changes: list
+    # Sequence to ask for the next batch from
+    next_since: int
+    has_more: bool
+
+
+class ChangeLog:
+
+    def __init__(self, max_entries: int, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._start(-1)
+
+    def _start(self, previous_head: int):
+        # Never below a sequence already handed out, however the clock moves
+        self.head = self.floor = max(int(self._clock() * 1_000_000), previous_head + 1)
+        self._latest = {}  # key -> seq of its newest change
+        # Every change in sequence order; superseded ones are skipped and compacted away
+        self._seqs = []
+        self._keys = []
+        self._offset = 0  # changes before this index have been dropped
+
+    def record(self, entity: str, *ids: int):
+        """Stamp each ``(entity, id)`` with the next sequence number."""
+        with self._lock:
+            latest, seqs, keys = self._latest, self._seqs, self._keys
+            for record_id in ids:
+                self.head += 1
+                key = (entity, record_id)
+                latest[key] = self.head
+                seqs.append(self.head)
+                keys.append(key)
+            self._drop_oldest()
+            # Superseded and dropped changes may take at most as much room as the current ones
+            if len(seqs) > 2 * len(latest) + 64:
+                self._compact()
+
+    def _drop_oldest(self):
+        latest, seqs, keys = self._latest, self._seqs, self._keys
+        while len(latest) > self.max_entries:
+            seq, key = seqs[self._offset], keys[self._offset]
+            self._offset += 1
+            if latest.get(key) == seq:
+                del latest[key]
+                self.floor = seq
+
+    def _compact(self):
+        """Rewrite the log with only its current entries."""
+        live = [(seq, key) for seq, key in zip(self._seqs[self._offset:], self._keys[self._offset:])
+                if self._latest.get(key) == seq]
+        self._seqs = [seq for seq, _ in live]
+        self._keys = [key for _, key in live]
+        self._offset = 0
+
+    def since(self, since: int, limit: int) -> ChangeBatch:
+        """Up to ``limit`` (at least 1) current changes after ``since``, oldest first.
+
+        Raises ``ChangesExpired`` if changes after ``since`` have been dropped,
+        or ``since`` is not a sequence of this log.
+        """
+        with self._lock:
+            if since < self.floor or since > self.head:
+                raise ChangesExpired(since)
+            latest, seqs, keys = self._latest, self._seqs, self._keys
+            found = []
+            for index in range(bisect_right(seqs, since, self._offset), len(seqs)):
+                seq, key = seqs[index], keys[index]
+                if latest.get(key) != seq:
+                    continue
+                if len(found) == limit:
+                    return ChangeBatch(found, found[-1][0], True)
+                found.append((seq, key))
+            return ChangeBatch(found, self.head, False)
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def reset(self):
+        """Forget every change and start the sequence again from the clock."""
+        with self._lock:
+            self._start(self.head)
+
+
+changes = ChangeLog(settings.change_log_size)
@@ -0,0 +1,66 @@
+"""Runtime configuration, read from environment variables."""
+import os
+from dataclasses import dataclass
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(f"APP_{name}", default)
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Storage backend: "memory" (process-local dicts) or "sqlite".
+    storage_backend: str = "memory"
+    sqlite_path: str = "course_enrollment.db"
+    sqlite_pool_size: int = 4
+    # How the memory backend stores enrollments: "dict" (one model per row) or "columnar" (typed arrays).
+    enrollment_table: str = "dict"
+    # Write-ahead log for the memory backend; an empty path disables it.
+    wal_path: str = ""
+    wal_fsync: str = "group"
+    wal_group_commit_ms: float = 0.0
+    wal_fsync_interval_ms: float = 10.0
+    # Snapshots of the memory backend, loaded on startup; an empty path disables them.
+    snapshot_path: str = ""
+    snapshot_interval_s: float = 300.0
+    # Rendered course responses kept in process; a size of 0 disables the cache.
+    course_cache_size: int = 10000
+    course_cache_ttl_s: float = 60.0
+    # Records whose latest change is kept for GET /changes.
+    change_log_size: int = 100000
+    # Request and service metrics served at /metrics; "0" turns recording off.
+    metrics_enabled: bool = True
+    # Per-request profiles (pstats files) are written here; an empty path disables profiling.
+    profile_dir: str = ""
+    # Fraction of requests profiled at random, on top of those sending X-Profile with the token.
+    profile_sample_rate: float = 0.0
+    # Secret an admin sends in the X-Profile header to profile a request; empty disables the header.
+    profile_token: str = ""
+    # Most recent profiles kept; older files are deleted.
+    profile_keep: int = 50
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            storage_backend=_env("STORAGE_BACKEND", cls.storage_backend),
+            sqlite_path=_env("SQLITE_PATH", cls.sqlite_path),
+            sqlite_pool_size=int(_env("SQLITE_POOL_SIZE", str(cls.sqlite_pool_size))),
+            enrollment_table=_env("ENROLLMENT_TABLE", cls.enrollment_table),
+            wal_path=_env("WAL_PATH", cls.wal_path),
+            wal_fsync=_env("WAL_FSYNC", cls.wal_fsync),
+            wal_group_commit_ms=float(_env("WAL_GROUP_COMMIT_MS", str(cls.wal_group_commit_ms))),
+            wal_fsync_interval_ms=float(_env("WAL_FSYNC_INTERVAL_MS", str(cls.wal_fsync_interval_ms))),
+            snapshot_path=_env("SNAPSHOT_PATH", cls.snapshot_path),
+            snapshot_interval_s=float(_env("SNAPSHOT_INTERVAL_S", str(cls.snapshot_interval_s))),
+            course_cache_size=int(_env("COURSE_CACHE_SIZE", str(cls.course_cache_size))),
+            course_cache_ttl_s=float(_env("COURSE_CACHE_TTL_S", str(cls.course_cache_ttl_s))),
+            change_log_size=int(_env("CHANGE_LOG_SIZE", str(cls.change_log_size))),
+            metrics_enabled=_env("METRICS", "1") != "0",
+            profile_dir=_env("PROFILE_DIR", cls.profile_dir),
+            profile_sample_rate=float(_env("PROFILE_SAMPLE_RATE", str(cls.profile_sample_rate))),
+            profile_token=_env("PROFILE_TOKEN", cls.profile_token),
+            profile_keep=int(_env("PROFILE_KEEP", str(cls.profile_keep))),
+        )
+
+
+settings = Settings.from_env()
@@ -1,3 +1,25 @@
-user = {}
-course = {}
-enrollment = {}
\ No newline at end of file
+"""The storage backend the services read from and write to."""
+from app.core.changes import changes
+from app.core.config import settings
+from app.core.storage import Storage, create_storage
+from app.core.versions import versions
+
+_storage = create_storage(settings)
+
+
+def get_storage() -> Storage:
+    return _storage
+
+
+def set_storage(storage: Storage) -> Storage:
+    """Swap the active backend and return the previous one."""
+    global _storage
+    previous, _storage = _storage, storage
+    return previous
+
+
+def reset():
+    """Clear every table together with its indexes."""
+    _storage.clear()
+    versions.reset()
+    changes.reset()
@@ -0,0 +1,50 @@
+"""Striped locks that make multi-step service operations atomic per record.
+
+Each storage call is atomic on its own, but an operation such as "check the
+user and course exist, then insert the enrollment" is several calls. Those
+operations hold the stripes of the records they depend on, and the writes
+that would invalidate them (deleting that user or course, updating that
+course) hold the same stripes, so the two can no longer interleave. Unrelated
+records almost always map to different stripes and proceed in parallel.
+
+Stripes are plain (non-reentrant) locks, taken in index order so two
+operations over overlapping keys cannot deadlock. Reads never take them.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterable, Iterator
+
+DEFAULT_STRIPES = 64
+
+
+class StripedLock:
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripes(self, keys: Iterable[Hashable]) -> list[threading.Lock]:
+        count = len(self._locks)
+        return [self._locks[i] for i in sorted({hash(key) % count for key in keys})]
+
+    @contextmanager
+    def holding(self, *keys: Hashable) -> Iterator[None]:
+        """Hold the stripes of every key for the duration of the block."""
+        locks = self._stripes(keys)
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+record_locks = StripedLock()
+
+
+def user_key(user_id: int) -> tuple:
+    return ("user", user_id)
+
+
+def course_key(course_id: int) -> tuple:
+    return ("course", course_id)
@@ -0,0 +1,70 @@
+"""Keyset pagination for the list endpoints.
+
+A cursor is the id of the last row of the previous page, bound to the
+listing it came from and encoded so clients treat it as opaque. The next
+page is "ids greater than that", which every repository answers with a seek
+into an id-ordered index instead of skipping rows, so deep pages cost no
+more than the first, and rows inserted or deleted between requests never
+shift a page boundary: nothing is skipped or repeated.
+
+Endpoints keep returning a plain JSON list; the cursor for the next page, if
+there is one, is sent in the ``X-Next-Cursor`` header.
+"""
+import base64
+import binascii
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.storage import to_models
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Page size when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 100
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(scope: str, last_id: int) -> str:
+    raw = f"{scope}:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(scope: str, cursor: str) -> int:
+    """The last id a cursor points past; 400 if it is malformed or from another listing."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        cursor_scope, _, last_id = raw.rpartition(":")
+        if cursor_scope == scope:
+            return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor.")
+
+
+def paginate(scope: str, fetch: Callable, skip: int = 0, limit: Optional[int] = None,
+             cursor: Optional[str] = None, convert: Callable = to_models) -> Page:
+    """Fetch one page of records as models.
+
+    ``fetch(skip, limit, after)`` is a repository list method. One extra row
+    is fetched to tell whether another page follows. ``convert`` turns the
+    page's records into models.
+    """
+    after = None
+    if cursor is not None:
+        after = decode_cursor(scope, cursor)
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+    if limit is None:
+        return Page(convert(fetch(skip, None, after)))
+    records = fetch(skip, limit + 1, after)
+    if len(records) <= limit:
+        return Page(convert(records))
+    del records[limit:]
+    return Page(convert(records), encode_cursor(scope, records[-1].id))
@@ -0,0 +1,213 @@
+"""Opt-in profiling of single requests with cProfile.
+
+With ``APP_PROFILE_DIR`` set, ``ProfilingMiddleware`` profiles a request when
+it sends ``X-Profile: <APP_PROFILE_TOKEN>`` (the header is how an admin asks
+for one) or is drawn at ``APP_PROFILE_SAMPLE_RATE``. The whole request is
+profiled, from parsing and validating the body to serializing the response,
+and saved as a pstats file (``python -m pstats``, snakeviz, or flameprof for
+a flame graph). The response carries the profile's id in ``X-Profile-Id``,
+and ``GET /api/v1/profiles/`` lists the recent ones with their most
+expensive functions.
+
+cProfile only sees the thread it runs in, so the service calls a profiled
+request sends to the threadpool each run under a profiler of their own
+(``profile_call``), and the saved profile adds them to the request's. They
+stay off the event loop: a write waiting on a lock or an fsync would
+otherwise stall every other request, and the profile would measure that
+stall. Profiles are taken one at a time. Other requests interleaved on the
+event loop during a profiled one can show up in it.
+
+With ``APP_PROFILE_DIR`` empty the middleware is not installed; what is left
+on the request path is one context variable lookup per service call.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Functions listed per profile, by cumulative and by own time
+TOP_FUNCTIONS = 15
+
+# While the current request is profiled: its profiler, then one per threadpool call it made
+request_profilers: ContextVar[Optional[list]] = ContextVar("request_profilers", default=None)
+
+
+class ProfiledFunction(NamedTuple):
+    function: str
+    calls: int
+    total_ms: float
+    cumulative_ms: float
+
+
+class SavedProfile(NamedTuple):
+    id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    created_at: float
+    trigger: str
+    file: str
+    # Most expensive functions including what they call (where the time goes) ...
+    top: list
+    # ... and excluding it (what is slow in itself)
+    hotspots: list
+
+
+class ProfileStore:
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, token: str = "", keep: int = 50):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.keep = keep
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._saved = deque()
+        self._ids = itertools.count(1)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def trigger(self, scope) -> Optional[str]:
+        """Why this request should be profiled ("header" or "sample"), or ``None``."""
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    if hmac.compare_digest(value, self.token):
+                        return "header"
+                    break
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def begin(self) -> bool:
+        """Claim the profiler; ``False`` if another request holds it."""
+        return self._busy.acquire(blocking=False)
+
+    def end(self):
+        self._busy.release()
+
+    def next_id(self) -> str:
+        return f"{int(time.time())}-{next(self._ids)}"
+
+    def save(self, profile_id: str, profilers: list, scope, status: int, duration_s: float,
+             trigger: str) -> SavedProfile:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        combined = pstats.Stats(*profilers)
+        combined.dump_stats(path)
+        stats = combined.stats
+        saved = SavedProfile(
+            id=profile_id,
+            method=scope["method"],
+            path=scope["path"],
+            status=status,
+            duration_ms=round(duration_s * 1000, 3),
+            created_at=time.time(),
+            trigger=trigger,
+            file=path,
+            top=_ranked(stats, 3),
+            hotspots=_ranked(stats, 2))
+        with self._lock:
+            self._saved.append(saved)
+            while len(self._saved) > self.keep:
+                expired = self._saved.popleft()
+                try:
+                    os.remove(expired.file)
+                except FileNotFoundError:
+                    pass
+        return saved
+
+    def recent(self) -> list[SavedProfile]:
+        """The kept profiles, newest first."""
+        with self._lock:
+            return list(reversed(self._saved))
+
+    def get(self, profile_id: str) -> Optional[SavedProfile]:
+        with self._lock:
+            return next((saved for saved in self._saved if saved.id == profile_id), None)
+
+
+def _ranked(stats: dict, column: int) -> list[ProfiledFunction]:
+    """The ``TOP_FUNCTIONS`` entries of raw pstats data with the largest value in ``column``."""
+    ranked = sorted(stats.items(), key=lambda item: item[1][column], reverse=True)[:TOP_FUNCTIONS]
+    return [ProfiledFunction(
+        function=f"{function} ({os.path.basename(filename)}:{line})" if line else function,
+        calls=calls,
+        total_ms=round(total * 1000, 3),
+        cumulative_ms=round(cumulative * 1000, 3))
+        for (filename, line, function), (_, calls, total, cumulative, _) in ranked]
+
+
+def profile_call(profilers: list, fn, *args):
+    """Run ``fn`` under a profiler of its own, added to ``profilers``; for a request's threadpool calls."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ profiles every thread with one profiler, which already sees this call
+        return fn(*args)
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+profiles = ProfileStore(settings.profile_dir, settings.profile_sample_rate, settings.profile_token,
+                        settings.profile_keep)
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, app, store: ProfileStore = profiles):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        store = self.store
+        trigger = store.trigger(scope)
+        if trigger is None or not store.begin():
+            return await self.app(scope, receive, send)
+
+        profile_id = store.next_id()
+        response_status = 500
+
+        async def send_with_id(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        profilers = [profiler]
+        token = request_profilers.set(profilers)
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            request_profilers.reset(token)
+            try:
+                store.save(profile_id, profilers, scope, response_status, elapsed, trigger)
+            finally:
+                store.end()
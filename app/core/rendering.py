@@ -0,0 +1,51 @@
+"""JSON bodies for models that need no second validation.
+
+When a route returns a model, FastAPI validates it again against the
+route's ``response_model``, converts it to plain Python values and only then
+encodes it with ``json.dumps``. The models the services return are built
+from storage records, which were validated on the way in, so that pass
+costs several times the encoding and can never fail. Routes on the hot path
+return ``json_response(...)`` instead: a ``Response`` goes out as it is, and
+``response_model`` is left to document the body in the OpenAPI schema.
+
+Bodies are encoded with orjson when it is installed and with pydantic's
+own serializer otherwise; both give the same bytes as the ``response_model``
+path. Only models without aliases, computed fields or custom serializers
+may be rendered here, since orjson sees their fields as stored.
+"""
+from typing import Any, Optional
+
+import pydantic_core
+from fastapi import Response, status
+
+from app.core.pagination import NEXT_CURSOR_HEADER, Page
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _fields(value):
+    # Not isinstance(value, BaseModel): checking against pydantic's ABC metaclass costs more than the encoding
+    if hasattr(value, "__pydantic_fields_set__"):
+        return value.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def render_json(content: Any) -> bytes:
+    """Encode models (and lists, dicts and plain values holding them) as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_fields)
+    return pydantic_core.to_json(content)
+
+
+def json_response(content: Any, status_code: int = status.HTTP_200_OK,
+                  headers: Optional[dict] = None) -> Response:
+    return Response(render_json(content), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def page_response(page: Page) -> Response:
+    """One page of a listing, with the cursor for the next page in its header if there is one."""
+    headers = None if page.next_cursor is None else {NEXT_CURSOR_HEADER: page.next_cursor}
+    return json_response(page.items, headers=headers)
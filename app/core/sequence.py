@@ -0,0 +1,45 @@
+"""Monotonic id allocation for the in-memory tables."""
+import threading
+
+
+class IdSequence:
+    """Thread-safe, monotonic id allocator.
+
+    Ids are never reissued, even after the record holding them is deleted.
+    Bulk paths should call ``reserve`` once per batch instead of ``next_id``
+    per row so they take the lock a single time.
+    """
+
+    def __init__(self, start: int = 1):
+        self._lock = threading.Lock()
+        self._next = start
+
+    def next_id(self) -> int:
+        """Allocate a single id."""
+        with self._lock:
+            value = self._next
+            self._next += 1
+        return value
+
+    def reserve(self, count: int) -> range:
+        """Allocate ``count`` consecutive ids in one step."""
+        if count < 0:
+            raise ValueError("count must not be negative")
+        with self._lock:
+            first = self._next
+            self._next += count
+        return range(first, first + count)
+
+    def advance_past(self, value: int):
+        """Make sure every id handed out from now on is greater than ``value``."""
+        with self._lock:
+            if value >= self._next:
+                self._next = value + 1
+
+    def peek(self) -> int:
+        """Return the id the next allocation will get, without allocating it."""
+        return self._next
+
+    def reset(self, start: int = 1):
+        with self._lock:
+            self._next = start
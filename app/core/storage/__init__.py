@@ -0,0 +1,52 @@
+"""Pluggable storage backends."""
+import os
+
+from app.core.config import Settings
+from app.core.storage.base import (
+    ConflictError, CourseRepository, EnrollmentRepository, Storage, UserRepository, WaitlistRepository)
+from app.core.storage.memory import MemoryStorage
+from app.core.storage.records import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord, to_models
+
+
+def _open_memory_storage(settings: Settings) -> MemoryStorage:
+    """Restore the latest snapshot, replay the log written since, and start periodic snapshots."""
+    storage = MemoryStorage(settings.enrollment_table)
+    after_lsn = 0
+    if settings.snapshot_path and os.path.exists(settings.snapshot_path):
+        from app.core.storage.snapshot import load_snapshot
+        after_lsn = load_snapshot(storage, settings.snapshot_path).lsn
+    if settings.wal_path:
+        from app.core.storage.wal import open_log
+        open_log(storage, settings.wal_path, settings.wal_fsync,
+                 settings.wal_group_commit_ms / 1000, settings.wal_fsync_interval_ms / 1000, after_lsn)
+    if settings.snapshot_path and settings.snapshot_interval_s > 0:
+        from app.core.storage.snapshot import SnapshotWriter
+        storage.snapshots = SnapshotWriter(storage, settings.snapshot_path, settings.snapshot_interval_s)
+    return storage
+
+
+def create_storage(settings: Settings) -> Storage:
+    """Build the backend selected by ``settings.storage_backend``."""
+    if settings.storage_backend == "memory":
+        return _open_memory_storage(settings)
+    if settings.storage_backend == "sqlite":
+        from app.core.storage.sqlite import SQLiteStorage
+        return SQLiteStorage(settings.sqlite_path, settings.sqlite_pool_size)
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend!r}")
+
+
+__all__ = [
+    "ConflictError",
+    "CourseRecord",
+    "CourseRepository",
+    "EnrollmentRecord",
+    "EnrollmentRepository",
+    "MemoryStorage",
+    "Storage",
+    "UserRecord",
+    "UserRepository",
+    "WaitlistRecord",
+    "WaitlistRepository",
+    "create_storage",
+    "to_models",
+]
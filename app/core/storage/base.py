@@ -0,0 +1,245 @@
+"""Storage interface used by the services.
+
+Each backend provides one repository per table. Repositories store and
+return the slotted records of ``records``, never the pydantic API schemas,
+and they never raise HTTP errors. Unique
+constraint violations surface as ``ConflictError`` so the services can map
+them to the right status code.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+from app.core.sequence import IdSequence
+from app.core.storage.records import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord
+from app.schemas.course import CourseAccess
+
+
+class ConflictError(Exception):
+    """Raised when a write would violate a unique constraint."""
+
+
+class UserRepository(ABC):
+    ids: IdSequence
+
+    @abstractmethod
+    def get(self, user_id: int) -> Optional[UserRecord]: ...
+
+    @abstractmethod
+    def exists(self, user_id: int) -> bool: ...
+
+    def existing(self, user_ids: Iterable[int]) -> set[int]:
+        """The subset of ``user_ids`` that exist."""
+        return {user_id for user_id in set(user_ids) if self.exists(user_id)}
+
+    @abstractmethod
+    def add(self, new_user: UserRecord) -> None: ...
+
+    def add_many(self, new_users: list[UserRecord]) -> None:
+        """Insert several users in one step."""
+        for new_user in new_users:
+            self.add(new_user)
+
+    @abstractmethod
+    def delete(self, user_id: int) -> Optional[UserRecord]:
+        """Remove a user and return it, or ``None`` if it did not exist."""
+
+    @abstractmethod
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[UserRecord]:
+        """Users in id order; ``after`` starts the page past that id (keyset pagination)."""
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+
+class CourseRepository(ABC):
+    ids: IdSequence
+
+    @abstractmethod
+    def get(self, course_id: int) -> Optional[CourseRecord]: ...
+
+    @abstractmethod
+    def exists(self, course_id: int) -> bool: ...
+
+    def existing(self, course_ids: Iterable[int]) -> set[int]:
+        """The subset of ``course_ids`` that exist."""
+        return {course_id for course_id in set(course_ids) if self.exists(course_id)}
+
+    @abstractmethod
+    def get_by_code(self, code: str) -> Optional[CourseRecord]:
+        """Look a course up by code, case-insensitively."""
+
+    def get_many_by_code(self, codes: Iterable[str]) -> dict[str, CourseRecord]:
+        """The courses holding any of ``codes``, keyed by lower-cased code."""
+        found = {}
+        for code in codes:
+            course = self.get_by_code(code)
+            if course is not None:
+                found[code.lower()] = course
+        return found
+
+    @abstractmethod
+    def add(self, new_course: CourseRecord) -> None:
+        """Insert a course; raises ``ConflictError`` if its code is taken."""
+
+    @abstractmethod
+    def replace(self, updated_course: CourseRecord) -> Optional[CourseRecord]:
+        """Overwrite a course and return the version it replaced (``None`` if there was none).
+
+        Raises ``ConflictError`` if the new code is taken.
+        """
+
+    def write_many(self, new_courses: list[CourseRecord], updated_courses: list[CourseRecord]) -> None:
+        """Insert ``new_courses`` and overwrite ``updated_courses`` in one step.
+
+        The backends check every code first and raise ``ConflictError`` before
+        writing anything if one clashes with the table as it stood before the
+        call or with another course of the same call. This fallback simply
+        applies the writes one at a time.
+        """
+        for updated_course in updated_courses:
+            self.replace(updated_course)
+        for new_course in new_courses:
+            self.add(new_course)
+
+    @abstractmethod
+    def delete(self, course_id: int) -> Optional[CourseRecord]: ...
+
+    @abstractmethod
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[CourseRecord]:
+        """Courses in id order, starting past ``after`` if given."""
+
+    @abstractmethod
+    def list_by_access(self, access: CourseAccess, skip: int = 0, limit: Optional[int] = None,
+                       after: Optional[int] = None) -> list[CourseRecord]:
+        """Courses of one access level in id order, starting past ``after`` if given."""
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+
+class EnrollmentRepository(ABC):
+    ids: IdSequence
+
+    @abstractmethod
+    def get(self, enrollment_id: int) -> Optional[EnrollmentRecord]: ...
+
+    @abstractmethod
+    def find(self, user_id: int, course_id: int) -> Optional[EnrollmentRecord]:
+        """Return the enrollment of a user in a course, if any."""
+
+    @abstractmethod
+    def add(self, new_enrollment: EnrollmentRecord) -> None:
+        """Insert an enrollment; raises ``ConflictError`` if the (user, course) pair exists."""
+
+    def add_many(self, new_enrollments: list[EnrollmentRecord]) -> list[bool]:
+        """Insert every enrollment whose (user, course) pair is free.
+
+        Returns, per item, whether it was inserted. Conflicts, including two
+        items of the same call for one pair, are reported instead of raised.
+        """
+        added = []
+        for new_enrollment in new_enrollments:
+            try:
+                self.add(new_enrollment)
+            except ConflictError:
+                added.append(False)
+            else:
+                added.append(True)
+        return added
+
+    def add_within_capacity(self, new_enrollment: EnrollmentRecord, capacity: int) -> bool:
+        """Insert an enrollment only while its course holds fewer than ``capacity``.
+
+        Returns whether it was inserted; raises ``ConflictError`` if the
+        (user, course) pair exists. The backends check the seat count and
+        insert atomically; this fallback does not.
+        """
+        if self.count_for_course(new_enrollment.course_id) >= capacity:
+            return False
+        self.add(new_enrollment)
+        return True
+
+    @abstractmethod
+    def delete(self, enrollment_id: int) -> Optional[EnrollmentRecord]: ...
+
+    @abstractmethod
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[EnrollmentRecord]:
+        """Enrollments in id order, starting past ``after`` if given."""
+
+    @abstractmethod
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[EnrollmentRecord]:
+        """Enrollments in a course in id order, starting past ``after`` if given."""
+
+    @abstractmethod
+    def list_for_user(self, user_id: int, skip: int = 0, limit: Optional[int] = None,
+                      after: Optional[int] = None) -> list[EnrollmentRecord]:
+        """Enrollments of a user in id order, starting past ``after`` if given."""
+
+    def count_for_course(self, course_id: int) -> int:
+        """Number of enrollments in a course, i.e. the seats taken."""
+        return len(self.list_for_course(course_id))
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+
+class WaitlistRepository(ABC):
+    """One first-in, first-out queue per course of users waiting for a seat.
+
+    Entry ids come from ``ids``, so a queue is served in id order.
+    """
+    ids: IdSequence
+
+    @abstractmethod
+    def get(self, entry_id: int) -> Optional[WaitlistRecord]: ...
+
+    @abstractmethod
+    def find(self, user_id: int, course_id: int) -> Optional[WaitlistRecord]:
+        """Return the entry of a user in a course's queue, if any."""
+
+    @abstractmethod
+    def add(self, new_entry: WaitlistRecord) -> None:
+        """Append an entry; raises ``ConflictError`` if the user is already queued for the course."""
+
+    @abstractmethod
+    def delete(self, entry_id: int) -> Optional[WaitlistRecord]: ...
+
+    @abstractmethod
+    def first(self, course_id: int) -> Optional[WaitlistRecord]:
+        """The entry at the head of a course's queue, if any."""
+
+    @abstractmethod
+    def position(self, entry: WaitlistRecord) -> int:
+        """Place of a queued entry in its course's queue, 1 being the head."""
+
+    @abstractmethod
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[WaitlistRecord]:
+        """A course's queue in order, starting past ``after`` if given."""
+
+    @abstractmethod
+    def count_for_course(self, course_id: int) -> int: ...
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+
+class Storage(ABC):
+    """A backend: one repository per table."""
+
+    users: UserRepository
+    courses: CourseRepository
+    enrollments: EnrollmentRepository
+    waitlist: WaitlistRepository
+    # Whether reads are cheap and never block, so async handlers may call them on the event loop
+    inline_reads: bool = False
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Delete every record and restart the id sequences."""
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
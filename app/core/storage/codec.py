@@ -0,0 +1,101 @@
+"""Compact binary encoding of records, shared by the write-ahead log and snapshots.
+
+Integers are little-endian, strings are a ``uint16`` byte length followed by
+UTF-8, and enums are stored as a one-byte index into the tuples below. Those
+tuples are part of the on-disk format: only ever append to them. A course's
+capacity is an ``int64`` after its code, 0 meaning unlimited; courses written
+before capacities existed end at the code.
+"""
+from __future__ import annotations
+
+import struct
+
+from app.core.storage.records import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+USER_ROLES = (UserRole.ADMIN, UserRole.USER)
+COURSE_ACCESS = (CourseAccess.ADMIN_ONLY_ACCESS, CourseAccess.PUBLIC_ACCESS)
+ENROLLMENT_ROLES = (Enrollmentrole.STUDENT, Enrollmentrole.ADMIN)
+
+_USER_ROLE_CODES = {role: code for code, role in enumerate(USER_ROLES)}
+_COURSE_ACCESS_CODES = {access: code for code, access in enumerate(COURSE_ACCESS)}
+ENROLLMENT_ROLE_CODES = {role: code for code, role in enumerate(ENROLLMENT_ROLES)}
+
+ID = struct.Struct("<q")
+STR_LEN = struct.Struct("<H")
+USER_HEAD = struct.Struct("<qB")
+COURSE_HEAD = struct.Struct("<qB")
+ENROLLMENT = struct.Struct("<qqqB")
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode()
+    return STR_LEN.pack(len(data)) + data
+
+
+def _unpack_str(buf, offset: int) -> tuple[str, int]:
+    (length,) = STR_LEN.unpack_from(buf, offset)
+    offset += STR_LEN.size
+    return bytes(buf[offset:offset + length]).decode(), offset + length
+
+
+def encode_user(record: UserRecord) -> bytes:
+    return (USER_HEAD.pack(record.id, _USER_ROLE_CODES[record.role])
+            + _pack_str(record.name) + _pack_str(str(record.email)))
+
+
+def decode_user(buf, offset: int = 0) -> tuple[UserRecord, int]:
+    """Decode a user at ``offset``; return it with the offset just past it."""
+    user_id, role = USER_HEAD.unpack_from(buf, offset)
+    name, offset = _unpack_str(buf, offset + USER_HEAD.size)
+    email, offset = _unpack_str(buf, offset)
+    return UserRecord(id=user_id, name=name, email=email, role=USER_ROLES[role]), offset
+
+
+def encode_course(record: CourseRecord) -> bytes:
+    return (COURSE_HEAD.pack(record.id, _COURSE_ACCESS_CODES[record.access])
+            + _pack_str(record.title) + _pack_str(record.code) + ID.pack(record.capacity or 0))
+
+
+def decode_course(buf, offset: int = 0, has_capacity: bool = True) -> tuple[CourseRecord, int]:
+    """Decode a course; ``has_capacity=False`` reads the older format without a capacity."""
+    course_id, access = COURSE_HEAD.unpack_from(buf, offset)
+    title, offset = _unpack_str(buf, offset + COURSE_HEAD.size)
+    code, offset = _unpack_str(buf, offset)
+    capacity = 0
+    if has_capacity:
+        (capacity,) = ID.unpack_from(buf, offset)
+        offset += ID.size
+    return CourseRecord(
+        id=course_id, title=title, code=code, access=COURSE_ACCESS[access], capacity=capacity or None), offset
+
+
+def encode_enrollment(record: EnrollmentRecord) -> bytes:
+    return ENROLLMENT.pack(
+        record.id, record.user_id, record.course_id, ENROLLMENT_ROLE_CODES[record.role])
+
+
+def decode_enrollment(buf, offset: int = 0) -> tuple[EnrollmentRecord, int]:
+    enrollment_id, user_id, course_id, role = ENROLLMENT.unpack_from(buf, offset)
+    return EnrollmentRecord(
+        id=enrollment_id, user_id=user_id, course_id=course_id, role=ENROLLMENT_ROLES[role]
+    ), offset + ENROLLMENT.size
+
+
+def encode_waitlist_entry(record: WaitlistRecord) -> bytes:
+    return ENROLLMENT.pack(
+        record.id, record.user_id, record.course_id, ENROLLMENT_ROLE_CODES[record.role])
+
+
+def decode_waitlist_entry(buf, offset: int = 0) -> tuple[WaitlistRecord, int]:
+    entry_id, user_id, course_id, role = ENROLLMENT.unpack_from(buf, offset)
+    return WaitlistRecord(
+        id=entry_id, user_id=user_id, course_id=course_id, role=ENROLLMENT_ROLES[role]
+    ), offset + ENROLLMENT.size
+
+
+def enrollment_row(record: EnrollmentRecord) -> tuple[int, int, int, int]:
+    """``(id, user_id, course_id, role code)``: an enrollment as plain columns."""
+    return record.id, record.user_id, record.course_id, ENROLLMENT_ROLE_CODES[record.role]
@@ -0,0 +1,277 @@
+"""Column-oriented enrollment table for the memory backend.
+
+Instead of one ``EnrollmentRecord`` object per row, the table keeps four
+typed parallel arrays (id, user id, course id, role code) plus a tombstone
+flag per row, and only builds records when rows are handed back to the
+services. Rows are kept in id order; a row is found by bisecting the id
+column. Unlike the dict table, reads take the storage lock too: a row spans
+several arrays, and a concurrent insert or compaction would otherwise be seen
+half-done. Secondary indexes hold ids, never row positions, so deleted rows can
+be compacted away without touching them.
+
+Select it with ``APP_ENROLLMENT_TABLE=columnar``.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, islice
+from typing import Optional
+
+from app.core.sequence import IdSequence
+from app.core.storage import codec
+from app.core.storage.base import ConflictError, EnrollmentRepository
+from app.core.storage.memory import NULL_JOURNAL
+from app.core.storage.records import EnrollmentRecord
+
+# (user id, course id) pairs are packed into a single int while course ids fit in 32 bits.
+_PAIR_SHIFT = 32
+_PAIR_LIMIT = 1 << _PAIR_SHIFT
+
+# Compact once at least this many rows are dead and they make up half the table.
+_COMPACT_MIN_DEAD = 1024
+
+
+def _pair_key(user_id: int, course_id: int):
+    if course_id < _PAIR_LIMIT:
+        return (user_id << _PAIR_SHIFT) | course_id
+    return user_id, course_id
+
+
+def _adjacency_add(index: dict, key: int, enrollment_id: int):
+    ids = index.get(key)
+    if ids is None:
+        index[key] = array("q", (enrollment_id,))
+    elif not ids or ids[-1] < enrollment_id:
+        ids.append(enrollment_id)
+    else:
+        ids.insert(bisect_left(ids, enrollment_id), enrollment_id)
+
+
+def _adjacency_remove(index: dict, key: int, enrollment_id: int):
+    ids = index[key]
+    del ids[bisect_left(ids, enrollment_id)]
+    if not ids:
+        del index[key]
+
+
+def _slice(ids, skip: int, limit: Optional[int], after: Optional[int] = None):
+    start = skip if after is None else bisect_right(ids, after) + skip
+    return ids[start:None if limit is None else start + limit]
+
+
+class ColumnarEnrollmentRepository(EnrollmentRepository):
+    def __init__(self, lock):
+        self._lock = lock
+        self.journal = NULL_JOURNAL
+        self.ids = IdSequence()
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self.id_column = array("q")
+        self.user_column = array("q")
+        self.course_column = array("q")
+        self.role_column = bytearray()
+        self.alive = bytearray()
+        self._dead = 0
+        self.pair_index = {}  # packed (user id, course id) -> enrollment id
+        self.course_index = {}  # course id -> array of enrollment ids
+        self.user_index = {}  # user id -> array of enrollment ids
+
+    # -- row access --------------------------------------------------------
+
+    def _position(self, enrollment_id: int) -> int:
+        """Row position of a live enrollment, or -1."""
+        ids = self.id_column
+        i = bisect_left(ids, enrollment_id)
+        if i < len(ids) and ids[i] == enrollment_id and self.alive[i]:
+            return i
+        return -1
+
+    def _build(self, i: int) -> EnrollmentRecord:
+        return EnrollmentRecord(
+            id=self.id_column[i], user_id=self.user_column[i], course_id=self.course_column[i],
+            role=codec.ENROLLMENT_ROLES[self.role_column[i]])
+
+    def _build_many(self, enrollment_ids) -> list[EnrollmentRecord]:
+        position, build = self._position, self._build
+        return [build(position(enrollment_id)) for enrollment_id in enrollment_ids]
+
+    # -- EnrollmentRepository ----------------------------------------------
+
+    def get(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        with self._lock:
+            i = self._position(enrollment_id)
+            return None if i < 0 else self._build(i)
+
+    def find(self, user_id: int, course_id: int) -> Optional[EnrollmentRecord]:
+        with self._lock:
+            enrollment_id = self.pair_index.get(_pair_key(user_id, course_id))
+            return None if enrollment_id is None else self._build(self._position(enrollment_id))
+
+    def add(self, new_enrollment: EnrollmentRecord) -> None:
+        key = _pair_key(new_enrollment.user_id, new_enrollment.course_id)
+        with self._lock:
+            if key in self.pair_index:
+                raise ConflictError(
+                    f"user {new_enrollment.user_id} is already enrolled in course {new_enrollment.course_id}")
+            self._insert(*codec.enrollment_row(new_enrollment))
+            self.pair_index[key] = new_enrollment.id
+            lsn = self.journal.put(new_enrollment)
+        self.journal.wait(lsn)
+
+    def add_within_capacity(self, new_enrollment: EnrollmentRecord, capacity: int) -> bool:
+        key = _pair_key(new_enrollment.user_id, new_enrollment.course_id)
+        with self._lock:
+            if key in self.pair_index:
+                raise ConflictError(
+                    f"user {new_enrollment.user_id} is already enrolled in course {new_enrollment.course_id}")
+            if len(self.course_index.get(new_enrollment.course_id, ())) >= capacity:
+                return False
+            self._insert(*codec.enrollment_row(new_enrollment))
+            self.pair_index[key] = new_enrollment.id
+            lsn = self.journal.put(new_enrollment)
+        self.journal.wait(lsn)
+        return True
+
+    def add_many(self, new_enrollments: list[EnrollmentRecord]) -> list[bool]:
+        added = []
+        lsn = 0
+        with self._lock:
+            pair_index = self.pair_index
+            for new_enrollment in new_enrollments:
+                key = _pair_key(new_enrollment.user_id, new_enrollment.course_id)
+                if key in pair_index:
+                    added.append(False)
+                    continue
+                self._insert(*codec.enrollment_row(new_enrollment))
+                pair_index[key] = new_enrollment.id
+                lsn = self.journal.put(new_enrollment)
+                added.append(True)
+        self.journal.wait(lsn)
+        return added
+
+    def _insert(self, enrollment_id: int, user_id: int, course_id: int, role: int):
+        ids = self.id_column
+        if not ids or ids[-1] < enrollment_id:
+            # Ids are allocated in increasing order, so this is the common case.
+            ids.append(enrollment_id)
+            self.user_column.append(user_id)
+            self.course_column.append(course_id)
+            self.role_column.append(role)
+            self.alive.append(1)
+        else:
+            # A writer that allocated its id earlier but finished later.
+            i = bisect_left(ids, enrollment_id)
+            ids.insert(i, enrollment_id)
+            self.user_column.insert(i, user_id)
+            self.course_column.insert(i, course_id)
+            self.role_column.insert(i, role)
+            self.alive.insert(i, 1)
+        _adjacency_add(self.course_index, course_id, enrollment_id)
+        _adjacency_add(self.user_index, user_id, enrollment_id)
+
+    def delete(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        lsn = 0
+        with self._lock:
+            i = self._position(enrollment_id)
+            if i < 0:
+                return None
+            removed = self._build(i)
+            self.alive[i] = 0
+            self._dead += 1
+            del self.pair_index[_pair_key(removed.user_id, removed.course_id)]
+            _adjacency_remove(self.course_index, removed.course_id, enrollment_id)
+            _adjacency_remove(self.user_index, removed.user_id, enrollment_id)
+            if self._dead >= _COMPACT_MIN_DEAD and self._dead * 2 >= len(self.alive):
+                self.compact()
+            lsn = self.journal.delete(enrollment_id)
+        self.journal.wait(lsn)
+        return removed
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[EnrollmentRecord]:
+        with self._lock:
+            start = 0 if after is None else bisect_right(self.id_column, after)
+            live = compress(range(start, len(self.alive)), islice(self.alive, start, None))
+            end = None if limit is None else skip + limit
+            return [self._build(i) for i in islice(live, skip, end)]
+
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[EnrollmentRecord]:
+        with self._lock:
+            return self._build_many(_slice(self.course_index.get(course_id, ()), skip, limit, after))
+
+    def list_for_user(self, user_id: int, skip: int = 0, limit: Optional[int] = None,
+                      after: Optional[int] = None) -> list[EnrollmentRecord]:
+        with self._lock:
+            return self._build_many(_slice(self.user_index.get(user_id, ()), skip, limit, after))
+
+    def count_for_course(self, course_id: int) -> int:
+        return len(self.course_index.get(course_id, ()))
+
+    def count(self) -> int:
+        return len(self.alive) - self._dead
+
+    # -- memory backend extras -----------------------------------------------
+
+    def compact(self):
+        """Drop tombstoned rows from the columns."""
+        with self._lock:
+            alive = self.alive
+            self.id_column = array("q", compress(self.id_column, alive))
+            self.user_column = array("q", compress(self.user_column, alive))
+            self.course_column = array("q", compress(self.course_column, alive))
+            self.role_column = bytearray(compress(self.role_column, alive))
+            self.alive = bytearray(b"\x01") * len(self.id_column)
+            self._dead = 0
+
+    def put(self, record: EnrollmentRecord) -> None:
+        """Insert or overwrite an enrollment without logging it (log replay)."""
+        journal, self.journal = self.journal, NULL_JOURNAL
+        try:
+            self.delete(record.id)
+            self.add(record)
+        finally:
+            self.journal = journal
+        self.ids.advance_past(record.id)
+
+    def load(self, records: list[EnrollmentRecord]) -> None:
+        """Bulk-insert already-validated enrollments without logging them."""
+        with self._lock:
+            for record in records:
+                self._insert(*codec.enrollment_row(record))
+                self.pair_index[_pair_key(record.user_id, record.course_id)] = record.id
+
+    def load_columns(self, ids, user_ids, course_ids, roles) -> None:
+        """Copy snapshot columns straight into the arrays and index them.
+
+        The columns must be sorted by id; the repository must be empty.
+        """
+        with self._lock:
+            self.id_column = array("q", ids)
+            self.user_column = array("q", user_ids)
+            self.course_column = array("q", course_ids)
+            self.role_column = bytearray(roles)
+            self.alive = bytearray(b"\x01") * len(self.id_column)
+            self.pair_index = {
+                _pair_key(user_id, course_id): enrollment_id
+                for enrollment_id, user_id, course_id in zip(self.id_column, self.user_column, self.course_column)}
+            course_index, user_index = self.course_index, self.user_index
+            for enrollment_id, user_id, course_id in zip(self.id_column, self.user_column, self.course_column):
+                _adjacency_add(course_index, course_id, enrollment_id)
+                _adjacency_add(user_index, user_id, enrollment_id)
+
+    def export_rows(self):
+        """Column tuples of every live enrollment in id order, for a snapshot.
+
+        Call with the storage lock held; the result can be consumed after it is released.
+        """
+        alive = bytes(self.alive)
+        rows = zip(array("q", self.id_column), array("q", self.user_column),
+                   array("q", self.course_column), bytes(self.role_column))
+        return compress(rows, alive)
+
+    def clear(self):
+        self._reset_columns()
+        self.ids.reset()
+
@@ -0,0 +1,661 @@
+"""Process-local storage backed by dicts and in-memory secondary indexes."""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Optional
+
+from app.core.sequence import IdSequence
+from app.core.storage import codec, wal
+from app.core.storage.base import (
+    ConflictError, CourseRepository, EnrollmentRepository, Storage, UserRepository, WaitlistRepository)
+from app.core.storage.records import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord
+from app.core.storage.snapshot import SnapshotRows
+from app.schemas.course import CourseAccess
+
+
+def index_add(index: dict, key, record_id: int):
+    """Add ``record_id`` to the sorted id list stored under ``key``."""
+    insort(index.setdefault(key, []), record_id)
+
+
+def index_insert(ids: list, record_id: int):
+    """Insert ``record_id`` into a sorted id list; ids mostly arrive in order, so try appending first."""
+    if not ids or ids[-1] < record_id:
+        ids.append(record_id)
+    else:
+        insort(ids, record_id)
+
+
+def index_remove(index: dict, key, record_id: int):
+    """Remove ``record_id`` from the sorted id list stored under ``key``."""
+    ids = index[key]
+    del ids[bisect_left(ids, record_id)]
+    if not ids:
+        del index[key]
+
+
+def _slice(ids: list, skip: int, limit: Optional[int], after: Optional[int] = None) -> list:
+    """A page of a sorted id list: ``skip`` ids past ``after`` (an id), then at most ``limit``."""
+    start = skip if after is None else bisect_right(ids, after) + skip
+    return ids[start:None if limit is None else start + limit]
+
+
+# Compact a SortedIds once more than one id in this many is a tombstone
+TOMBSTONE_RATIO = 8
+
+
+class SortedIds:
+    """Sorted ids for keyset scans, deleted lazily.
+
+    Deleting from the middle of a list moves every id after it: at a million
+    rows that costs more than the rest of a delete, with the storage lock
+    held. A deleted id is instead kept as a tombstone and skipped by
+    readers, and the list is rebuilt without tombstones once they make up
+    ``1 / TOMBSTONE_RATIO`` of it. Writers hold the storage lock; readers
+    don't. ``state`` holds the id list and the tombstone set as one tuple,
+    so a reader always takes a matching pair and a rebuild swaps both in a
+    single assignment.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, ids: Optional[list] = None):
+        self.state = ([] if ids is None else ids, set())
+
+    def add(self, record_id: int):
+        ids, dead = self.state
+        if record_id in dead:
+            # Deleted and added back before a rebuild: it is still in place
+            dead.discard(record_id)
+        else:
+            index_insert(ids, record_id)
+
+    def remove(self, record_id: int):
+        ids, dead = self.state
+        dead.add(record_id)
+        if len(dead) * TOMBSTONE_RATIO > len(ids):
+            self.compact()
+
+    def compact(self):
+        ids, dead = self.state
+        self.state = ([i for i in ids if i not in dead], set())
+
+    def page(self, skip: int, limit: Optional[int], after: Optional[int] = None) -> list:
+        """Like ``_slice``: ``skip`` live ids past ``after``, then at most ``limit``."""
+        ids, dead = self.state
+        start = 0 if after is None else bisect_right(ids, after)
+        if not dead:
+            start += skip
+            return ids[start:None if limit is None else start + limit]
+        if limit is None:
+            return [i for i in ids[start:] if i not in dead][skip:]
+        wanted = skip + limit
+        live = []
+        while len(live) < wanted and start < len(ids):
+            chunk = ids[start:start + wanted - len(live)]
+            start += len(chunk)
+            live.extend(i for i in chunk if i not in dead)
+        return live[skip:wanted]
+
+    def __iter__(self):
+        ids, dead = self.state
+        return (i for i in ids if i not in dead)
+
+    def __len__(self) -> int:
+        ids, dead = self.state
+        return len(ids) - len(dead)
+
+
+def _rows(rows, ids: list) -> list:
+    return [rows[i] for i in ids]
+
+
+def _read(lock, read):
+    """Run a lock-free read, or run it again under ``lock`` if it raced a delete.
+
+    A delete pops the row before it unindexes it, so an id just taken from
+    an index can be missing from ``rows`` (a ``KeyError``). Reads run inline
+    on the event loop, so they only wait for a writer in that rare case.
+    """
+    try:
+        return read()
+    except KeyError:
+        with lock:
+            return read()
+
+
+class _NullJournal:
+    """Stands in for a ``wal.TableJournal`` when no log is attached."""
+
+    def put(self, record) -> int:
+        return 0
+
+    def delete(self, record_id: int) -> int:
+        return 0
+
+    def wait(self, lsn: int):
+        pass
+
+
+NULL_JOURNAL = _NullJournal()
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self.journal = NULL_JOURNAL
+        self.ids = IdSequence()
+        self.rows = {}
+        self.order = SortedIds()  # user ids, for keyset pagination
+
+    def get(self, user_id: int) -> Optional[UserRecord]:
+        return self.rows.get(user_id)
+
+    def exists(self, user_id: int) -> bool:
+        return user_id in self.rows
+
+    def existing(self, user_ids) -> set[int]:
+        return self.rows.keys() & set(user_ids)
+
+    def add(self, new_user: UserRecord) -> None:
+        with self._lock:
+            self.rows[new_user.id] = new_user
+            self.order.add(new_user.id)
+            lsn = self.journal.put(new_user)
+        self.journal.wait(lsn)
+
+    def add_many(self, new_users: list[UserRecord]) -> None:
+        lsn = 0
+        with self._lock:
+            rows, order = self.rows, self.order
+            for new_user in new_users:
+                rows[new_user.id] = new_user
+                order.add(new_user.id)
+                lsn = self.journal.put(new_user)
+        self.journal.wait(lsn)
+
+    def put(self, record: UserRecord) -> None:
+        """Insert or overwrite a user without logging it (log replay and snapshot loading)."""
+        if record.id not in self.rows:
+            self.order.add(record.id)
+        self.rows[record.id] = record
+        self.ids.advance_past(record.id)
+
+    def load(self, records: list[UserRecord]) -> None:
+        """Bulk-insert already-validated users without logging them (snapshot loading)."""
+        with self._lock:
+            self.rows.update((record.id, record) for record in records)
+            self.order = SortedIds(sorted(self.rows))
+
+    def delete(self, user_id: int) -> Optional[UserRecord]:
+        with self._lock:
+            removed = self.rows.pop(user_id, None)
+            lsn = 0
+            if removed is not None:
+                self.order.remove(user_id)
+                lsn = self.journal.delete(user_id)
+        self.journal.wait(lsn)
+        return removed
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[UserRecord]:
+        return _read(self._lock, lambda: _rows(self.rows, self.order.page(skip, limit, after)))
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def clear(self):
+        self.rows.clear()
+        self.order = SortedIds()
+        self.ids.reset()
+
+
+class MemoryCourseRepository(CourseRepository):
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self.journal = NULL_JOURNAL
+        self.ids = IdSequence()
+        self.rows = {}
+        self.order = SortedIds()  # course ids, for keyset scans
+        self.code_index = {}  # lower-cased course code -> course id
+        self.access_index = {}  # CourseAccess -> SortedIds
+
+    def get(self, course_id: int) -> Optional[CourseRecord]:
+        return self.rows.get(course_id)
+
+    def exists(self, course_id: int) -> bool:
+        return course_id in self.rows
+
+    def existing(self, course_ids) -> set[int]:
+        return self.rows.keys() & set(course_ids)
+
+    def get_by_code(self, code: str) -> Optional[CourseRecord]:
+        def lookup():
+            course_id = self.code_index.get(code.lower())
+            return None if course_id is None else self.rows[course_id]
+        return _read(self._lock, lookup)
+
+    def get_many_by_code(self, codes) -> dict[str, CourseRecord]:
+        def lookup():
+            rows, code_index = self.rows, self.code_index
+            found = {}
+            for code in codes:
+                course_id = code_index.get(code.lower())
+                if course_id is not None:
+                    found[code.lower()] = rows[course_id]
+            return found
+        return _read(self._lock, lookup)
+
+    def add(self, new_course: CourseRecord) -> None:
+        code = new_course.code.lower()
+        with self._lock:
+            if code in self.code_index:
+                raise ConflictError(f"course code {new_course.code!r} already exists")
+            self._insert(new_course)
+            lsn = self.journal.put(new_course)
+        self.journal.wait(lsn)
+
+    def replace(self, updated_course: CourseRecord) -> Optional[CourseRecord]:
+        course_id = updated_course.id
+        code = updated_course.code.lower()
+        with self._lock:
+            if course_id not in self.rows:
+                return None
+            if self.code_index.get(code, course_id) != course_id:
+                raise ConflictError(f"course code {updated_course.code!r} already exists")
+            previous = self._replace(updated_course)
+            lsn = self.journal.put(updated_course)
+        self.journal.wait(lsn)
+        return previous
+
+    def write_many(self, new_courses: list[CourseRecord], updated_courses: list[CourseRecord]) -> None:
+        lsn = 0
+        with self._lock:
+            # Check every write before applying any, so a conflict leaves the table untouched
+            claimed = {}
+            for course in updated_courses:
+                if course.id not in self.rows:
+                    raise ConflictError(f"course {course.id} no longer exists")
+            for course in (*updated_courses, *new_courses):
+                code = course.code.lower()
+                if claimed.setdefault(code, course.id) != course.id or \
+                        self.code_index.get(code, course.id) != course.id:
+                    raise ConflictError(f"course code {course.code!r} already exists")
+            for course in updated_courses:
+                self._replace(course)
+                lsn = self.journal.put(course)
+            for course in new_courses:
+                self._insert(course)
+                lsn = self.journal.put(course)
+        self.journal.wait(lsn)
+
+    def _insert(self, new_course: CourseRecord):
+        self.rows[new_course.id] = new_course
+        self.order.add(new_course.id)
+        self.code_index[new_course.code.lower()] = new_course.id
+        self._access_ids(new_course.access).add(new_course.id)
+
+    def _access_ids(self, access: CourseAccess) -> SortedIds:
+        ids = self.access_index.get(access)
+        if ids is None:
+            ids = self.access_index[access] = SortedIds()
+        return ids
+
+    def _replace(self, updated_course: CourseRecord):
+        course_id = updated_course.id
+        previous = self.rows[course_id]
+        del self.code_index[previous.code.lower()]
+        self.rows[course_id] = updated_course
+        self.code_index[updated_course.code.lower()] = course_id
+        if previous.access != updated_course.access:
+            self.access_index[previous.access].remove(course_id)
+            self._access_ids(updated_course.access).add(course_id)
+        return previous
+
+    def put(self, record: CourseRecord) -> None:
+        """Insert or overwrite a course without logging it (log replay and snapshot loading)."""
+        journal, self.journal = self.journal, NULL_JOURNAL
+        try:
+            if record.id in self.rows:
+                self.replace(record)
+            else:
+                self.add(record)
+        finally:
+            self.journal = journal
+        self.ids.advance_past(record.id)
+
+    def load(self, records: list[CourseRecord]) -> None:
+        """Bulk-insert already-validated courses without logging them (snapshot loading)."""
+        with self._lock:
+            for record in records:
+                self.rows[record.id] = record
+                self.order.add(record.id)
+                self.code_index[record.code.lower()] = record.id
+                self._access_ids(record.access).add(record.id)
+
+    def delete(self, course_id: int) -> Optional[CourseRecord]:
+        lsn = 0
+        with self._lock:
+            removed = self.rows.pop(course_id, None)
+            if removed is not None:
+                self.order.remove(course_id)
+                del self.code_index[removed.code.lower()]
+                self.access_index[removed.access].remove(course_id)
+                lsn = self.journal.delete(course_id)
+        self.journal.wait(lsn)
+        return removed
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[CourseRecord]:
+        return _read(self._lock, lambda: _rows(self.rows, self.order.page(skip, limit, after)))
+
+    def list_by_access(self, access: CourseAccess, skip: int = 0, limit: Optional[int] = None,
+                       after: Optional[int] = None) -> list[CourseRecord]:
+        ids = self.access_index.get(access)
+        if ids is None:
+            return []
+        return _read(self._lock, lambda: _rows(self.rows, ids.page(skip, limit, after)))
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def clear(self):
+        self.rows.clear()
+        self.order = SortedIds()
+        self.code_index.clear()
+        self.access_index.clear()
+        self.ids.reset()
+
+
+class MemoryEnrollmentRepository(EnrollmentRepository):
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self.journal = NULL_JOURNAL
+        self.ids = IdSequence()
+        self.rows = {}
+        self.order = SortedIds()  # enrollment ids, for keyset scans
+        self.pair_index = {}  # (user id, course id) -> enrollment id
+        self.course_index = {}  # course id -> sorted enrollment ids
+        self.user_index = {}  # user id -> sorted enrollment ids
+
+    def get(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        return self.rows.get(enrollment_id)
+
+    def find(self, user_id: int, course_id: int) -> Optional[EnrollmentRecord]:
+        def lookup():
+            enrollment_id = self.pair_index.get((user_id, course_id))
+            return None if enrollment_id is None else self.rows[enrollment_id]
+        return _read(self._lock, lookup)
+
+    def add(self, new_enrollment: EnrollmentRecord) -> None:
+        pair = (new_enrollment.user_id, new_enrollment.course_id)
+        with self._lock:
+            if pair in self.pair_index:
+                raise ConflictError(f"user {pair[0]} is already enrolled in course {pair[1]}")
+            self._insert(pair, new_enrollment)
+            lsn = self.journal.put(new_enrollment)
+        self.journal.wait(lsn)
+
+    def add_within_capacity(self, new_enrollment: EnrollmentRecord, capacity: int) -> bool:
+        pair = (new_enrollment.user_id, new_enrollment.course_id)
+        with self._lock:
+            if pair in self.pair_index:
+                raise ConflictError(f"user {pair[0]} is already enrolled in course {pair[1]}")
+            if len(self.course_index.get(new_enrollment.course_id, ())) >= capacity:
+                return False
+            self._insert(pair, new_enrollment)
+            lsn = self.journal.put(new_enrollment)
+        self.journal.wait(lsn)
+        return True
+
+    def add_many(self, new_enrollments: list[EnrollmentRecord]) -> list[bool]:
+        added = []
+        lsn = 0
+        with self._lock:
+            pair_index = self.pair_index
+            for new_enrollment in new_enrollments:
+                pair = (new_enrollment.user_id, new_enrollment.course_id)
+                if pair in pair_index:
+                    added.append(False)
+                    continue
+                self._insert(pair, new_enrollment)
+                lsn = self.journal.put(new_enrollment)
+                added.append(True)
+        # One wait covers the whole batch: the log is flushed in order.
+        self.journal.wait(lsn)
+        return added
+
+    def _insert(self, pair: tuple[int, int], new_enrollment: EnrollmentRecord):
+        self.rows[new_enrollment.id] = new_enrollment
+        self.order.add(new_enrollment.id)
+        self.pair_index[pair] = new_enrollment.id
+        index_add(self.course_index, new_enrollment.course_id, new_enrollment.id)
+        index_add(self.user_index, new_enrollment.user_id, new_enrollment.id)
+
+    def put(self, record: EnrollmentRecord) -> None:
+        """Insert or overwrite an enrollment without logging it (log replay and snapshot loading)."""
+        journal, self.journal = self.journal, NULL_JOURNAL
+        try:
+            self.delete(record.id)
+            self.add(record)
+        finally:
+            self.journal = journal
+        self.ids.advance_past(record.id)
+
+    def load(self, records: list[EnrollmentRecord]) -> None:
+        """Bulk-insert already-validated enrollments without logging them (snapshot loading)."""
+        with self._lock:
+            rows, order, pair_index = self.rows, self.order, self.pair_index
+            course_index, user_index = self.course_index, self.user_index
+            for record in records:
+                rows[record.id] = record
+                order.add(record.id)
+                pair_index[(record.user_id, record.course_id)] = record.id
+                index_add(course_index, record.course_id, record.id)
+                index_add(user_index, record.user_id, record.id)
+
+    def load_columns(self, ids, user_ids, course_ids, roles) -> None:
+        """Adopt snapshot columns as lazily-built rows and index them.
+
+        The columns must be sorted by id; the repository must be empty.
+        """
+        with self._lock:
+            self.rows = SnapshotRows(ids, user_ids, course_ids, roles)
+            self.order = SortedIds(list(ids))
+            self.pair_index = dict(zip(zip(user_ids, course_ids), ids))
+            course_index, user_index = self.course_index, self.user_index
+            for enrollment_id, user_id, course_id in zip(ids, user_ids, course_ids):
+                by_course = course_index.get(course_id)
+                if by_course is None:
+                    course_index[course_id] = [enrollment_id]
+                else:
+                    by_course.append(enrollment_id)
+                by_user = user_index.get(user_id)
+                if by_user is None:
+                    user_index[user_id] = [enrollment_id]
+                else:
+                    by_user.append(enrollment_id)
+
+    def export_rows(self):
+        """Column tuples of every enrollment in id order, for a snapshot.
+
+        Call with the storage lock held; the result can be consumed after it is released.
+        """
+        if isinstance(self.rows, SnapshotRows):
+            # Still backed by the previous snapshot: copy its columns without materializing rows.
+            return self.rows.freeze().tuples()
+        rows = self.rows
+        return map(codec.enrollment_row, [rows[i] for i in self.order])
+
+    def delete(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        lsn = 0
+        with self._lock:
+            removed = self.rows.pop(enrollment_id, None)
+            if removed is not None:
+                self.order.remove(enrollment_id)
+                del self.pair_index[(removed.user_id, removed.course_id)]
+                index_remove(self.course_index, removed.course_id, enrollment_id)
+                index_remove(self.user_index, removed.user_id, enrollment_id)
+                lsn = self.journal.delete(enrollment_id)
+        self.journal.wait(lsn)
+        return removed
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return _read(self._lock, lambda: _rows(self.rows, self.order.page(skip, limit, after)))
+
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return _read(self._lock, lambda: _rows(
+            self.rows, _slice(self.course_index.get(course_id, []), skip, limit, after)))
+
+    def list_for_user(self, user_id: int, skip: int = 0, limit: Optional[int] = None,
+                      after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return _read(self._lock, lambda: _rows(
+            self.rows, _slice(self.user_index.get(user_id, []), skip, limit, after)))
+
+    def count_for_course(self, course_id: int) -> int:
+        return len(self.course_index.get(course_id, ()))
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def clear(self):
+        self.rows = {}
+        self.order = SortedIds()
+        self.pair_index.clear()
+        self.course_index.clear()
+        self.user_index.clear()
+        self.ids.reset()
+
+
+class MemoryWaitlistRepository(WaitlistRepository):
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self.journal = NULL_JOURNAL
+        self.ids = IdSequence()
+        self.rows = {}
+        self.pair_index = {}  # (user id, course id) -> entry id
+        self.course_index = {}  # course id -> sorted entry ids, i.e. the queue
+
+    def get(self, entry_id: int) -> Optional[WaitlistRecord]:
+        return self.rows.get(entry_id)
+
+    def find(self, user_id: int, course_id: int) -> Optional[WaitlistRecord]:
+        def lookup():
+            entry_id = self.pair_index.get((user_id, course_id))
+            return None if entry_id is None else self.rows[entry_id]
+        return _read(self._lock, lookup)
+
+    def add(self, new_entry: WaitlistRecord) -> None:
+        pair = (new_entry.user_id, new_entry.course_id)
+        with self._lock:
+            if pair in self.pair_index:
+                raise ConflictError(f"user {pair[0]} is already waitlisted for course {pair[1]}")
+            self._insert(pair, new_entry)
+            lsn = self.journal.put(new_entry)
+        self.journal.wait(lsn)
+
+    def _insert(self, pair: tuple[int, int], new_entry: WaitlistRecord):
+        self.rows[new_entry.id] = new_entry
+        self.pair_index[pair] = new_entry.id
+        index_insert(self.course_index.setdefault(new_entry.course_id, []), new_entry.id)
+
+    def put(self, record: WaitlistRecord) -> None:
+        """Insert or overwrite an entry without logging it (log replay)."""
+        journal, self.journal = self.journal, NULL_JOURNAL
+        try:
+            self.delete(record.id)
+            self.add(record)
+        finally:
+            self.journal = journal
+        self.ids.advance_past(record.id)
+
+    def load(self, records: list[WaitlistRecord]) -> None:
+        """Bulk-insert entries without logging them (snapshot loading)."""
+        with self._lock:
+            for record in records:
+                self._insert((record.user_id, record.course_id), record)
+
+    def delete(self, entry_id: int) -> Optional[WaitlistRecord]:
+        lsn = 0
+        with self._lock:
+            removed = self.rows.pop(entry_id, None)
+            if removed is not None:
+                del self.pair_index[(removed.user_id, removed.course_id)]
+                index_remove(self.course_index, removed.course_id, entry_id)
+                lsn = self.journal.delete(entry_id)
+        self.journal.wait(lsn)
+        return removed
+
+    def first(self, course_id: int) -> Optional[WaitlistRecord]:
+        with self._lock:
+            queue = self.course_index.get(course_id)
+            return None if not queue else self.rows[queue[0]]
+
+    def position(self, entry: WaitlistRecord) -> int:
+        with self._lock:
+            return bisect_left(self.course_index.get(entry.course_id, []), entry.id) + 1
+
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[WaitlistRecord]:
+        rows = self.rows
+        with self._lock:
+            return [rows[i] for i in _slice(self.course_index.get(course_id, []), skip, limit, after)]
+
+    def count_for_course(self, course_id: int) -> int:
+        return len(self.course_index.get(course_id, ()))
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def clear(self):
+        self.rows.clear()
+        self.pair_index.clear()
+        self.course_index.clear()
+        self.ids.reset()
+
+
+class MemoryStorage(Storage):
+    """The default backend: everything lives in this process."""
+
+    inline_reads = True
+
+    def __init__(self, enrollment_table: str = "dict"):
+        self.lock = threading.RLock()
+        self.log = None
+        self.snapshots = None  # snapshot.SnapshotWriter, when periodic snapshots are on
+        self.users = MemoryUserRepository(self.lock)
+        self.courses = MemoryCourseRepository(self.lock)
+        if enrollment_table == "dict":
+            self.enrollments = MemoryEnrollmentRepository(self.lock)
+        elif enrollment_table == "columnar":
+            from app.core.storage.columnar import ColumnarEnrollmentRepository
+            self.enrollments = ColumnarEnrollmentRepository(self.lock)
+        else:
+            raise ValueError(f"Unknown enrollment table: {enrollment_table!r}")
+        self.waitlist = MemoryWaitlistRepository(self.lock)
+
+    def attach_log(self, log) -> None:
+        """Start recording every mutation to a ``wal.WriteAheadLog``."""
+        self.log = log
+        self.users.journal = wal.TableJournal(log, wal.TABLE_USERS)
+        self.courses.journal = wal.TableJournal(log, wal.TABLE_COURSES)
+        self.enrollments.journal = wal.TableJournal(log, wal.TABLE_ENROLLMENTS)
+        self.waitlist.journal = wal.TableJournal(log, wal.TABLE_WAITLIST)
+
+    def clear(self) -> None:
+        lsn = 0
+        with self.lock:
+            self.users.clear()
+            self.courses.clear()
+            self.enrollments.clear()
+            self.waitlist.clear()
+            if self.log is not None:
+                lsn = self.log.append(wal.encode_clear())
+        if lsn:
+            self.log.wait(lsn)
+
+    def close(self) -> None:
+        if self.snapshots is not None:
+            self.snapshots.stop()
+        if self.log is not None:
+            self.log.close()
@@ -0,0 +1,304 @@
+"""Point-in-time snapshots of the memory backend.
+
+A snapshot is a single file::
+
+    header | enrollments section | users section | courses section | waitlist section
+
+The header (``HEADER``, 120 bytes) carries a magic string, the format
+version, the write-ahead-log sequence number the snapshot covers, the next id
+of every table, per-section record counts and byte lengths, and a crc32 over
+all sections. Version 1 snapshots, written before courses had a capacity and
+a waitlist, have a 96-byte header without the waitlist fields and are still
+loaded.
+
+Users, courses and waitlist entries are ``codec`` records, decoded in bulk on
+load. Enrollments, by far the largest table, are stored column by column
+(``int64`` ids, user ids and course ids, then one role byte each) so that the
+loader can view the columns of the memory-mapped file in place, build the
+indexes straight from them, and only materialize an ``EnrollmentRecord``
+when a row is actually read (``SnapshotRows``).
+
+Loading bypasses pydantic validation entirely: everything in a snapshot was
+validated when it was first written.
+"""
+from __future__ import annotations
+
+import gc
+import heapq
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from dataclasses import dataclass
+
+from app.core.storage import codec, wal
+from app.core.storage.records import EnrollmentRecord
+
+MAGIC = b"CEMSSNAP"
+VERSION = 2
+# magic, version, flags, lsn, next ids (4), record counts (4), section lengths (4), crc32
+HEADER = struct.Struct("<8sHHQ4Q4Q4QI")
+HEADER_V1 = struct.Struct("<8sHHQ3Q3Q3QI")
+_PREFIX = struct.Struct("<8sH")
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is corrupt or of an unknown version."""
+
+
+@dataclass(frozen=True)
+class SnapshotInfo:
+    lsn: int
+    users: int
+    courses: int
+    enrollments: int
+    size: int
+    waitlist: int = 0
+
+
+def _enrollment_columns(rows) -> tuple[bytes, int]:
+    """Lay ``(id, user_id, course_id, role code)`` rows out column by column."""
+    ids, user_ids, course_ids, roles = array("q"), array("q"), array("q"), bytearray()
+    for enrollment_id, user_id, course_id, role in rows:
+        ids.append(enrollment_id)
+        user_ids.append(user_id)
+        course_ids.append(course_id)
+        roles.append(role)
+    return ids.tobytes() + user_ids.tobytes() + course_ids.tobytes() + bytes(roles), len(ids)
+
+
+def write_snapshot(storage, path: str) -> SnapshotInfo:
+    """Write a consistent snapshot of ``storage`` to ``path`` atomically."""
+    # Records are immutable and replaced on update, so copying the row
+    # references under the lock is enough for a consistent view.
+    with storage.lock:
+        users = list(storage.users.rows.values())
+        courses = list(storage.courses.rows.values())
+        enrollments = storage.enrollments.export_rows()
+        waitlist = [storage.waitlist.rows[i] for i in sorted(storage.waitlist.rows)]
+        next_ids = (storage.users.ids.peek(), storage.courses.ids.peek(), storage.enrollments.ids.peek(),
+                    storage.waitlist.ids.peek())
+        lsn = storage.log.lsn if storage.log is not None else 0
+
+    enrollment_section, enrollment_count = _enrollment_columns(enrollments)
+    sections = (
+        enrollment_section,
+        b"".join(map(codec.encode_user, users)),
+        b"".join(map(codec.encode_course, courses)),
+        b"".join(map(codec.encode_waitlist_entry, waitlist)),
+    )
+    crc = 0
+    for section in sections:
+        crc = zlib.crc32(section, crc)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, lsn, *next_ids,
+        len(users), len(courses), enrollment_count, len(waitlist),
+        len(sections[1]), len(sections[2]), len(sections[0]), len(sections[3]), crc)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # The log is compacted behind this snapshot next: the rename must be durable first
+    wal.sync_directory(path)
+    return SnapshotInfo(
+        lsn, len(users), len(courses), enrollment_count, HEADER.size + sum(map(len, sections)), len(waitlist))
+
+
+def load_snapshot(storage, path: str) -> SnapshotInfo:
+    """Load a snapshot into an empty ``storage``; return what was loaded.
+
+    The file stays memory-mapped for as long as enrollment rows from it are
+    alive.
+    """
+    # Loading allocates millions of objects and creates no reference cycles;
+    # keeping the cyclic collector out of the way makes it markedly faster.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _load(storage, path)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _load(storage, path: str) -> SnapshotInfo:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, version = _PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a snapshot")
+    if version == VERSION:
+        header = HEADER
+        (_magic, _version, _flags, lsn, next_user, next_course, next_enrollment, next_entry,
+         user_count, course_count, enrollment_count, entry_count,
+         user_len, course_len, enrollment_len, entry_len, crc) = HEADER.unpack_from(view)
+    elif version == 1:
+        header = HEADER_V1
+        (_magic, _version, _flags, lsn, next_user, next_course, next_enrollment,
+         user_count, course_count, enrollment_count,
+         user_len, course_len, enrollment_len, crc) = HEADER_V1.unpack_from(view)
+        next_entry, entry_count, entry_len = 1, 0, 0
+    else:
+        raise SnapshotError(f"{path} has unsupported snapshot version {version}")
+    end = header.size + enrollment_len + user_len + course_len + entry_len
+    if len(view) < end or zlib.crc32(view[header.size:end]) != crc:
+        raise SnapshotError(f"{path} is corrupt")
+
+    offset = header.size
+    n = enrollment_count
+    columns = view[offset:offset + 8 * n * 3]
+    ids = columns[:8 * n].cast("q")
+    user_ids = columns[8 * n:16 * n].cast("q")
+    course_ids = columns[16 * n:].cast("q")
+    roles = view[offset + 24 * n:offset + enrollment_len]
+    offset += enrollment_len
+
+    users = []
+    for _ in range(user_count):
+        record, offset = codec.decode_user(view, offset)
+        users.append(record)
+    courses = []
+    for _ in range(course_count):
+        record, offset = codec.decode_course(view, offset, has_capacity=version > 1)
+        courses.append(record)
+    waitlist = []
+    for _ in range(entry_count):
+        record, offset = codec.decode_waitlist_entry(view, offset)
+        waitlist.append(record)
+
+    storage.users.load(users)
+    storage.courses.load(courses)
+    storage.enrollments.load_columns(ids, user_ids, course_ids, roles)
+    storage.waitlist.load(waitlist)
+    storage.users.ids.advance_past(next_user - 1)
+    storage.courses.ids.advance_past(next_course - 1)
+    storage.enrollments.ids.advance_past(next_enrollment - 1)
+    storage.waitlist.ids.advance_past(next_entry - 1)
+    return SnapshotInfo(lsn, user_count, course_count, enrollment_count, end, entry_count)
+
+
+class SnapshotRows(MutableMapping):
+    """Enrollment rows read lazily from snapshot columns, with later writes on top.
+
+    Behaves like the ``{id: EnrollmentRecord}`` dict the memory backend
+    normally uses. Rows from the snapshot are only turned into records when
+    read; deleting one records a tombstone, and new or replaced rows go
+    to an ordinary dict overlay.
+    """
+
+    def __init__(self, ids, user_ids, course_ids, roles):
+        self._ids = ids
+        self._user_ids = user_ids
+        self._course_ids = course_ids
+        self._roles = roles
+        self._deleted = set()
+        self._overlay = {}
+
+    def _position(self, key) -> int:
+        ids = self._ids
+        i = bisect_left(ids, key)
+        if i < len(ids) and ids[i] == key and key not in self._deleted:
+            return i
+        return -1
+
+    def _build(self, i: int) -> EnrollmentRecord:
+        return EnrollmentRecord(
+            id=self._ids[i], user_id=self._user_ids[i], course_id=self._course_ids[i],
+            role=codec.ENROLLMENT_ROLES[self._roles[i]])
+
+    def __getitem__(self, key) -> EnrollmentRecord:
+        found = self._overlay.get(key)
+        if found is not None:
+            return found
+        i = self._position(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._build(i)
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or self._position(key) >= 0
+
+    def __setitem__(self, key, value):
+        if self._position(key) >= 0:
+            self._deleted.add(key)
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key in self._overlay:
+            del self._overlay[key]
+            return
+        if self._position(key) < 0:
+            raise KeyError(key)
+        self._deleted.add(key)
+
+    def __iter__(self):
+        deleted = self._deleted
+        live = (key for key in self._ids if key not in deleted)
+        return heapq.merge(live, sorted(self._overlay))
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._deleted) + len(self._overlay)
+
+    def freeze(self) -> "SnapshotRows":
+        """A point-in-time copy sharing the (read-only) columns."""
+        frozen = SnapshotRows(self._ids, self._user_ids, self._course_ids, self._roles)
+        frozen._deleted = set(self._deleted)
+        frozen._overlay = dict(self._overlay)
+        return frozen
+
+    def tuples(self):
+        """``(id, user_id, course_id, role code)`` for every live row, in id order."""
+        deleted = self._deleted
+        from_snapshot = (
+            row for row in zip(self._ids, self._user_ids, self._course_ids, self._roles)
+            if row[0] not in deleted)
+        overlay = self._overlay
+        return heapq.merge(from_snapshot, (codec.enrollment_row(overlay[key]) for key in sorted(overlay)))
+
+
+class SnapshotWriter:
+    """Writes a snapshot every ``interval`` seconds and compacts the log behind it."""
+
+    def __init__(self, storage, path: str, interval: float):
+        self.storage = storage
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def snapshot(self) -> SnapshotInfo:
+        info = write_snapshot(self.storage, self.path)
+        if self.storage.log is not None:
+            self.storage.log.compact(info.lsn)
+        return info
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception:
+                # A full disk or an I/O error may clear up; stopping would let the log grow without bound
+                logger.exception("Writing a snapshot to %s failed; retrying in %ss", self.path, self.interval)
+
+    def stop(self, final_snapshot: bool = True):
+        self._stopped.set()
+        self._thread.join()
+        if final_snapshot:
+            self.snapshot()
@@ -0,0 +1,511 @@
+"""SQLite storage backend.
+
+Runs in WAL mode so readers never block the writer, keeps a small pool of
+connections shared by the threadpool, and relies on sqlite3's per-connection
+statement cache (every query below is a constant string, so each is prepared
+once per connection). Ids come from a ``sequences`` table in blocks, which
+keeps them unique across several worker processes sharing one file.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Optional
+
+from app.core.sequence import IdSequence
+from app.core.storage.base import (
+    ConflictError, CourseRepository, EnrollmentRepository, Storage, UserRepository, WaitlistRepository)
+from app.core.storage.records import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    code TEXT NOT NULL,
+    access TEXT NOT NULL,
+    capacity INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS courses_code ON courses (code COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS courses_access ON courses (access, id);
+CREATE TABLE IF NOT EXISTS enrollments (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS enrollments_pair ON enrollments (user_id, course_id);
+CREATE INDEX IF NOT EXISTS enrollments_course ON enrollments (course_id, id);
+CREATE INDEX IF NOT EXISTS enrollments_user ON enrollments (user_id, id);
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    course_id INTEGER NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS waitlist_pair ON waitlist (user_id, course_id);
+CREATE INDEX IF NOT EXISTS waitlist_course ON waitlist (course_id, id);
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    next INTEGER NOT NULL
+);
+"""
+
+# Columns added since the first schema, added to database files created before them
+ADDED_COLUMNS = (
+    ("courses", "capacity", "INTEGER"),
+)
+
+# SQLite treats a negative LIMIT as "no limit".
+NO_LIMIT = -1
+
+
+def _limit(limit: Optional[int]) -> int:
+    return NO_LIMIT if limit is None else limit
+
+
+def _after(after: Optional[int]) -> int:
+    # Ids start at 1, so "past 0" is the first page.
+    return 0 if after is None else after
+
+
+class ConnectionPool:
+    """A fixed-size pool of connections to one database file."""
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._connections = [self._connect() for _ in range(size)]
+        for conn in self._connections:
+            self._idle.put(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Yield a connection inside an immediate (write-locked) transaction."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+class SQLiteIdSequence(IdSequence):
+    """Id sequence persisted in the ``sequences`` table, handed out in blocks."""
+
+    def __init__(self, pool: ConnectionPool, name: str, block_size: int = 64):
+        super().__init__()
+        self._pool = pool
+        self._name = name
+        self._block_size = block_size
+        self._limit = self._next  # empty local block
+        with pool.connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO sequences (name, next) VALUES (?, 1)", (name,))
+
+    def _fetch(self, count: int) -> int:
+        with self._pool.connection() as conn:
+            (first,) = conn.execute(
+                "UPDATE sequences SET next = next + ? WHERE name = ? RETURNING next - ?",
+                (count, self._name, count)).fetchone()
+        return first
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next >= self._limit:
+                self._next = self._fetch(self._block_size)
+                self._limit = self._next + self._block_size
+            value = self._next
+            self._next += 1
+        return value
+
+    def reserve(self, count: int) -> range:
+        if count < 0:
+            raise ValueError("count must not be negative")
+        with self._lock:
+            if self._limit - self._next >= count:
+                first = self._next
+                self._next += count
+            else:
+                first = self._fetch(count)
+        return range(first, first + count)
+
+    def advance_past(self, value: int):
+        with self._lock:
+            with self._pool.connection() as conn:
+                conn.execute(
+                    "UPDATE sequences SET next = MAX(next, ?) WHERE name = ?", (value + 1, self._name))
+            if self._next <= value:
+                self._limit = self._next
+
+    def peek(self) -> int:
+        with self._lock:
+            if self._next < self._limit:
+                return self._next
+            with self._pool.connection() as conn:
+                (value,) = conn.execute(
+                    "SELECT next FROM sequences WHERE name = ?", (self._name,)).fetchone()
+            return value
+
+    def reset(self, start: int = 1):
+        with self._lock:
+            with self._pool.connection() as conn:
+                conn.execute("UPDATE sequences SET next = ? WHERE name = ?", (start, self._name))
+            self._limit = self._next
+
+
+def _user(row) -> UserRecord:
+    return UserRecord(id=row[0], name=row[1], email=row[2], role=UserRole(row[3]))
+
+
+def _course(row) -> CourseRecord:
+    return CourseRecord(id=row[0], title=row[1], code=row[2], access=CourseAccess(row[3]), capacity=row[4])
+
+
+def _enrollment(row) -> EnrollmentRecord:
+    return EnrollmentRecord(
+        id=row[0], user_id=row[1], course_id=row[2], role=Enrollmentrole(row[3]))
+
+
+def _waitlist_entry(row) -> WaitlistRecord:
+    return WaitlistRecord(
+        id=row[0], user_id=row[1], course_id=row[2], role=Enrollmentrole(row[3]))
+
+
+class _SQLiteRepository:
+    def __init__(self, pool: ConnectionPool):
+        self._pool = pool
+
+    def _one(self, sql: str, params: tuple, build):
+        with self._pool.connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return None if row is None else build(row)
+
+    def _all(self, sql: str, params: tuple, build) -> list:
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [build(row) for row in rows]
+
+    def _write(self, sql: str, params: tuple):
+        try:
+            with self._pool.transaction() as conn:
+                return conn.execute(sql, params).fetchone()
+        except sqlite3.IntegrityError as exc:
+            raise ConflictError(str(exc)) from exc
+
+    def _existing(self, table: str, ids) -> set[int]:
+        # One constant statement for any number of ids, so it stays in the statement cache.
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(set(ids))),)).fetchall()
+        return {row[0] for row in rows}
+
+    def _count(self, table: str) -> int:
+        with self._pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class SQLiteUserRepository(_SQLiteRepository, UserRepository):
+    def __init__(self, pool: ConnectionPool):
+        super().__init__(pool)
+        self.ids = SQLiteIdSequence(pool, "users")
+
+    def get(self, user_id: int) -> Optional[UserRecord]:
+        return self._one("SELECT id, name, email, role FROM users WHERE id = ?", (user_id,), _user)
+
+    def exists(self, user_id: int) -> bool:
+        return self._one("SELECT 1 FROM users WHERE id = ?", (user_id,), bool) is not None
+
+    def existing(self, user_ids) -> set[int]:
+        return self._existing("users", user_ids)
+
+    def add(self, new_user: UserRecord) -> None:
+        self._write(
+            "INSERT INTO users (id, name, email, role) VALUES (?, ?, ?, ?)",
+            (new_user.id, new_user.name, new_user.email, new_user.role.value))
+
+    def add_many(self, new_users: list[UserRecord]) -> None:
+        try:
+            with self._pool.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO users (id, name, email, role) VALUES (?, ?, ?, ?)",
+                    [(u.id, u.name, u.email, u.role.value) for u in new_users])
+        except sqlite3.IntegrityError as exc:
+            raise ConflictError(str(exc)) from exc
+
+    def delete(self, user_id: int) -> Optional[UserRecord]:
+        row = self._write("DELETE FROM users WHERE id = ? RETURNING id, name, email, role", (user_id,))
+        return None if row is None else _user(row)
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[UserRecord]:
+        return self._all(
+            "SELECT id, name, email, role FROM users WHERE id > ? ORDER BY id LIMIT ? OFFSET ?",
+            (_after(after), _limit(limit), skip), _user)
+
+    def count(self) -> int:
+        return self._count("users")
+
+
+class SQLiteCourseRepository(_SQLiteRepository, CourseRepository):
+    def __init__(self, pool: ConnectionPool):
+        super().__init__(pool)
+        self.ids = SQLiteIdSequence(pool, "courses")
+
+    def get(self, course_id: int) -> Optional[CourseRecord]:
+        return self._one("SELECT id, title, code, access, capacity FROM courses WHERE id = ?", (course_id,), _course)
+
+    def exists(self, course_id: int) -> bool:
+        return self._one("SELECT 1 FROM courses WHERE id = ?", (course_id,), bool) is not None
+
+    def existing(self, course_ids) -> set[int]:
+        return self._existing("courses", course_ids)
+
+    def get_by_code(self, code: str) -> Optional[CourseRecord]:
+        return self._one(
+            "SELECT id, title, code, access, capacity FROM courses WHERE code = ? COLLATE NOCASE", (code,), _course)
+
+    def get_many_by_code(self, codes) -> dict[str, CourseRecord]:
+        rows = self._all(
+            "SELECT id, title, code, access, capacity FROM courses "
+            "WHERE code COLLATE NOCASE IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(codes)),), _course)
+        return {course.code.lower(): course for course in rows}
+
+    def add(self, new_course: CourseRecord) -> None:
+        self._write(
+            "INSERT INTO courses (id, title, code, access, capacity) VALUES (?, ?, ?, ?, ?)",
+            (new_course.id, new_course.title, new_course.code, new_course.access.value, new_course.capacity))
+
+    def replace(self, updated_course: CourseRecord) -> Optional[CourseRecord]:
+        try:
+            with self._pool.transaction() as conn:
+                row = conn.execute(
+                    "SELECT id, title, code, access, capacity FROM courses WHERE id = ?", (updated_course.id,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE courses SET title = ?, code = ?, access = ?, capacity = ? WHERE id = ?",
+                    (updated_course.title, updated_course.code, updated_course.access.value,
+                     updated_course.capacity, updated_course.id))
+        except sqlite3.IntegrityError as exc:
+            raise ConflictError(str(exc)) from exc
+        return _course(row)
+
+    def write_many(self, new_courses: list[CourseRecord], updated_courses: list[CourseRecord]) -> None:
+        # One transaction: a unique-index violation rolls every write back
+        try:
+            with self._pool.transaction() as conn:
+                for c in updated_courses:
+                    cursor = conn.execute(
+                        "UPDATE courses SET title = ?, code = ?, access = ?, capacity = ? WHERE id = ?",
+                        (c.title, c.code, c.access.value, c.capacity, c.id))
+                    if cursor.rowcount == 0:
+                        # Deleted since the caller read it; raising rolls back the writes before it too
+                        raise ConflictError(f"course {c.id} no longer exists")
+                conn.executemany(
+                    "INSERT INTO courses (id, title, code, access, capacity) VALUES (?, ?, ?, ?, ?)",
+                    [(c.id, c.title, c.code, c.access.value, c.capacity) for c in new_courses])
+        except sqlite3.IntegrityError as exc:
+            raise ConflictError(str(exc)) from exc
+
+    def delete(self, course_id: int) -> Optional[CourseRecord]:
+        row = self._write("DELETE FROM courses WHERE id = ? RETURNING id, title, code, access, capacity", (course_id,))
+        return None if row is None else _course(row)
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[CourseRecord]:
+        return self._all(
+            "SELECT id, title, code, access, capacity FROM courses WHERE id > ? ORDER BY id LIMIT ? OFFSET ?",
+            (_after(after), _limit(limit), skip), _course)
+
+    def list_by_access(self, access: CourseAccess, skip: int = 0, limit: Optional[int] = None,
+                       after: Optional[int] = None) -> list[CourseRecord]:
+        return self._all(
+            "SELECT id, title, code, access, capacity FROM courses WHERE access = ? AND id > ? ORDER BY id LIMIT ? OFFSET ?",
+            (access.value, _after(after), _limit(limit), skip), _course)
+
+    def count(self) -> int:
+        return self._count("courses")
+
+
+class SQLiteEnrollmentRepository(_SQLiteRepository, EnrollmentRepository):
+    def __init__(self, pool: ConnectionPool):
+        super().__init__(pool)
+        self.ids = SQLiteIdSequence(pool, "enrollments")
+
+    def get(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        return self._one(
+            "SELECT id, user_id, course_id, role FROM enrollments WHERE id = ?", (enrollment_id,), _enrollment)
+
+    def find(self, user_id: int, course_id: int) -> Optional[EnrollmentRecord]:
+        return self._one(
+            "SELECT id, user_id, course_id, role FROM enrollments WHERE user_id = ? AND course_id = ?",
+            (user_id, course_id), _enrollment)
+
+    def add(self, new_enrollment: EnrollmentRecord) -> None:
+        self._write(
+            "INSERT INTO enrollments (id, user_id, course_id, role) VALUES (?, ?, ?, ?)",
+            (new_enrollment.id, new_enrollment.user_id, new_enrollment.course_id, new_enrollment.role.value))
+
+    def add_within_capacity(self, new_enrollment: EnrollmentRecord, capacity: int) -> bool:
+        # The immediate transaction holds the write lock, so no other connection
+        # or process can take the last seat between the count and the insert.
+        try:
+            with self._pool.transaction() as conn:
+                (taken,) = conn.execute(
+                    "SELECT COUNT(*) FROM enrollments WHERE course_id = ?", (new_enrollment.course_id,)).fetchone()
+                if taken >= capacity:
+                    return False
+                conn.execute(
+                    "INSERT INTO enrollments (id, user_id, course_id, role) VALUES (?, ?, ?, ?)",
+                    (new_enrollment.id, new_enrollment.user_id, new_enrollment.course_id,
+                     new_enrollment.role.value))
+        except sqlite3.IntegrityError as exc:
+            raise ConflictError(str(exc)) from exc
+        return True
+
+    def add_many(self, new_enrollments: list[EnrollmentRecord]) -> list[bool]:
+        # A single transaction, so the whole batch costs one commit.
+        sql = ("INSERT INTO enrollments (id, user_id, course_id, role) VALUES (?, ?, ?, ?) "
+               "ON CONFLICT DO NOTHING")
+        with self._pool.transaction() as conn:
+            return [
+                conn.execute(sql, (e.id, e.user_id, e.course_id, e.role.value)).rowcount == 1
+                for e in new_enrollments]
+
+    def delete(self, enrollment_id: int) -> Optional[EnrollmentRecord]:
+        row = self._write(
+            "DELETE FROM enrollments WHERE id = ? RETURNING id, user_id, course_id, role", (enrollment_id,))
+        return None if row is None else _enrollment(row)
+
+    def list(self, skip: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return self._all(
+            "SELECT id, user_id, course_id, role FROM enrollments WHERE id > ? ORDER BY id LIMIT ? OFFSET ?",
+            (_after(after), _limit(limit), skip), _enrollment)
+
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return self._all(
+            "SELECT id, user_id, course_id, role FROM enrollments WHERE course_id = ? AND id > ? "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (course_id, _after(after), _limit(limit), skip), _enrollment)
+
+    def list_for_user(self, user_id: int, skip: int = 0, limit: Optional[int] = None,
+                      after: Optional[int] = None) -> list[EnrollmentRecord]:
+        return self._all(
+            "SELECT id, user_id, course_id, role FROM enrollments WHERE user_id = ? AND id > ? "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (user_id, _after(after), _limit(limit), skip), _enrollment)
+
+    def count_for_course(self, course_id: int) -> int:
+        return self._one("SELECT COUNT(*) FROM enrollments WHERE course_id = ?", (course_id,), lambda row: row[0])
+
+    def count(self) -> int:
+        return self._count("enrollments")
+
+
+class SQLiteWaitlistRepository(_SQLiteRepository, WaitlistRepository):
+    def __init__(self, pool: ConnectionPool):
+        super().__init__(pool)
+        self.ids = SQLiteIdSequence(pool, "waitlist")
+
+    def get(self, entry_id: int) -> Optional[WaitlistRecord]:
+        return self._one(
+            "SELECT id, user_id, course_id, role FROM waitlist WHERE id = ?", (entry_id,), _waitlist_entry)
+
+    def find(self, user_id: int, course_id: int) -> Optional[WaitlistRecord]:
+        return self._one(
+            "SELECT id, user_id, course_id, role FROM waitlist WHERE user_id = ? AND course_id = ?",
+            (user_id, course_id), _waitlist_entry)
+
+    def add(self, new_entry: WaitlistRecord) -> None:
+        self._write(
+            "INSERT INTO waitlist (id, user_id, course_id, role) VALUES (?, ?, ?, ?)",
+            (new_entry.id, new_entry.user_id, new_entry.course_id, new_entry.role.value))
+
+    def delete(self, entry_id: int) -> Optional[WaitlistRecord]:
+        row = self._write(
+            "DELETE FROM waitlist WHERE id = ? RETURNING id, user_id, course_id, role", (entry_id,))
+        return None if row is None else _waitlist_entry(row)
+
+    def first(self, course_id: int) -> Optional[WaitlistRecord]:
+        return self._one(
+            "SELECT id, user_id, course_id, role FROM waitlist WHERE course_id = ? ORDER BY id LIMIT 1",
+            (course_id,), _waitlist_entry)
+
+    def position(self, entry: WaitlistRecord) -> int:
+        return self._one(
+            "SELECT COUNT(*) FROM waitlist WHERE course_id = ? AND id <= ?",
+            (entry.course_id, entry.id), lambda row: row[0])
+
+    def list_for_course(self, course_id: int, skip: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> list[WaitlistRecord]:
+        return self._all(
+            "SELECT id, user_id, course_id, role FROM waitlist WHERE course_id = ? AND id > ? "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (course_id, _after(after), _limit(limit), skip), _waitlist_entry)
+
+    def count_for_course(self, course_id: int) -> int:
+        return self._one("SELECT COUNT(*) FROM waitlist WHERE course_id = ?", (course_id,), lambda row: row[0])
+
+    def count(self) -> int:
+        return self._count("waitlist")
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path: str, pool_size: int = 4):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            for table, column, declaration in ADDED_COLUMNS:
+                if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        self.users = SQLiteUserRepository(self.pool)
+        self.courses = SQLiteCourseRepository(self.pool)
+        self.enrollments = SQLiteEnrollmentRepository(self.pool)
+        self.waitlist = SQLiteWaitlistRepository(self.pool)
+
+    def clear(self) -> None:
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM waitlist")
+            conn.execute("DELETE FROM enrollments")
+            conn.execute("DELETE FROM courses")
+            conn.execute("DELETE FROM users")
+        self.users.ids.reset()
+        self.courses.ids.reset()
+        self.enrollments.ids.reset()
+        self.waitlist.ids.reset()
+
+    def close(self) -> None:
+        self.pool.close()
@@ -0,0 +1,310 @@
+"""Append-only write-ahead log for the memory backend.
+
+Every mutation of a ``MemoryStorage`` with a log attached is appended as one
+record::
+
+    uint32 body length | uint32 crc32(body) | uint64 lsn | body
+
+where the body is ``uint8 op | uint8 table | payload`` and the payload is the
+``codec`` encoding of the record (puts) or its id (deletes). On startup the
+log is replayed to rebuild the tables and their indexes; a torn record at the
+tail (crash mid-write) fails its length or checksum and is cut off.
+
+How often the log is fsynced is a trade between durability and throughput:
+
+``always``
+    fsync inside every append. Nothing acknowledged is ever lost.
+``group``
+    Group commit. Writers block until a background fsync covers their
+    record, and every writer that arrives while an fsync is running shares
+    the next one. A non-zero ``commit_window`` waits that long before each
+    fsync to build bigger batches, at the cost of latency.
+``interval``
+    Background fsync every ``interval`` seconds; writers do not wait. A crash
+    can lose up to ``interval`` seconds of acknowledged writes.
+``none``
+    Hand every record to the OS but never fsync. Survives a process crash,
+    not a power loss.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Optional
+
+from app.core.storage import codec
+
+HEADER = struct.Struct("<IIQ")
+OP = struct.Struct("<BB")
+
+OP_CLEAR = 0
+OP_PUT = 1
+OP_DELETE = 2
+
+TABLE_USERS = 1
+TABLE_COURSES = 2
+TABLE_ENROLLMENTS = 3
+TABLE_WAITLIST = 4
+
+FSYNC_POLICIES = ("always", "group", "interval", "none")
+
+# Bytes read at a time when scanning the log
+SCAN_BLOCK = 1 << 20
+
+
+def _decode_course(body: bytes, offset: int):
+    # Courses logged before they had a capacity end at the code
+    record, end = codec.decode_course(body, offset, has_capacity=False)
+    if end < len(body):
+        return codec.decode_course(body, offset)
+    return record, end
+
+
+_ENCODERS = {
+    TABLE_USERS: codec.encode_user,
+    TABLE_COURSES: codec.encode_course,
+    TABLE_ENROLLMENTS: codec.encode_enrollment,
+    TABLE_WAITLIST: codec.encode_waitlist_entry,
+}
+_DECODERS = {
+    TABLE_USERS: codec.decode_user,
+    TABLE_COURSES: _decode_course,
+    TABLE_ENROLLMENTS: codec.decode_enrollment,
+    TABLE_WAITLIST: codec.decode_waitlist_entry,
+}
+
+
+class WriteAheadLog:
+    """An append-only log file with a configurable fsync policy."""
+
+    def __init__(self, path: str, fsync: str = "group", commit_window: float = 0.0,
+                 interval: float = 0.01, last_lsn: int = 0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        self.commit_window = commit_window
+        self.interval = interval
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._compacting = threading.Lock()
+        self._lsn = last_lsn
+        self._durable = last_lsn
+        self._durable_changed = threading.Condition()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = None
+        if fsync in ("group", "interval"):
+            self._flusher = threading.Thread(target=self._run_flusher, name="wal-flusher", daemon=True)
+            self._flusher.start()
+
+    @property
+    def lsn(self) -> int:
+        """Sequence number of the last record appended."""
+        return self._lsn
+
+    def append(self, body: bytes) -> int:
+        """Append one record and return its log sequence number."""
+        with self._lock:
+            self._lsn += 1
+            lsn = self._lsn
+            self._file.write(HEADER.pack(len(body), zlib.crc32(body), lsn) + body)
+            if self.fsync == "always":
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            elif self.fsync == "none":
+                self._file.flush()
+        if self._flusher is not None:
+            self._wakeup.set()
+        return lsn
+
+    def wait(self, lsn: int):
+        """Block until ``lsn`` is durable, if the policy promises that to writers."""
+        if self.fsync != "group":
+            return
+        with self._durable_changed:
+            while self._durable < lsn and not self._closed:
+                self._durable_changed.wait()
+
+    def _sync(self):
+        with self._lock:
+            self._file.flush()
+            target = self._lsn
+            # A duplicate descriptor stays valid if compact() swaps the file meanwhile.
+            fd = os.dup(self._file.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._durable_changed:
+            self._durable = target
+            self._durable_changed.notify_all()
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait()
+            delay = self.interval if self.fsync == "interval" else self.commit_window
+            if delay and not self._closed:
+                # Let more writes pile onto this fsync.
+                time.sleep(delay)
+            self._wakeup.clear()
+            self._sync()
+            if self._closed:
+                return
+
+    def compact(self, upto_lsn: int):
+        """Drop every record up to ``upto_lsn``, e.g. once a snapshot covers them.
+
+        The records to keep are streamed into a new file while appends go on;
+        the append lock is only held to copy over what was appended meanwhile
+        and to swap the new file in.
+        """
+        with self._compacting:
+            with self._lock:
+                self._file.flush()
+                copied = self._file.tell()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                for lsn, header, body, _ in _scan(self.path, copied):
+                    if lsn > upto_lsn:
+                        f.write(header)
+                        f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                self._file.flush()
+                with open(self.path, "rb") as log, open(tmp_path, "ab") as f:
+                    log.seek(copied)
+                    shutil.copyfileobj(log, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._file.close()
+                os.replace(tmp_path, self.path)
+                sync_directory(self.path)
+                self._file = open(self.path, "ab")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._sync()
+        self._file.close()
+
+
+class TableJournal:
+    """Logs the mutations of one table to a ``WriteAheadLog``."""
+
+    def __init__(self, log: WriteAheadLog, table: int):
+        self._log = log
+        self._table = table
+        self._encode = _ENCODERS[table]
+
+    def put(self, record) -> int:
+        return self._log.append(OP.pack(OP_PUT, self._table) + self._encode(record))
+
+    def delete(self, record_id: int) -> int:
+        return self._log.append(OP.pack(OP_DELETE, self._table) + codec.ID.pack(record_id))
+
+    def wait(self, lsn: int):
+        self._log.wait(lsn)
+
+
+def sync_directory(path: str):
+    """fsync the directory holding ``path``, so a file just renamed into it survives a crash."""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def encode_clear() -> bytes:
+    return OP.pack(OP_CLEAR, 0)
+
+
+def _scan(path: str, limit: Optional[int] = None) -> Iterator[tuple[int, bytes, bytes, int]]:
+    """Yield ``(lsn, header, body, end offset)`` for every intact record, up to ``limit`` bytes in.
+
+    The log is read ``SCAN_BLOCK`` bytes at a time, so scanning takes constant memory.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if limit is not None:
+            size = min(size, limit)
+        block, offset, end = b"", 0, 0
+        while end + HEADER.size <= size:
+            if offset + HEADER.size > len(block):
+                block, offset = block[offset:] + f.read(max(SCAN_BLOCK, HEADER.size)), 0
+            length, crc, lsn = HEADER.unpack_from(block, offset)
+            if end + HEADER.size + length > size:
+                return
+            start = offset + HEADER.size
+            if start + length > len(block):
+                block = block[offset:] + f.read(max(SCAN_BLOCK, HEADER.size + length - (len(block) - offset)))
+                offset, start = 0, HEADER.size
+            body = block[start:start + length]
+            if zlib.crc32(body) != crc:
+                return
+            yield lsn, block[offset:start], body, end + HEADER.size + length
+            offset = start + length
+            end += HEADER.size + length
+
+
+def read_log(path: str) -> Iterator[tuple[int, bytes, int]]:
+    """Yield ``(lsn, body, end offset)`` for every intact record in the log."""
+    for lsn, _, body, end in _scan(path):
+        yield lsn, body, end
+
+
+def apply(storage, body: bytes):
+    """Apply one log record to a ``MemoryStorage``."""
+    op, table = OP.unpack_from(body)
+    if op == OP_CLEAR:
+        storage.clear()
+        return
+    repository = {
+        TABLE_USERS: storage.users,
+        TABLE_COURSES: storage.courses,
+        TABLE_ENROLLMENTS: storage.enrollments,
+        TABLE_WAITLIST: storage.waitlist,
+    }[table]
+    if op == OP_PUT:
+        record, _ = _DECODERS[table](body, OP.size)
+        repository.put(record)
+    elif op == OP_DELETE:
+        (record_id,) = codec.ID.unpack_from(body, OP.size)
+        repository.delete(record_id)
+    else:
+        raise ValueError(f"Unknown log op: {op}")
+
+
+def replay(storage, path: str, after_lsn: int = 0) -> tuple[int, int]:
+    """Apply every record newer than ``after_lsn``; return the last lsn and the intact length."""
+    last_lsn, end = after_lsn, 0
+    for lsn, body, end in read_log(path):
+        if lsn > after_lsn:
+            apply(storage, body)
+            last_lsn = lsn
+    return last_lsn, end
+
+
+def open_log(storage, path: str, fsync: str = "group", commit_window: float = 0.0,
+             interval: float = 0.01, after_lsn: int = 0) -> WriteAheadLog:
+    """Rebuild ``storage`` from the log at ``path``, then attach the log for new writes."""
+    last_lsn, end = replay(storage, path, after_lsn)
+    if os.path.exists(path) and os.path.getsize(path) > end:
+        # Cut off a torn record so new appends follow the last intact one.
+        with open(path, "r+b") as f:
+            f.truncate(end)
+    log = WriteAheadLog(path, fsync, commit_window, interval, last_lsn)
+    storage.attach_log(log)
+    return log
@@ -0,0 +1,132 @@
+"""Helpers for endpoints that stream request or response bodies."""
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class LineSplitter:
+    """Splits a byte stream into text lines without buffering more than one line.
+
+    A line longer than ``max_line_bytes`` is dropped as it arrives and
+    reported as ``None``, so a malformed input cannot make the buffer grow
+    without bound.
+    """
+
+    def __init__(self, max_line_bytes: int):
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+        self._overflow = False
+
+    def feed(self, data: bytes) -> list[Optional[str]]:
+        lines = []
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            lines.append(self._line(data[start:end]))
+            start = end + 1
+        rest = data[start:]
+        if not self._overflow:
+            self._buffer += rest
+            if len(self._buffer) > self.max_line_bytes:
+                self._buffer.clear()
+                self._overflow = True
+        return lines
+
+    def close(self) -> list[Optional[str]]:
+        """The final line, if the stream did not end with a newline."""
+        if self._buffer or self._overflow:
+            return [self._line(b"")]
+        return []
+
+    def _line(self, tail: bytes) -> Optional[str]:
+        if self._overflow:
+            self._overflow = False
+            return None
+        if self._buffer:
+            tail = bytes(self._buffer) + tail
+            self._buffer.clear()
+        if len(tail) > self.max_line_bytes:
+            return None
+        return tail.decode("utf-8", errors="replace")
+
+
+def iter_line_chunks(data: Iterable[bytes], chunk_size: int, max_line_bytes: int) -> Iterator[list]:
+    """Group the lines of a byte stream into lists of at most ``chunk_size``."""
+    splitter = LineSplitter(max_line_bytes)
+    chunk = []
+    for block in data:
+        chunk.extend(splitter.feed(block))
+        while len(chunk) >= chunk_size:
+            yield chunk[:chunk_size]
+            chunk = chunk[chunk_size:]
+    chunk.extend(splitter.close())
+    if chunk:
+        yield chunk
+
+
+async def aiter_line_chunks(data: AsyncIterator[bytes], chunk_size: int, max_line_bytes: int) -> AsyncIterator[list]:
+    """``iter_line_chunks`` for an async byte stream such as ``Request.stream()``."""
+    splitter = LineSplitter(max_line_bytes)
+    chunk = []
+    async for block in data:
+        chunk.extend(splitter.feed(block))
+        while len(chunk) >= chunk_size:
+            yield chunk[:chunk_size]
+            chunk = chunk[chunk_size:]
+    chunk.extend(splitter.close())
+    if chunk:
+        yield chunk
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an ``Accept-Encoding`` header allows a gzip response.
+
+    An explicit ``gzip`` entry takes precedence over ``*`` (RFC 9110, 12.5.3).
+    """
+    wildcard = None
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        name = name.strip().lower()
+        if name == "gzip":
+            return _granted(params)
+        if name == "*" and wildcard is None:
+            wildcard = params
+    return wildcard is not None and _granted(wildcard)
+
+
+def _granted(params: str) -> bool:
+    """Whether a coding's parameters leave it acceptable, i.e. carry no zero q-value."""
+    q = params.strip().lower()
+    if not q.startswith("q="):
+        return True
+    try:
+        return float(q[2:]) > 0
+    except ValueError:
+        # A malformed q-value is no grant: serve identity rather than fail the request
+        return False
+
+
+def ndjson_response(chunks: Iterable[bytes], gzip: bool = False) -> StreamingResponse:
+    """Stream already-encoded NDJSON, marking it gzip-encoded if it is."""
+    headers = {"Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """A streaming response whose iterator reads the request body as it goes.
+
+    Starlette's ``StreamingResponse`` listens for client disconnects on
+    ``receive`` while it streams, which would swallow request body chunks the
+    iterator still has to read. Here the iterator is the only reader; a
+    disconnect surfaces as ``ClientDisconnect`` from ``Request.stream()``.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,75 @@
+"""Change counters behind the ETags of the hot read endpoints.
+
+The services bump a key after every write that changes what a read returns:
+``("user", id)``, ``("course", id)`` and ``course_listing(access)`` for each
+access listing. A record's version starts at 0 when it is created, so only
+updates and deletes need a bump. An ETag is the version plus an epoch drawn when the
+counters start, so tags from before a restart or a reset never match.
+
+Counters live in this process. That matches the memory backend; with SQLite
+shared by several processes, a write made by another process is not seen
+and conditional requests may get a stale 304.
+
+Readers take the ETag *before* reading the record and writers bump *after*
+writing, so a tag may be older than the body it goes out with (costing one
+extra full response later) but never newer.
+"""
+import secrets
+import threading
+from typing import Hashable, Optional
+
+from fastapi import Response, status
+
+
+def course_listing(access) -> tuple:
+    """Key of the course listing for one access level."""
+    return ("courses", access)
+
+
+class VersionCounter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self.epoch = secrets.token_hex(4)
+
+    def version(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: Hashable):
+        with self._lock:
+            versions = self._versions
+            for key in keys:
+                versions[key] = versions.get(key, 0) + 1
+
+    def etag(self, key: Hashable) -> str:
+        return f'"{self.epoch}-{self._versions.get(key, 0)}"'
+
+    def reset(self):
+        """Forget every version and start a new epoch."""
+        with self._lock:
+            self._versions.clear()
+            self.epoch = secrets.token_hex(4)
+
+
+versions = VersionCounter()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` semantics: a weak comparison against any listed tag, or ``*``.
+
+    ``*`` matches whatever is there, so call this only once the record has
+    been read and the caller is allowed to see it; otherwise a missing or
+    forbidden record would answer 304.
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -1,17 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.core.config import settings
+from app.core.db import get_storage
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware, profiles
 from app.router.course import course_router
 from app.router.user import user_router
 from app.router.enrollment import Enrollment_router
+from app.router.change import change_router
+from app.router.metrics import metrics_router
+from app.router.profile import profile_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Flush and release the storage backend (e.g. the write-ahead log)
+    get_storage().close()
+
 
 app = FastAPI(
     title="Course Management API",
     description="API for managing users, courses, and enrollments",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if profiles.enabled:
+    app.add_middleware(ProfilingMiddleware, store=profiles)
+
 
 @app.get("/", tags=["root"])
-def read_root():
+async def read_root():
     """Root endpoint - API information and documentation."""
     return {
         "message": "Welcome to Course Management API"
@@ -22,6 +44,6 @@ def read_root():
 app.include_router(course_router, prefix="/api/v1", tags=["course"])
 app.include_router(user_router, prefix="/api/v1", tags=["user"])
 app.include_router(Enrollment_router, prefix="/api/v1", tags=["enrollment"])
-
-
-
+app.include_router(change_router, prefix="/api/v1", tags=["change"])
+app.include_router(profile_router, prefix="/api/v1", tags=["profile"])
+app.include_router(metrics_router)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query, status
+from app.core.aio import read
+from app.schemas.change import ChangeFeed
+from app.api.deps import is_admin_user
+from app.services.change import DEFAULT_CHANGES_LIMIT, ChangeService
+
+change_router = APIRouter(prefix="/changes", tags=["changes"])
+
+# Changes to users, courses and enrollments since a sequence number (Admin only)
+@change_router.get("/", status_code=status.HTTP_200_OK, response_model=ChangeFeed, responses={
+    200: {"description": "Changes after since, oldest first; without since, only the current next_since"},
+    403: {"description": "Admin privileges required"},
+    410: {"description": "Changes since this sequence were dropped from the log; resync from the full listings"}
+})
+async def get_changes(
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(DEFAULT_CHANGES_LIMIT, ge=1, le=10000),
+    current_user=Depends(is_admin_user)):
+    
+    return await read(ChangeService.get_changes, since, limit)
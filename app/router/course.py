@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends, status, Path, HTTPException
-from app.schemas.course import Course, CourseCreate, CourseAccess
+from fastapi import APIRouter, Depends, Request, Response, status, Path, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.aio import read, write
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.rendering import json_response, page_response
+from app.core.streaming import accepts_gzip, ndjson_response
+from app.core.versions import course_listing, etag_matches, not_modified, versions
+from app.schemas.course import CatalogUpsertResult, Course, CourseCatalogItem, CourseCreate, CourseAccess
+from app.schemas.enrollment import CourseSeats, Enrollment, WaitlistEntry
 from app.schemas.user import UserRole
-from app.services.course import CourseService
+from app.services.course import CourseService, course_cache
+from app.services.enrollment import EnrollmentService
+from app.services.export import ExportService, ExportTable
 from app.api.deps import is_admin_user, is_student_user
 
 course_router = APIRouter(prefix="/courses", tags=["courses"])
@@ -14,18 +23,107 @@ course_router = APIRouter(prefix="/courses", tags=["courses"])
     # 400: {"description": "Invalid input data"},
     # 403: {"description": "Admin privileges required"}
 })
-def create_course(
+async def create_course(
     course_create: CourseCreate, current_user=Depends(is_admin_user)):
-    return CourseService.create_course(course_create)
+    course = await write(CourseService.create_course, course_create)
+    return json_response(course, status_code=status.HTTP_201_CREATED)
+
+# Create or update many courses at once, matched by code (Admin only)
+@course_router.put("/catalog", status_code=status.HTTP_200_OK, response_model=CatalogUpsertResult, responses={
+    200: {"description": "Catalog applied; the response lists what changed"},
+    400: {"description": "Catalog too large or a code is repeated"},
+    409: {"description": "The catalog changed concurrently; nothing was written"},
+    422: {"description": "Invalid input data"}
+})
+async def upsert_catalog(
+    items: list[CourseCatalogItem], current_user=Depends(is_admin_user)):
+    return await write(CourseService.upsert_catalog, items)
+
+# Export every course as NDJSON, gzipped if the client accepts it (Admin only)
+@course_router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse, responses={
+    200: {"description": "One course per line, in id order", "content": {"application/x-ndjson": {}}},
+    403: {"description": "Admin privileges required"}
+})
+async def export_courses(request: Request, current_user=Depends(is_admin_user)):
+    
+    gzip = accepts_gzip(request.headers.get("accept-encoding"))
+    return ndjson_response(ExportService.export_table(ExportTable.COURSES, gzip), gzip)
+
 
 # Get course by ID (Public: can view PUBLIC_ACCESS courses, Admin: can view all)
 @course_router.get("/{course_id}", status_code=status.HTTP_200_OK, response_model=Course, responses={
     200: {"description": "Course retrieved successfully"},
+    304: {"description": "Course unchanged since the ETag sent in If-None-Match"},
     403: {"description": "Course access restricted"},
     404: {"description": "Course not found"}
 })
-def get_course(course_id: int, current_user=Depends(is_student_user)):
-    course_obj = CourseService.get_course(course_id)
+async def get_course(course_id: int, request: Request, current_user=Depends(is_student_user)):
+    # The tag is taken before the read, so it is never newer than the body. It is only compared once the
+    # course is known to exist and be visible: a client can send "*" or guess a tag it was never given
+    etag = versions.etag(("course", course_id))
+    cached = await read(CourseService.render_course, course_id)
+    
+    # Check access: ADMIN_ONLY_ACCESS requires admin role (cached entries included)
+    if cached.meta == CourseAccess.ADMIN_ONLY_ACCESS and current_user["role"] != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This course is admin-only. Access denied."
+        )
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(cached.body, media_type="application/json", headers=cached.headers)
+
+# Get the roster of a course (paginated)
+@course_router.get("/{course_id}/enrollments", status_code=status.HTTP_200_OK, response_model=list[Enrollment], responses={
+    200: {
+        "description": "Course enrollments retrieved successfully",
+        "headers": {NEXT_CURSOR_HEADER: {"description": "Cursor for the next page, if there is one"}},
+    },
+    400: {"description": "Invalid cursor"},
+    404: {"description": "Course not found"}
+})
+async def get_course_enrollments(
+    course_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    current_user=Depends(is_student_user)):
+    return page_response(await read(EnrollmentService.get_enrollments_for_course, course_id, skip, limit, cursor))
+
+# Get a course's capacity, seats taken and waitlist length
+@course_router.get("/{course_id}/seats", status_code=status.HTTP_200_OK, response_model=CourseSeats, responses={
+    200: {"description": "Seat counts retrieved successfully"},
+    404: {"description": "Course not found"}
+})
+async def get_course_seats(course_id: int, current_user=Depends(is_student_user)):
+    return json_response(await read(EnrollmentService.get_course_seats, course_id))
+
+# Get a course's waitlist, next in line first
+@course_router.get("/{course_id}/waitlist", status_code=status.HTTP_200_OK, response_model=list[WaitlistEntry], responses={
+    200: {
+        "description": "Course waitlist retrieved successfully",
+        "headers": {NEXT_CURSOR_HEADER: {"description": "Cursor for the next page, if there is one"}},
+    },
+    400: {"description": "Invalid cursor"},
+    404: {"description": "Course not found"}
+})
+async def get_course_waitlist(
+    course_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    current_user=Depends(is_student_user)):
+    return page_response(await read(EnrollmentService.get_waitlist_for_course, course_id, skip, limit, cursor))
+
+# Get course by code (Public: can view PUBLIC_ACCESS courses, Admin: can view all)
+@course_router.get("/by-code/{code}", status_code=status.HTTP_200_OK, response_model=Course, responses={
+    200: {"description": "Course retrieved successfully"},
+    403: {"description": "Course access restricted"},
+    404: {"description": "Course not found"}
+})
+async def get_course_by_code(code: str, current_user=Depends(is_student_user)):
+    course_obj = await read(CourseService.get_course_by_code, code)
     
     # Check access: ADMIN_ONLY_ACCESS requires admin role
     if course_obj.access == CourseAccess.ADMIN_ONLY_ACCESS and current_user["role"] != UserRole.ADMIN:
@@ -34,18 +132,18 @@ def get_course(course_id: int, current_user=Depends(is_student_user)):
             detail="This course is admin-only. Access denied."
         )
     
-    return course_obj
+    return json_response(course_obj)
 
 # Update course(Admin only)
 @course_router.put("/{course_id}", status_code=status.HTTP_200_OK, response_model=Course, responses={
     200: {"description": "Course updated successfully"},
    
 })
-def update_course(
+async def update_course(
     course_id: int, 
     course_update: CourseCreate = None, 
     current_user=Depends(is_admin_user)):
-    return CourseService.update_course(course_id, course_update)
+    return json_response(await write(CourseService.update_course, course_id, course_update))
 
 #Delete a course (Admin only)
 @course_router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT, responses={
@@ -54,17 +152,41 @@ def update_course(
     # 403: {"description": "Admin privileges required"}
 })
 
-def delete_course(
+async def delete_course(
     course_id: int, 
     current_user=Depends(is_admin_user)):
-    return CourseService.delete_course(course_id)
+    return await write(CourseService.delete_course, course_id)
 
 # Retrieve All courses
 @course_router.get("/access/{access}", status_code=status.HTTP_200_OK, response_model=list[Course], responses={
-    200: {"description": "Courses retrieved successfully"},
+    200: {
+        "description": "Courses retrieved successfully",
+        "headers": {NEXT_CURSOR_HEADER: {"description": "Cursor for the next page, if there is one"}},
+    },
+    304: {"description": "Listing unchanged since the ETag sent in If-None-Match"},
+    400: {"description": "Invalid cursor"},
     # 403: {"description": "User privileges required"}
 })
-def retrieve_all_courses(
-    access: CourseAccess, current_user=Depends(is_student_user)):
+async def retrieve_all_courses(
+    access: CourseAccess,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    current_user=Depends(is_student_user)):
     
-    return CourseService.retrieve_all_courses(access)
+    etag = versions.etag(course_listing(access))
+    # Rendered first, so a bad cursor is still a 400; a current page comes from the response cache
+    cached = await read(CourseService.render_courses, access, skip, limit, cursor)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(cached.body, media_type="application/json", headers=cached.headers)
+
+
+# Response cache counters (Admin only)
+@course_router.get("/cache/stats", status_code=status.HTTP_200_OK, responses={
+    200: {"description": "Hit, miss, eviction, expiry and invalidation counts of the course response cache"},
+    403: {"description": "Admin privileges required"}
+})
+async def course_cache_stats(current_user=Depends(is_admin_user)):
+    return course_cache.stats()
@@ -1,22 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.enrollment import Enrollment, EnrollmentCreate
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.core.aio import write
+from app.core.rendering import json_response
+from app.core.streaming import accepts_gzip, ndjson_response
+from app.schemas.enrollment import Enrollment, EnrollmentBatchResult, EnrollmentCreate, WaitlistEntry
 from app.schemas.user import UserRole
 from app.services.enrollment import EnrollmentService
+from app.services.export import ExportService, ExportTable
 
 
 Enrollment_router = APIRouter(prefix="/enrollments", tags=["enrollments"])
 
-from app.api.deps import is_student_user
+from app.api.deps import is_admin_user, is_student_user
 
-# Enroll a user in a course 
+# Enroll a user in a course, or waitlist them if the course is full
 @Enrollment_router.post("/", status_code=status.HTTP_201_CREATED, response_model=Enrollment, responses={
     201: {"description": "User enrolled successfully"},
+    202: {"model": WaitlistEntry, "description": "Course full; user added to its waitlist"},
     400: {"description": "Invalid input data"},
     404: {"description": "User or course not found"},
-    409: {"description": "User already enrolled in this course"}
+    409: {"description": "User already enrolled in or waitlisted for this course"}
 })
-def enroll_user_in_course(
+async def enroll_user_in_course(
     enrollment_create: EnrollmentCreate, current_user=Depends(is_student_user)):
-    return EnrollmentService.enroll_user_in_course(enrollment_create)
+    result = await write(EnrollmentService.enroll_user_in_course, enrollment_create)
+    if isinstance(result, WaitlistEntry):
+        return json_response(result, status_code=status.HTTP_202_ACCEPTED)
+    return json_response(result, status_code=status.HTTP_201_CREATED)
 
 
+# Enroll many users at once; every item gets its own result
+@Enrollment_router.post("/batch", status_code=status.HTTP_200_OK, response_model=EnrollmentBatchResult, responses={
+    200: {"description": "Batch processed; see each item's status_code"},
+    400: {"description": "Batch too large"},
+    422: {"description": "Invalid input data"}
+})
+async def enroll_users_in_courses(
+    enrollment_creates: list[EnrollmentCreate], current_user=Depends(is_student_user)):
+    return json_response(await write(EnrollmentService.enroll_users_in_courses, enrollment_creates))
+
+
+# Leave a course's waitlist
+@Enrollment_router.delete("/waitlist/{entry_id}", status_code=status.HTTP_200_OK, responses={
+    200: {"description": "Removed from the waitlist"},
+    404: {"description": "Waitlist entry not found"}
+})
+async def leave_waitlist(entry_id: int, current_user=Depends(is_student_user)):
+    return await write(EnrollmentService.leave_waitlist, entry_id)
+
+
+# Deregister from a course; the freed seat goes to the head of its waitlist
+@Enrollment_router.delete("/{enrollment_id}", status_code=status.HTTP_200_OK, responses={
+    200: {"description": "Enrollment removed successfully"},
+    404: {"description": "Enrollment not found"}
+})
+async def deregister_from_course(enrollment_id: int, current_user=Depends(is_student_user)):
+    return await write(EnrollmentService.deregister_student_from_course, enrollment_id)
+
+
+# Export every enrollment as NDJSON, gzipped if the client accepts it (Admin only)
+@Enrollment_router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse, responses={
+    200: {"description": "One enrollment per line, in id order", "content": {"application/x-ndjson": {}}},
+    403: {"description": "Admin privileges required"}
+})
+async def export_enrollments(request: Request, current_user=Depends(is_admin_user)):
+    
+    gzip = accepts_gzip(request.headers.get("accept-encoding"))
+    return ndjson_response(ExportService.export_table(ExportTable.ENROLLMENTS, gzip), gzip)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response, status
+from app.core.metrics import CONTENT_TYPE, metrics
+
+metrics_router = APIRouter(tags=["metrics"])
+
+# Request, service and threadpool metrics in the Prometheus text format
+@metrics_router.get("/metrics", status_code=status.HTTP_200_OK, response_class=Response, responses={
+    200: {"description": "Prometheus text exposition format", "content": {CONTENT_TYPE: {}}}
+})
+async def get_metrics():
+    
+    # Rendered on the event loop, where the threadpool gauges can be read
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from app.core.profiling import SavedProfile, profiles
+from app.schemas.profile import ProfileInfo, ProfiledFunction
+from app.api.deps import is_admin_user
+
+profile_router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+def _info(saved: SavedProfile) -> ProfileInfo:
+    return ProfileInfo(
+        id=saved.id, method=saved.method, path=saved.path, status=saved.status, duration_ms=saved.duration_ms,
+        created_at=saved.created_at, trigger=saved.trigger,
+        top=[ProfiledFunction(**function._asdict()) for function in saved.top],
+        hotspots=[ProfiledFunction(**function._asdict()) for function in saved.hotspots])
+
+
+# List the recent request profiles, newest first (Admin only)
+@profile_router.get("/", status_code=status.HTTP_200_OK, response_model=list[ProfileInfo], responses={
+    200: {"description": "Recent profiles; empty when profiling is off"},
+    403: {"description": "Admin privileges required"}
+})
+async def get_profiles(current_user=Depends(is_admin_user)):
+    
+    return [_info(saved) for saved in profiles.recent()]
+
+# Download one profile as a pstats file (Admin only)
+@profile_router.get("/{profile_id}", status_code=status.HTTP_200_OK, response_class=FileResponse, responses={
+    200: {"description": "pstats file, readable with python -m pstats", "content": {"application/octet-stream": {}}},
+    403: {"description": "Admin privileges required"},
+    404: {"description": "Profile not found"}
+})
+async def get_profile(profile_id: str, current_user=Depends(is_admin_user)):
+    
+    saved = profiles.get(profile_id)
+    if saved is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found")
+    return FileResponse(saved.file, media_type="application/octet-stream", filename=f"{saved.id}.prof")
@@ -1,7 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
-from app.schemas.user import User, UserCreate, UserRole
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Path, Query
+from app.core.aio import read, write
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.rendering import json_response, page_response
+from app.core.versions import etag_matches, not_modified, versions
+from fastapi.responses import StreamingResponse
+from app.core.streaming import BodyStreamingResponse, accepts_gzip, aiter_line_chunks, ndjson_response
+from app.schemas.enrollment import Enrollment
+from app.schemas.user import ImportFormat, User, UserCreate, UserRole
 from app.api.deps import is_admin_user, is_student_user
-from app.services.user import UserService
+from app.services.enrollment import EnrollmentService
+from app.services.export import ExportService, ExportTable
+from app.services.user import (
+    DEFAULT_IMPORT_CHUNK_SIZE, MAX_IMPORT_LINE_BYTES, UserImporter, UserService)
 
 user_router = APIRouter(prefix="/users", tags=["users"])
 
@@ -10,28 +21,99 @@ user_router = APIRouter(prefix="/users", tags=["users"])
     201: {"description": "User created successfully"},
     400: {"description": "Invalid input data"}
 })
-def create_user(
+async def create_user(
     user_create: UserCreate, current_user=Depends(is_admin_user)):
     
-    return UserService.create_user(user_create)
+    user = await write(UserService.create_user, user_create)
+    return json_response(user, status_code=status.HTTP_201_CREATED)
 
 
-# Retrieve all users 
+# Bulk import users from an NDJSON or CSV body (Admin only)
+@user_router.post("/import", status_code=status.HTTP_200_OK, responses={
+    200: {
+        "description": "NDJSON stream: an error event per rejected line, progress after each chunk, then done",
+        "content": {"application/x-ndjson": {}},
+    },
+    403: {"description": "Admin privileges required"}
+})
+async def import_users(
+    request: Request,
+    format: ImportFormat = Query(ImportFormat.NDJSON),
+    chunk_size: int = Query(DEFAULT_IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    current_user=Depends(is_admin_user)):
+    
+    importer = UserImporter(format)
+    
+    async def events():
+        async for lines in aiter_line_chunks(request.stream(), chunk_size, MAX_IMPORT_LINE_BYTES):
+            # Validation and storage writes block, so each chunk runs in the threadpool
+            for event in await write(importer.feed, lines):
+                yield json.dumps(event) + "\n"
+            if importer.aborted:
+                break
+        yield json.dumps(importer.summary()) + "\n"
+    
+    return BodyStreamingResponse(events(), media_type="application/x-ndjson")
+
+
+# Export every user as NDJSON, gzipped if the client accepts it (Admin only)
+@user_router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse, responses={
+    200: {"description": "One user per line, in id order", "content": {"application/x-ndjson": {}}},
+    403: {"description": "Admin privileges required"}
+})
+async def export_users(request: Request, current_user=Depends(is_admin_user)):
+    
+    gzip = accepts_gzip(request.headers.get("accept-encoding"))
+    return ndjson_response(ExportService.export_table(ExportTable.USERS, gzip), gzip)
+
+
+# Retrieve all users (optionally paginated with a cursor)
 @user_router.get("/", status_code=status.HTTP_200_OK, response_model=list[User], responses={
-    200: {"description": "List of users retrieved successfully"},
+    200: {
+        "description": "List of users retrieved successfully",
+        "headers": {NEXT_CURSOR_HEADER: {"description": "Cursor for the next page, if there is one"}},
+    },
+    400: {"description": "Invalid cursor"}
 })
-def get_all_users(current_user=Depends(is_student_user)):
+async def get_all_users(
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    current_user=Depends(is_student_user)):
     
-    return UserService.get_all_users()
+    return page_response(await read(UserService.get_all_users, limit, cursor))
 
-#Retrieve a user by ID
+#Retrieve a user by ID (conditional on If-None-Match)
 @user_router.get("/{user_id}", status_code=status.HTTP_200_OK, response_model=User, responses={
     200: {"description": "User retrieved successfully"},
+    304: {"description": "User unchanged since the ETag sent in If-None-Match"},
     404: {"description": "User not found"}
 })
-def get_user(user_id: int, current_user=Depends(is_student_user)):
+async def get_user(user_id: int, request: Request, current_user=Depends(is_student_user)):
+    
+    etag = versions.etag(("user", user_id))
+    # Read first: "*" or a guessed tag must not turn a missing user's 404 into a 304
+    user = await read(UserService.get_user, user_id)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return json_response(user, headers={"ETag": etag})
+
+# Retrieve the enrollments of a user (paginated)
+@user_router.get("/{user_id}/enrollments", status_code=status.HTTP_200_OK, response_model=list[Enrollment], responses={
+    200: {
+        "description": "User enrollments retrieved successfully",
+        "headers": {NEXT_CURSOR_HEADER: {"description": "Cursor for the next page, if there is one"}},
+    },
+    400: {"description": "Invalid cursor"},
+    404: {"description": "User not found"}
+})
+async def get_user_enrollments(
+    user_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    current_user=Depends(is_student_user)):
     
-    return UserService.get_user(user_id)
+    return page_response(await read(EnrollmentService.get_enrollments_for_user, user_id, skip, limit, cursor))
 
 # Delete user (Admin only)
 @user_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, responses={
@@ -39,8 +121,8 @@ def get_user(user_id: int, current_user=Depends(is_student_user)):
     404: {"description": "User not found"},
     403: {"description": "Admin privileges required"}
 })
-def delete_user(
+async def delete_user(
     user_id: int,
     current_user=Depends(is_admin_user)):
     
-    return UserService.delete_user(user_id)
+    return await write(UserService.delete_user, user_id)
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from enum import Enum
+from typing import Optional, Union
+
+from app.schemas.course import Course
+from app.schemas.enrollment import Enrollment
+from app.schemas.user import User
+
+
+class ChangeEntity(str, Enum):
+    USER = "user"
+    COURSE = "course"
+    ENROLLMENT = "enrollment"
+
+
+class Change(BaseModel):
+    seq: int = Field(description="Position in the change sequence")
+    entity: ChangeEntity
+    id: int = Field(description="Id of the changed record")
+    deleted: bool = Field(False, description="A tombstone: the record has been deleted")
+    data: Optional[Union[User, Course, Enrollment]] = Field(
+        None, description="The record as it is now; not set for a tombstone")
+
+
+class ChangeFeed(BaseModel):
+    changes: list[Change]
+    next_since: int = Field(description="Pass as since to get the changes after these")
+    has_more: bool = Field(description="More changes are waiting past next_since")
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
+from typing import Optional
 
 
 class CourseAccess(str, Enum):
@@ -12,6 +13,7 @@ class Course(BaseModel):
     code: str = Field(min_length=2, max_length=20, pattern="^[A-Z0-9]+$",
                       description="Course code (uppercase alphanumeric)")
     access: CourseAccess
+    capacity: Optional[int] = Field(None, gt=0, description="Number of seats; unlimited if not set")
     
     @field_validator('title')
     @classmethod
@@ -32,6 +34,7 @@ class CourseCreate(BaseModel):
     code: str = Field(min_length=2, max_length=20, pattern="^[A-Z0-9]+$", description="Course code (uppercase alphanumeric)")
     id: int = Field(gt=0, description="Course ID must be positive")
     access: CourseAccess
+    capacity: Optional[int] = Field(None, gt=0, description="Number of seats; unlimited if not set")
     
     @field_validator('title')
     @classmethod
@@ -45,4 +48,16 @@ class CourseCreate(BaseModel):
     def code_uppercase(cls, v):
         if not v or not v.strip():
             raise ValueError('Course code cannot be empty')
-        return v.upper().strip()
\ No newline at end of file
+        return v.upper().strip()
+
+
+class CourseCatalogItem(CourseCreate):
+    """One course of a catalog upsert, matched to the existing catalog by code."""
+    id: Optional[int] = Field(None, gt=0, description="Ignored; courses are matched by code")
+
+
+class CatalogUpsertResult(BaseModel):
+    created: list[str] = Field(description="Codes of the courses added")
+    updated: list[str] = Field(description="Codes of the courses whose title, access or capacity changed")
+    access_changed: list[str] = Field(description="Codes of the updated courses whose access changed")
+    unchanged: int = Field(description="Number of courses already up to date")
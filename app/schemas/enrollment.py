@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum 
+from typing import Optional
 
 
 
@@ -32,4 +33,35 @@ class EnrollmentCreate(BaseModel):
     def validate_ids(cls, v):
         if v <= 0:
             raise ValueError('IDs must be positive integers')
-        return v
\ No newline at end of file
+        return v
+
+
+class WaitlistEntry(BaseModel):
+    id: int = Field(gt=0, description="Waitlist entry ID; entries of a course are served in ID order")
+    user_id: int = Field(gt=0, description="User ID must be positive")
+    course_id: int = Field(gt=0, description="Course ID must be positive")
+    role: Enrollmentrole
+    position: int = Field(gt=0, description="Place in the course's waitlist, 1 being next")
+
+
+class CourseSeats(BaseModel):
+    course_id: int
+    capacity: Optional[int] = Field(description="Number of seats; unlimited if not set")
+    enrolled: int = Field(description="Seats taken")
+    available: Optional[int] = Field(description="Seats free; unlimited if not set")
+    waitlisted: int = Field(description="Users waiting for a seat")
+
+
+class EnrollmentBatchItem(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    status_code: int = Field(description="201, 202 if waitlisted, or the status the single-item endpoint would have returned")
+    enrollment: Optional[Enrollment] = None
+    waitlist_entry: Optional[WaitlistEntry] = None
+    detail: Optional[str] = None
+
+
+class EnrollmentBatchResult(BaseModel):
+    created: int
+    waitlisted: int = 0
+    failed: int
+    results: list[EnrollmentBatchItem]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class ProfiledFunction(BaseModel):
+    function: str = Field(description="Function name, file and line")
+    calls: int
+    total_ms: float = Field(description="Time in the function itself")
+    cumulative_ms: float = Field(description="Time in the function and everything it called")
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    created_at: datetime
+    trigger: str = Field(description="header (requested with X-Profile) or sample")
+    top: list[ProfiledFunction] = Field(description="The most expensive functions by cumulative time")
+    hotspots: list[ProfiledFunction] = Field(description="The most expensive functions by their own time")
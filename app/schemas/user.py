@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
 from enum import Enum
+from typing import Optional
 
 class UserRole(str, Enum):
     ADMIN = "administrator"
@@ -32,4 +33,13 @@ class UserCreate(BaseModel):
         if not v or not v.strip():
             raise ValueError('Name cannot be empty or whitespace only')
         return v.strip()
-    
\ No newline at end of file
+
+
+class UserImportRow(UserCreate):
+    """One line of a bulk import. Ids are allocated by the server, so ``id`` may be left out."""
+    id: Optional[int] = Field(None, gt=0, description="Ignored; kept for parity with UserCreate")
+
+
+class ImportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from app.schemas.change import Change, ChangeEntity, ChangeFeed
+from app.core.changes import ChangesExpired, changes
+from app.core.db import get_storage
+from app.core.metrics import instrument
+
+
+# Changes returned by one call when no limit is given
+DEFAULT_CHANGES_LIMIT = 500
+
+
+@instrument
+class ChangeService:
+
+    @staticmethod
+    def get_changes(since: Optional[int] = None, limit: int = DEFAULT_CHANGES_LIMIT) -> ChangeFeed:
+        """The changes after ``since``, each with its record as it is now or as a tombstone.
+
+        Without ``since`` no changes are returned, only the current end of the
+        sequence: the point to follow changes from after a full resync.
+        """
+        if since is None:
+            return ChangeFeed(changes=[], next_since=changes.head, has_more=False)
+        try:
+            batch = changes.since(since, limit)
+        except ChangesExpired:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Changes since this sequence are no longer available; resync from the full listings.")
+
+        storage = get_storage()
+        getters = {
+            ChangeEntity.USER: storage.users.get,
+            ChangeEntity.COURSE: storage.courses.get,
+            ChangeEntity.ENROLLMENT: storage.enrollments.get,
+        }
+        feed = []
+        for seq, (entity, record_id) in batch.changes:
+            record = getters[entity](record_id)
+            if record is None:
+                feed.append(Change(seq=seq, entity=entity, id=record_id, deleted=True))
+            else:
+                feed.append(Change(seq=seq, entity=entity, id=record_id, data=record.to_model()))
+        return ChangeFeed(changes=feed, next_since=batch.next_since, has_more=batch.has_more)
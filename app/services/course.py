@@ -1,12 +1,31 @@
 from fastapi import HTTPException, status
-from app.schemas.course import Course, CourseCreate, CourseAccess
+from app.schemas.change import ChangeEntity
+from app.schemas.course import CatalogUpsertResult, Course, CourseCatalogItem, CourseCreate, CourseAccess
 from app.schemas.user import UserRole
-from app.core.db import course
+from app.core.cache import CachedBody, ResponseCache
+from app.core.changes import changes
+from app.core.config import settings
+from app.core.db import get_storage
+from app.core.locks import course_key, record_locks
+from app.core.metrics import instrument
+from app.core.pagination import NEXT_CURSOR_HEADER, Page, paginate
+from app.core.storage import ConflictError, CourseRecord
+from app.core.rendering import render_json
+from app.core.versions import course_listing, versions
+from app.services.enrollment import EnrollmentService
 
 
+# Largest catalog accepted by upsert_catalog
+MAX_CATALOG_SIZE = 50000
+
+# Rendered bodies of get_course and the access listings, checked against their ETag
+course_cache = ResponseCache(settings.course_cache_size, settings.course_cache_ttl_s)
+
+
+@instrument
 class CourseService:
     @staticmethod
-    def create_course(course_create: CourseCreate):
+    def create_course(course_create: CourseCreate) -> Course:
         # Validation: Title must not be empty
         if not course_create.title or len(course_create.title.strip()) == 0:
             raise HTTPException(
@@ -17,33 +36,76 @@ class CourseService:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Code must not be empty.")
         
+        courses = get_storage().courses
+        
         # Validation: Code must be unique
-        for existing_course in course.values():
-            if existing_course.code.lower() == course_create.code.lower():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST, detail="Code must be unique.")
+        if courses.get_by_code(course_create.code) is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Code must be unique.")
         
-        course_id = len(course) + 1
-        new_course = Course(
+        course_id = courses.ids.next_id()
+        new_course = CourseRecord(
             id=course_id,
             title=course_create.title,
             code=course_create.code,
-            access=course_create.access
+            access=course_create.access,
+            capacity=course_create.capacity
         )
-        course[course_id] = new_course
-        return new_course
+        try:
+            courses.add(new_course)
+        except ConflictError:
+            # Lost a race with a concurrent create of the same code
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Code must be unique.")
+        versions.bump(course_listing(new_course.access))
+        changes.record(ChangeEntity.COURSE, course_id)
+        return new_course.to_model()
+    
+    @staticmethod
+    def get_course(course_id: int) -> Course:
+        found_course = get_storage().courses.get(course_id)
+        if found_course is not None:
+            return found_course.to_model()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found.")
     
     @staticmethod
-    def get_course(course_id: int):
-        if course_id in course:
-            return course[course_id]
+    def render_course(course_id: int) -> CachedBody:
+        """The JSON body and ETag of ``get_course``, served from the response cache while current.
+        
+        The entry's ``meta`` is the course's access level, for the caller's access check.
+        """
+        key = ("course", course_id)
+        etag = versions.etag(key)
+        cached = course_cache.get(key, etag)
+        if cached is not None:
+            return cached
+        course = CourseService.get_course(course_id)
+        return course_cache.put(key, etag, CachedBody(render_json(course), {"ETag": etag}, course.access))
+    
+    @staticmethod
+    def get_course_by_code(code: str) -> Course:
+        found_course = get_storage().courses.get_by_code(code)
+        if found_course is not None:
+            return found_course.to_model()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found.")
     
     @staticmethod
-    def update_course(course_id: int, course_update: CourseCreate):
-        if course_id not in course:
+    def update_course(course_id: int, course_update: CourseCreate) -> Course:
+        # Serialized with other updates and deletes of the course, so the versions bumped match the write
+        with record_locks.holding(course_key(course_id)):
+            updated_course = CourseService._update(course_id, course_update)
+        # A raised (or removed) capacity frees seats for the waitlist
+        EnrollmentService.promote_waitlist(course_id)
+        return updated_course
+    
+    @staticmethod
+    def _update(course_id: int, course_update: CourseCreate) -> Course:
+        courses = get_storage().courses
+        if not courses.exists(course_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Course not found.")
@@ -60,45 +122,140 @@ class CourseService:
                 status_code=status.HTTP_400_BAD_REQUEST, 
                 detail="Code must not be empty.")
         
-        # Validation: Code must be unique (excluding current course)
-        for existing_course_id, existing_course in course.items():
-            if existing_course_id != course_id and existing_course.code.lower() == course_update.code.lower():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Code must be unique.")
-        
-        updated_course = Course(
+        updated_course = CourseRecord(
             id=course_id,
             title=course_update.title,
             code=course_update.code,
-            access=course_update.access
+            access=course_update.access,
+            capacity=course_update.capacity
         )
-        course[course_id] = updated_course
-        return updated_course
+        # Validation: Code must be unique (excluding current course)
+        try:
+            previous = courses.replace(updated_course)
+        except ConflictError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Code must be unique.")
+        if previous is None:
+            # Deleted behind the service's back (e.g. directly in storage)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found.")
+        versions.bump(("course", course_id), course_listing(previous.access), course_listing(updated_course.access))
+        course_cache.discard(("course", course_id))
+        changes.record(ChangeEntity.COURSE, course_id)
+        return updated_course.to_model()
     
     @staticmethod
     def delete_course(course_id: int):
-        if course_id in course:
-            del course[course_id]
+        storage = get_storage()
+        with record_locks.holding(course_key(course_id)):
+            removed = storage.courses.delete(course_id)
+            if removed is not None:
+                # Nobody can join the queue while the stripe is held, and the course is gone after it
+                for entry in storage.waitlist.list_for_course(course_id):
+                    storage.waitlist.delete(entry.id)
+        if removed is not None:
+            versions.bump(("course", course_id), course_listing(removed.access))
+            course_cache.discard(("course", course_id))
+            changes.record(ChangeEntity.COURSE, course_id)
             return {"detail": "Course deleted successfully."}
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found.")
     
     @staticmethod
-    def retrieve_courses(access: CourseAccess):
-        if access == CourseAccess.PUBLIC_ACCESS:
-            return [c for c in course.values()
-                    if c.access == CourseAccess.PUBLIC_ACCESS]
-        elif access == CourseAccess.ADMIN_ONLY_ACCESS:
-            return [c for c in course.values()
-                    if c.access == CourseAccess.ADMIN_ONLY_ACCESS]
-        else:
+    def retrieve_courses(access: CourseAccess) -> list[Course]:
+        if access not in (CourseAccess.PUBLIC_ACCESS, CourseAccess.ADMIN_ONLY_ACCESS):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid access type.")
+        return CourseService.retrieve_all_courses(access).items
+    
+    @staticmethod
+    def retrieve_all_courses(access: CourseAccess, skip: int = 0, limit: int | None = None,
+                             cursor: str | None = None) -> Page:
+        courses = get_storage().courses
+        return paginate(
+            f"courses:{access.value}",
+            lambda skip, limit, after: courses.list_by_access(access, skip, limit, after),
+            skip, limit, cursor)
+    
+    @staticmethod
+    def render_courses(access: CourseAccess, skip: int = 0, limit: int | None = None,
+                       cursor: str | None = None) -> CachedBody:
+        """The JSON body and headers of one access-listing page, served from the response cache while current."""
+        key = ("courses", access, skip, limit, cursor)
+        etag = versions.etag(course_listing(access))
+        cached = course_cache.get(key, etag)
+        if cached is not None:
+            return cached
+        page = CourseService.retrieve_all_courses(access, skip, limit, cursor)
+        headers = {"ETag": etag}
+        if page.next_cursor is not None:
+            headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return course_cache.put(key, etag, CachedBody(render_json(page.items), headers))
     
     @staticmethod
-    def retrieve_all_courses(access: CourseAccess):
-        return [c for c in course.values() 
-                if c.access == access]
\ No newline at end of file
+    def upsert_catalog(items: list[CourseCatalogItem]) -> CatalogUpsertResult:
+        """Create or update a batch of courses, matched to existing courses by code.
+        
+        The whole batch is diffed against the catalog in one pass and written
+        in one storage call: either every change applies or, if a code clashes,
+        none does.
+        """
+        if len(items) > MAX_CATALOG_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A catalog upsert may hold at most {MAX_CATALOG_SIZE} courses.")
+        
+        # Validation: Codes must be unique within the batch
+        seen, repeated = set(), set()
+        for item in items:
+            code = item.code.lower()
+            (repeated if code in seen else seen).add(code)
+        if repeated:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Codes repeated in the catalog: {', '.join(sorted(c.upper() for c in repeated))}")
+        
+        courses = get_storage().courses
+        existing = courses.get_many_by_code(item.code for item in items)
+        
+        new_items, updated, access_changed = [], [], []
+        unchanged = 0
+        for item in items:
+            current = existing.get(item.code.lower())
+            if current is None:
+                new_items.append(item)
+            elif current.title != item.title or current.access != item.access or current.capacity != item.capacity:
+                updated.append(CourseRecord(
+                    id=current.id, title=item.title, code=current.code, access=item.access, capacity=item.capacity))
+                if current.access != item.access:
+                    access_changed.append(current.code)
+            else:
+                unchanged += 1
+        new_courses = [
+            CourseRecord(id=course_id, title=item.title, code=item.code, access=item.access, capacity=item.capacity)
+            for course_id, item in zip(courses.ids.reserve(len(new_items)), new_items)]
+        
+        try:
+            courses.write_many(new_courses, updated)
+        except ConflictError:
+            # Lost a race with a concurrent create or delete; nothing was written
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The catalog changed during the upsert; retry it.")
+        if new_courses or updated:
+            # A concurrent update may have moved a course since the diff, so refresh every listing
+            versions.bump(*(("course", course.id) for course in updated), *map(course_listing, CourseAccess))
+            for course in updated:
+                course_cache.discard(("course", course.id))
+            changes.record(ChangeEntity.COURSE, *(course.id for course in new_courses + updated))
+        for course in updated:
+            EnrollmentService.promote_waitlist(course.id)
+        return CatalogUpsertResult(
+            created=[course.code for course in new_courses],
+            updated=[course.code for course in updated],
+            access_changed=access_changed,
+            unchanged=unchanged)
@@ -1,90 +1,385 @@
 from fastapi import HTTPException, status
-from app.schemas.enrollment import Enrollment, EnrollmentCreate, Enrollmentrole
+from app.schemas.change import ChangeEntity
+from app.schemas.enrollment import (
+    CourseSeats, Enrollment, EnrollmentBatchItem, EnrollmentBatchResult, EnrollmentCreate, Enrollmentrole,
+    WaitlistEntry)
 from app.schemas.user import UserRole
-from app.core.db import enrollment, user, course
+from app.core.changes import changes
+from app.core.db import get_storage
+from app.core.locks import course_key, record_locks, user_key
+from app.core.metrics import instrument
+from app.core.pagination import Page, paginate
+from app.core.storage import ConflictError, CourseRecord, EnrollmentRecord, WaitlistRecord, to_models
+
+
+# Largest batch accepted by enroll_users_in_courses
+MAX_BATCH_SIZE = 5000
+
+ALREADY_ENROLLED = "User is already enrolled in this course"
+ALREADY_WAITLISTED = "User is already on the waitlist for this course"
 
 
 # Enrollment management service
+@instrument
 class EnrollmentService:
     
     @staticmethod
-    def enroll_user_in_course(enrollment_create: EnrollmentCreate) -> Enrollment:
+    def enroll_user_in_course(enrollment_create: EnrollmentCreate) -> Enrollment | WaitlistEntry:
+        """Enroll a user, or put them on the course's waitlist if every seat is taken."""
+        # Neither the user nor the course can be deleted between the checks and the insert
+        with record_locks.holding(user_key(enrollment_create.user_id), course_key(enrollment_create.course_id)):
+            result = EnrollmentService._enroll(enrollment_create)
+        if isinstance(result, WaitlistEntry) and EnrollmentService.promote_waitlist(enrollment_create.course_id):
+            # A seat was free after all and the queue has moved, maybe past this user
+            storage = get_storage()
+            promoted = storage.enrollments.find(enrollment_create.user_id, enrollment_create.course_id)
+            if promoted is not None:
+                return promoted.to_model()
+            entry = storage.waitlist.get(result.id)
+            if entry is not None:
+                return entry.to_model(storage.waitlist.position(entry))
+        return result
+    
+    @staticmethod
+    def _enroll(enrollment_create: EnrollmentCreate) -> Enrollment | WaitlistEntry:
+        storage = get_storage()
+        
         # Validate user exists
-        if enrollment_create.user_id not in user:
+        if not storage.users.exists(enrollment_create.user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="User not found")
         
         # Validate course exists
-        if enrollment_create.course_id not in course:
+        course = storage.courses.get(enrollment_create.course_id)
+        if course is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Course not found")
         
         # Validate user is not already enrolled in the course
-        for existing_enrollment in enrollment.values():
-            if (existing_enrollment.user_id == enrollment_create.user_id and 
-                existing_enrollment.course_id == enrollment_create.course_id):
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT, 
-                    detail="User is already enrolled in this course")
+        enrollments = storage.enrollments
+        if enrollments.find(enrollment_create.user_id, enrollment_create.course_id) is not None:
+            raise EnrollmentService._already_enrolled()
+        
+        if course.capacity is not None:
+            return EnrollmentService._claim_seat(course, enrollment_create)
         
         # Create new enrollment
-        enrollment_id = len(enrollment) + 1
-        new_enrollment = Enrollment(
+        enrollment_id = enrollments.ids.next_id()
+        new_enrollment = EnrollmentRecord(
             id=enrollment_id,
             user_id=enrollment_create.user_id,
             course_id=enrollment_create.course_id,
             role=enrollment_create.role
         )
-        enrollment[enrollment_id] = new_enrollment
-        return new_enrollment
+        try:
+            enrollments.add(new_enrollment)
+        except ConflictError:
+            # Lost a race with a concurrent enrollment of the same pair
+            raise EnrollmentService._already_enrolled()
+        changes.record(ChangeEntity.ENROLLMENT, enrollment_id)
+        return new_enrollment.to_model()
+    
+    @staticmethod
+    def _claim_seat(course: CourseRecord, enrollment_create: EnrollmentCreate) -> Enrollment | WaitlistEntry:
+        """Take a seat in a course with a capacity, or join the end of its waitlist.
+        
+        Nobody takes a seat ahead of the queue: while users are waiting, even
+        a free seat goes to the head of the waitlist, not to a newcomer.
+        """
+        storage = get_storage()
+        waitlist = storage.waitlist
+        if waitlist.find(enrollment_create.user_id, course.id) is not None:
+            raise EnrollmentService._already_waitlisted()
+        
+        if waitlist.count_for_course(course.id) == 0:
+            enrollments = storage.enrollments
+            new_enrollment = EnrollmentRecord(
+                id=enrollments.ids.next_id(),
+                user_id=enrollment_create.user_id,
+                course_id=course.id,
+                role=enrollment_create.role
+            )
+            try:
+                # Counting the seats taken and inserting is one atomic storage call
+                if enrollments.add_within_capacity(new_enrollment, course.capacity):
+                    changes.record(ChangeEntity.ENROLLMENT, new_enrollment.id)
+                    return new_enrollment.to_model()
+            except ConflictError:
+                raise EnrollmentService._already_enrolled()
+        
+        entry = WaitlistRecord(
+            id=waitlist.ids.next_id(),
+            user_id=enrollment_create.user_id,
+            course_id=course.id,
+            role=enrollment_create.role
+        )
+        try:
+            waitlist.add(entry)
+        except ConflictError:
+            raise EnrollmentService._already_waitlisted()
+        return entry.to_model(waitlist.position(entry))
+    
+    @staticmethod
+    def promote_waitlist(course_id: int) -> int:
+        """Enroll users from the head of a course's waitlist while it has free seats.
+        
+        Called whenever seats may have been freed (a deregistration, a raised
+        capacity); returns how many users were enrolled. Entries of users
+        deleted since they joined are dropped on the way.
+        """
+        storage = get_storage()
+        enrollments, waitlist = storage.enrollments, storage.waitlist
+        promoted = 0
+        while True:
+            course = storage.courses.get(course_id)
+            if course is None or (
+                    course.capacity is not None and enrollments.count_for_course(course_id) >= course.capacity):
+                return promoted
+            head = waitlist.first(course_id)
+            if head is None:
+                return promoted
+            with record_locks.holding(user_key(head.user_id), course_key(course_id)):
+                if waitlist.get(head.id) is None:
+                    # Left the queue, or promoted by a concurrent call
+                    continue
+                if not storage.users.exists(head.user_id) or enrollments.find(head.user_id, course_id) is not None:
+                    # Deleted, or enrolled by a promotion interrupted before it dequeued them
+                    waitlist.delete(head.id)
+                    continue
+                course = storage.courses.get(course_id)
+                if course is None:
+                    return promoted
+                new_enrollment = EnrollmentRecord(
+                    id=enrollments.ids.next_id(), user_id=head.user_id, course_id=course_id, role=head.role)
+                if course.capacity is None:
+                    enrollments.add(new_enrollment)
+                elif not enrollments.add_within_capacity(new_enrollment, course.capacity):
+                    return promoted
+                waitlist.delete(head.id)
+                changes.record(ChangeEntity.ENROLLMENT, new_enrollment.id)
+                promoted += 1
+    
+    @staticmethod
+    def enroll_users_in_courses(enrollment_creates: list[EnrollmentCreate]) -> EnrollmentBatchResult:
+        """Enroll many (user, course) pairs at once, reporting each item's outcome.
+        
+        Items that fail get the status the single-item endpoint would have
+        returned (404 or 409); the rest of the batch still goes through.
+        """
+        if len(enrollment_creates) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch may hold at most {MAX_BATCH_SIZE} enrollments")
+        
+        keys = {user_key(item.user_id) for item in enrollment_creates}
+        keys.update(course_key(item.course_id) for item in enrollment_creates)
+        with record_locks.holding(*keys):
+            result = EnrollmentService._enroll_many(enrollment_creates)
+        
+        waitlisted = [item for item in result.results if item.waitlist_entry is not None]
+        promoted = {course_id for course_id in {item.waitlist_entry.course_id for item in waitlisted}
+                    if EnrollmentService.promote_waitlist(course_id)}
+        if not promoted:
+            return result
+        # A seat was free after all: report the items whose user has been promoted since
+        enrollments = get_storage().enrollments
+        for item in waitlisted:
+            entry = item.waitlist_entry
+            enrolled = entry.course_id in promoted and enrollments.find(entry.user_id, entry.course_id)
+            if enrolled:
+                result.results[item.index] = EnrollmentBatchItem(
+                    index=item.index, status_code=status.HTTP_201_CREATED, enrollment=enrolled.to_model())
+                result.created += 1
+                result.waitlisted -= 1
+        return result
+    
+    @staticmethod
+    def _enroll_many(enrollment_creates: list[EnrollmentCreate]) -> EnrollmentBatchResult:
+        storage = get_storage()
+        enrollments = storage.enrollments
+        
+        # Validate users and courses exist, one lookup per table
+        known_users = storage.users.existing(item.user_id for item in enrollment_creates)
+        known_courses = storage.courses.existing(item.course_id for item in enrollment_creates)
+        # Courses with a capacity take their items one at a time, in order, through the seat counter
+        limited = {}
+        for course_id in known_courses:
+            course = storage.courses.get(course_id)
+            if course is not None and course.capacity is not None:
+                limited[course_id] = course
+        
+        results: list[EnrollmentBatchItem | None] = [None] * len(enrollment_creates)
+        pending = []
+        for index, item in enumerate(enrollment_creates):
+            if item.user_id not in known_users:
+                results[index] = EnrollmentBatchItem(
+                    index=index, status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            elif item.course_id not in known_courses:
+                results[index] = EnrollmentBatchItem(
+                    index=index, status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+            elif enrollments.find(item.user_id, item.course_id) is not None:
+                results[index] = EnrollmentService._already_enrolled_item(index)
+            elif item.course_id in limited:
+                results[index] = EnrollmentService._claim_seat_item(index, limited[item.course_id], item)
+            else:
+                pending.append(index)
+        
+        # Allocate ids for the whole batch in one step and insert it in one call
+        new_enrollments = [
+            EnrollmentRecord(
+                id=enrollment_id,
+                user_id=enrollment_creates[index].user_id,
+                course_id=enrollment_creates[index].course_id,
+                role=enrollment_creates[index].role)
+            for enrollment_id, index in zip(enrollments.ids.reserve(len(pending)), pending)]
+        added = enrollments.add_many(new_enrollments)
+        changes.record(ChangeEntity.ENROLLMENT, *(
+            new_enrollment.id for new_enrollment, was_added in zip(new_enrollments, added) if was_added))
+        
+        for index, new_enrollment, was_added in zip(pending, new_enrollments, added):
+            if was_added:
+                results[index] = EnrollmentBatchItem(
+                    index=index, status_code=status.HTTP_201_CREATED, enrollment=new_enrollment.to_model())
+            else:
+                # Repeated within the batch, or lost a race with a concurrent enrollment
+                results[index] = EnrollmentService._already_enrolled_item(index)
+        created = sum(1 for result in results if result.status_code == status.HTTP_201_CREATED)
+        waitlisted = sum(1 for result in results if result.status_code == status.HTTP_202_ACCEPTED)
+        return EnrollmentBatchResult(
+            created=created, waitlisted=waitlisted, failed=len(results) - created - waitlisted, results=results)
+    
+    @staticmethod
+    def _claim_seat_item(index: int, course: CourseRecord, item: EnrollmentCreate) -> EnrollmentBatchItem:
+        try:
+            outcome = EnrollmentService._claim_seat(course, item)
+        except HTTPException as exc:
+            return EnrollmentBatchItem(index=index, status_code=exc.status_code, detail=exc.detail)
+        if isinstance(outcome, WaitlistEntry):
+            return EnrollmentBatchItem(index=index, status_code=status.HTTP_202_ACCEPTED, waitlist_entry=outcome)
+        return EnrollmentBatchItem(index=index, status_code=status.HTTP_201_CREATED, enrollment=outcome)
     
     @staticmethod
-    def get_enrollments_for_course(course_id: int) -> list[Enrollment]:
-        if course_id not in course:
+    def get_enrollments_for_course(course_id: int, skip: int = 0, limit: int | None = None,
+                                   cursor: str | None = None) -> Page:
+        storage = get_storage()
+        if not storage.courses.exists(course_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Course not found")
-        return [e for e in enrollment.values() if e.course_id == course_id]
+        enrollments = storage.enrollments
+        return paginate(
+            f"course:{course_id}:enrollments",
+            lambda skip, limit, after: enrollments.list_for_course(course_id, skip, limit, after),
+            skip, limit, cursor)
     
     @staticmethod
-    def get_enrollments_for_user(user_id: int) -> list[Enrollment]:
-        if user_id not in user:
+    def get_enrollments_for_user(user_id: int, skip: int = 0, limit: int | None = None,
+                                 cursor: str | None = None) -> Page:
+        storage = get_storage()
+        if not storage.users.exists(user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found")
-        return [e for e in enrollment.values() if e.user_id == user_id]
+        enrollments = storage.enrollments
+        return paginate(
+            f"user:{user_id}:enrollments",
+            lambda skip, limit, after: enrollments.list_for_user(user_id, skip, limit, after),
+            skip, limit, cursor)
+    
+    @staticmethod
+    def get_course_seats(course_id: int) -> CourseSeats:
+        storage = get_storage()
+        course = storage.courses.get(course_id)
+        if course is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found")
+        enrolled = storage.enrollments.count_for_course(course_id)
+        return CourseSeats(
+            course_id=course_id,
+            capacity=course.capacity,
+            enrolled=enrolled,
+            available=None if course.capacity is None else max(course.capacity - enrolled, 0),
+            waitlisted=storage.waitlist.count_for_course(course_id))
+    
+    @staticmethod
+    def get_waitlist_for_course(course_id: int, skip: int = 0, limit: int | None = None,
+                                cursor: str | None = None) -> Page:
+        storage = get_storage()
+        if not storage.courses.exists(course_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found")
+        waitlist = storage.waitlist
+        
+        def with_positions(entries: list[WaitlistRecord]) -> list[WaitlistEntry]:
+            if not entries:
+                return []
+            first = waitlist.position(entries[0])
+            return [entry.to_model(position) for position, entry in enumerate(entries, first)]
+        
+        return paginate(
+            f"course:{course_id}:waitlist",
+            lambda skip, limit, after: waitlist.list_for_course(course_id, skip, limit, after),
+            skip, limit, cursor, with_positions)
+    
+    @staticmethod
+    def leave_waitlist(entry_id: int):
+        if get_storage().waitlist.delete(entry_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Waitlist entry not found")
+        return {"detail": "Removed from the waitlist"}
     
     @staticmethod
     def deregister_student_from_course(enrollment_id: int):
-        if enrollment_id not in enrollment:
+        EnrollmentService._deregister(enrollment_id)
+        return {"detail": "Enrollment removed successfully"}
+    
+    @staticmethod
+    def _deregister(enrollment_id: int):
+        removed = get_storage().enrollments.delete(enrollment_id)
+        if removed is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Enrollment not found")
-        
-        del enrollment[enrollment_id]
-        return {"detail": "Enrollment removed successfully"}
+        changes.record(ChangeEntity.ENROLLMENT, enrollment_id)
+        # The freed seat goes to the head of the course's waitlist
+        EnrollmentService.promote_waitlist(removed.course_id)
     
     @staticmethod
     def get_all_enrollments() -> list[Enrollment]:
-        return list(enrollment.values())
+        return to_models(get_storage().enrollments.list())
     
     @staticmethod
     def get_enrollment_details(enrollment_id: int) -> Enrollment:
-        if enrollment_id not in enrollment:
+        found_enrollment = get_storage().enrollments.get(enrollment_id)
+        if found_enrollment is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
                 detail="Enrollment not found")
-        return enrollment[enrollment_id]
+        return found_enrollment.to_model()
     
     @staticmethod
     def admin_deregister_student_from_course(enrollment_id: int):
-        if enrollment_id not in enrollment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="Enrollment not found")
-        
-        del enrollment[enrollment_id]
+        EnrollmentService._deregister(enrollment_id)
         return {"detail": "Enrollment removed by admin successfully"}
-        
+    
+    @staticmethod
+    def _already_enrolled() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT, 
+            detail=ALREADY_ENROLLED)
+    
+    @staticmethod
+    def _already_waitlisted() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=ALREADY_WAITLISTED)
+    
+    @staticmethod
+    def _already_enrolled_item(index: int) -> EnrollmentBatchItem:
+        return EnrollmentBatchItem(
+            index=index, status_code=status.HTTP_409_CONFLICT, detail=ALREADY_ENROLLED)
@@ -1,39 +1,147 @@
-from app.schemas.user import UserCreate, User
-from app.core.db import user
+import csv
+import json
+from typing import Optional
+from pydantic import ValidationError
+from app.schemas.change import ChangeEntity
+from app.schemas.user import ImportFormat, UserCreate, UserImportRow, User
+from app.core.changes import changes
+from app.core.db import get_storage
+from app.core.locks import record_locks, user_key
+from app.core.metrics import instrument
+from app.core.pagination import Page, paginate
+from app.core.storage import UserRecord
+from app.core.versions import versions
 from fastapi import HTTPException, status
 
+# Lines validated and inserted together by a bulk import
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+
+# Lines longer than this are rejected without being buffered in full
+MAX_IMPORT_LINE_BYTES = 64 * 1024
+
+CSV_IMPORT_COLUMNS = ("name", "email", "role")
+
+@instrument
 class UserService:
     
     @staticmethod
-    def create_user(user_create: UserCreate):
-        user_id = len(user) + 1
-        new_user = User(
+    def create_user(user_create: UserCreate) -> User:
+        users = get_storage().users
+        user_id = users.ids.next_id()
+        new_user = UserRecord(
             id=user_id,
             name=user_create.name,
             email=user_create.email,
             role=user_create.role
         )
-        user[user_id] = new_user
-        return new_user
+        users.add(new_user)
+        changes.record(ChangeEntity.USER, user_id)
+        return new_user.to_model()
     
     @staticmethod
-    def get_user(user_id: int):
-        if user_id in user:
-            return user[user_id]
+    def get_user(user_id: int) -> User:
+        found_user = get_storage().users.get(user_id)
+        if found_user is not None:
+            return found_user.to_model()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found")
     
     @staticmethod
-    def get_all_users():
-        return list(user.values())
+    def get_all_users(limit: int | None = None, cursor: str | None = None) -> Page:
+        return paginate("users", get_storage().users.list, 0, limit, cursor)
     
   
     @staticmethod
     def delete_user(user_id: int):
-        if user_id not in user:
+        with record_locks.holding(user_key(user_id)):
+            removed = get_storage().users.delete(user_id)
+        if removed is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found")
-        del user[user_id]
-        return {"detail": "User deleted successfully"}
\ No newline at end of file
+        versions.bump(("user", user_id))
+        changes.record(ChangeEntity.USER, user_id)
+        return {"detail": "User deleted successfully"}
+
+
+class UserImporter:
+    """Bulk user import, fed a chunk of input lines at a time.
+    
+    Each ``feed`` validates its lines, inserts the valid ones in one storage
+    call with a single block of ids, and returns the events to report: one
+    ``error`` per rejected line, then a ``progress`` summary. Nothing is kept
+    between chunks but the counters (and the CSV header), so memory stays
+    bounded however long the input is.
+    """
+    
+    def __init__(self, format: ImportFormat):
+        self.format = format
+        self.lines = 0
+        self.created = 0
+        self.failed = 0
+        self.aborted = False
+        self._header: Optional[list[str]] = None
+    
+    def feed(self, lines: list[Optional[str]]) -> list[dict]:
+        """Import a chunk of lines; ``None`` stands for a line over ``MAX_IMPORT_LINE_BYTES``."""
+        events = []
+        valid = []
+        for text in lines:
+            self.lines += 1
+            if text is None:
+                events.append(self._error("Line too long"))
+                continue
+            text = text.strip()
+            if not text:
+                continue
+            if self.format == ImportFormat.CSV and self._header is None:
+                events.extend(self._read_header(text))
+                if self.aborted:
+                    break
+                continue
+            try:
+                valid.append(UserImportRow.model_validate(self._parse(text)))
+            except ValidationError as exc:
+                events.append(self._error("; ".join(
+                    f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+                    for error in exc.errors())))
+            except ValueError as exc:
+                events.append(self._error(str(exc)))
+        
+        if valid:
+            users = get_storage().users
+            new_users = [
+                UserRecord(id=user_id, name=row.name, email=row.email, role=row.role)
+                for user_id, row in zip(users.ids.reserve(len(valid)), valid)]
+            users.add_many(new_users)
+            changes.record(ChangeEntity.USER, *(user.id for user in new_users))
+            self.created += len(valid)
+        events.append(self.summary("progress"))
+        return events
+    
+    def summary(self, event: str = "done") -> dict:
+        return {"event": event, "lines": self.lines, "created": self.created, "failed": self.failed}
+    
+    def _parse(self, text: str) -> dict:
+        if self.format == ImportFormat.NDJSON:
+            row = json.loads(text)
+            if not isinstance(row, dict):
+                raise ValueError("Expected a JSON object")
+            return row
+        values = next(csv.reader([text]))
+        if len(values) != len(self._header):
+            raise ValueError(f"Expected {len(self._header)} columns, got {len(values)}")
+        return dict(zip(self._header, values))
+    
+    def _read_header(self, text: str) -> list[dict]:
+        self._header = [column.strip().lower() for column in next(csv.reader([text]))]
+        missing = [column for column in CSV_IMPORT_COLUMNS if column not in self._header]
+        if missing:
+            self.aborted = True
+            return [self._error(f"CSV header is missing columns: {', '.join(missing)}")]
+        return []
+    
+    def _error(self, detail: str) -> dict:
+        self.failed += 1
+        return {"event": "error", "line": self.lines, "detail": detail}
@@ -0,0 +1,45 @@
+"""Shared helpers for the benchmark scripts."""
+import time
+
+
+def percentile(samples, pct):
+    """Return the ``pct`` percentile (0-100) of a list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_calls(fn, args_list):
+    """Call ``fn(*args)`` for every entry of ``args_list`` and return per-call latencies in µs.
+
+    Exceptions are swallowed so that expected failures (e.g. 409s) can be timed too.
+    """
+    latencies = []
+    clock = time.perf_counter
+    for args in args_list:
+        start = clock()
+        try:
+            fn(*args)
+        except Exception:
+            pass
+        latencies.append((clock() - start) * 1e6)
+    return latencies
+
+
+def summarize(latencies):
+    """Reduce a list of latencies (µs) to the figures the benchmarks report."""
+    return {
+        "p50_us": round(percentile(latencies, 50), 2),
+        "p99_us": round(percentile(latencies, 99), 2),
+        "mean_us": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as a fixed-width table."""
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).rjust(widths[c]) for c in columns))
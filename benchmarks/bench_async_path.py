@@ -0,0 +1,123 @@
+"""Request throughput of the async handlers versus the previous sync handlers.
+
+Both apps route to the same services; the sync app declares its handlers (and
+the admin dependency) with plain ``def``, so FastAPI runs each of them in the
+threadpool, as every route did before the async request path. Requests are
+driven concurrently over ``httpx.ASGITransport``, in-process, so the numbers
+are the framework and service cost without network I/O. Runs against the
+backend selected by ``APP_STORAGE_BACKEND``.
+
+    python -m benchmarks.bench_async_path --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, UserRecord
+from app.main import app as async_app
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import EnrollmentCreate
+from app.schemas.user import UserRole
+from app.services.enrollment import EnrollmentService
+from app.services.user import UserService
+from benchmarks._common import print_table
+
+
+def sync_app() -> FastAPI:
+    app = FastAPI()
+
+    def is_admin_user():
+        return UserRole.ADMIN
+
+    @app.get("/api/v1/users/{user_id}")
+    def get_user(user_id: int, current_user=Depends(is_admin_user)):
+        return UserService.get_user(user_id)
+
+    @app.get("/api/v1/users/{user_id}/enrollments")
+    def get_user_enrollments(user_id: int, current_user=Depends(is_admin_user)):
+        return EnrollmentService.get_enrollments_for_user(user_id).items
+
+    @app.post("/api/v1/enrollments/", status_code=201)
+    def enroll(enrollment_create: EnrollmentCreate, current_user=Depends(is_admin_user)):
+        return EnrollmentService.enroll_user_in_course(enrollment_create)
+
+    return app
+
+
+def seed(users, courses):
+    reset()
+    storage = get_storage()
+    for i in range(1, users + 1):
+        storage.users.add(UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+    for i in range(1, courses + 1):
+        storage.courses.add(CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+    storage.users.ids.advance_past(users)
+    storage.courses.ids.advance_past(courses)
+
+
+def workload(kind, users, courses, count):
+    """The (method, path, body) of each request; enrollments are distinct pairs."""
+    if kind == "get user":
+        return [("GET", f"/api/v1/users/{i % users + 1}", None) for i in range(count)]
+    if kind == "user enrollments":
+        return [("GET", f"/api/v1/users/{i % users + 1}/enrollments", None) for i in range(count)]
+    return [("POST", "/api/v1/enrollments/",
+             {"user_id": i % users + 1, "course_id": i // users % courses + 1, "role": "student"})
+            for i in range(count)]
+
+
+async def drive(app, requests, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(requests)
+
+        async def worker():
+            for method, path, body in queue:
+                response = await client.request(method, path, json=body)
+                assert response.status_code < 300, response.text
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def run(users, courses, count, concurrency):
+    apps = {"sync def": sync_app(), "async": async_app}
+    rows = []
+    for kind in ("get user", "user enrollments", "enroll"):
+        requests = workload(kind, users, courses, count)
+        for name, app in apps.items():
+            seed(users, courses)
+            if kind == "user enrollments":
+                EnrollmentService.enroll_users_in_courses([
+                    EnrollmentCreate(user_id=u, course_id=c, role="student")
+                    for u in range(1, users + 1) for c in range(1, 4)])
+            start = time.perf_counter()
+            asyncio.run(drive(app, requests, concurrency))
+            elapsed = time.perf_counter() - start
+            rows.append({
+                "workload": kind,
+                "handlers": name,
+                "requests": count,
+                "concurrency": concurrency,
+                "req_per_s": round(count / elapsed),
+                "us_per_req": round(elapsed / count * 1e6, 1),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.requests, args.concurrency)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Term rollover: reloading a catalog one course at a time versus one catalog upsert.
+
+The per-course path is what a rollover script does with ``POST /courses/``
+and ``PUT /courses/{id}``: look each code up, then create or update it. The
+upsert path sends the same catalog to ``CourseService.upsert_catalog``.
+Both run at the service level against a fresh memory backend.
+
+    python -m benchmarks.bench_catalog_upsert --courses 20000
+"""
+import argparse
+import random
+import time
+
+from app.core.db import set_storage
+from app.core.storage import MemoryStorage
+from app.schemas.course import CourseAccess, CourseCatalogItem, CourseCreate
+from app.services.course import CourseService
+from benchmarks._common import print_table
+
+
+def catalogs(count):
+    """The previous term's catalog and the new one: 10% new codes, 20% retitled, 5% access changes."""
+    rng = random.Random(42)
+    old = [(f"Course {i}", f"C{i}", CourseAccess.PUBLIC_ACCESS) for i in range(1, count + 1)]
+    new = []
+    for title, code, access in old:
+        roll = rng.random()
+        if roll < 0.2:
+            title += " (revised)"
+        elif roll < 0.25:
+            access = CourseAccess.ADMIN_ONLY_ACCESS
+        new.append((title, code, access))
+    new.extend((f"Course {i}", f"C{i}", CourseAccess.PUBLIC_ACCESS) for i in range(count + 1, count + count // 10 + 1))
+    return old, new
+
+
+def load(catalog):
+    CourseService.upsert_catalog([CourseCatalogItem(title=t, code=c, access=a) for t, c, a in catalog])
+
+
+def one_at_a_time(catalog):
+    for title, code, access in catalog:
+        payload = CourseCreate(id=1, title=title, code=code, access=access)
+        try:
+            current = CourseService.get_course_by_code(code)
+        except Exception:
+            CourseService.create_course(payload)
+        else:
+            if current.title != title or current.access != access:
+                CourseService.update_course(current.id, payload)
+
+
+def upsert(catalog):
+    load(catalog)
+
+
+def run(count):
+    old, new = catalogs(count)
+    rows = []
+    for name, fn in (("one_at_a_time", one_at_a_time), ("catalog_upsert", upsert)):
+        storage = MemoryStorage()
+        previous = set_storage(storage)
+        try:
+            load(old)
+            start = time.perf_counter()
+            fn(new)
+            elapsed = time.perf_counter() - start
+            assert storage.courses.count() == len(new)
+        finally:
+            set_storage(previous)
+        rows.append({
+            "path": name,
+            "catalog": len(new),
+            "seconds": round(elapsed, 3),
+            "us_per_course": round(elapsed / len(new) * 1e6, 2),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20_000)
+    args = parser.parse_args()
+    rows = run(args.courses)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Keeping a mirror in sync: re-fetching full dumps versus pulling ``GET /changes``.
+
+A downstream mirror of every user, course and enrollment refreshes after
+some of the records have been written. The full path downloads the three
+NDJSON exports, which is what mirrors did before the change feed; the delta
+path follows ``GET /changes`` from its last position, ``--limit`` changes per
+request. Both go through the HTTP stack in process with ``TestClient``;
+sizes are bytes on the wire (the exports are gzipped). Writes are updates of
+existing courses and new enrollments, through the services so they land in
+the change log. Also reports what recording the changes costs the write path.
+
+    python -m benchmarks.bench_changes --users 50000 --writes 10 1000 10000
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.changes import changes
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, EnrollmentRecord, UserRecord
+from app.main import app
+from app.schemas.course import CourseAccess, CourseCreate
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserRole
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+from benchmarks._common import print_table
+
+EXPORTS = ("/api/v1/users/export", "/api/v1/courses/export", "/api/v1/enrollments/export")
+
+
+def seed(users, courses):
+    reset()
+    storage = get_storage()
+    storage.users.add_many([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, users + 1)])
+    storage.courses.write_many([
+        CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS)
+        for i in range(1, courses + 1)], [])
+    storage.enrollments.add_many([
+        EnrollmentRecord(id=i, user_id=i, course_id=i % courses + 1, role=Enrollmentrole.STUDENT)
+        for i in range(1, users + 1)])
+    storage.users.ids.advance_past(users)
+    storage.courses.ids.advance_past(courses)
+    storage.enrollments.ids.advance_past(users)
+
+
+def write(count, users, courses):
+    """Alternate course updates and new enrollments; returns the seconds taken."""
+    start = time.perf_counter()
+    for i in range(count):
+        course_id = i % courses + 1
+        if i % 2:
+            CourseService.update_course(course_id, CourseCreate(
+                id=course_id, title=f"Course {course_id} v{i}", code=f"C{course_id}",
+                access=CourseAccess.PUBLIC_ACCESS))
+        else:
+            EnrollmentService.enroll_user_in_course(EnrollmentCreate(
+                user_id=i % users + 1, course_id=(i % users + 7) % courses + 1, role="student"))
+    return time.perf_counter() - start
+
+
+def full_sync(client):
+    start = time.perf_counter()
+    size = sum(client.get(path).num_bytes_downloaded for path in EXPORTS)
+    return time.perf_counter() - start, size, len(EXPORTS)
+
+
+def delta_sync(client, since, limit):
+    start = time.perf_counter()
+    size = requests = 0
+    while True:
+        response = client.get("/api/v1/changes/", params={"since": since, "limit": limit})
+        size += response.num_bytes_downloaded
+        requests += 1
+        body = response.json()
+        since = body["next_since"]
+        if not body["has_more"]:
+            return time.perf_counter() - start, size, requests
+
+
+def run(users, courses, write_counts, limit):
+    client = TestClient(app)
+    rows = []
+    for count in write_counts:
+        seed(users, courses)
+        since = client.get("/api/v1/changes/").json()["next_since"]
+        write_seconds = write(count, users, courses)
+        for name, sync in (("full exports", lambda: full_sync(client)),
+                           ("GET /changes", lambda: delta_sync(client, since, limit))):
+            elapsed, size, requests = sync()
+            rows.append({
+                "writes": count,
+                "sync": name,
+                "requests": requests,
+                "ms": round(elapsed * 1000, 1),
+                "kib": round(size / 1024),
+                "log_entries": len(changes),
+                "write_us": round(write_seconds / count * 1e6, 1),
+            })
+
+    # The cost recording adds to each write: the same writes with and without the log, best of 3 each
+    with_log = without_log = float("inf")
+    record = changes.record
+    for _ in range(3):
+        seed(users, courses)
+        with_log = min(with_log, write(10000, users, courses))
+        seed(users, courses)
+        changes.record = lambda *args: None
+        try:
+            without_log = min(without_log, write(10000, users, courses))
+        finally:
+            changes.record = record
+    print(f"write path: {with_log / 10000 * 1e6:.1f} us/write with the change log, "
+          f"{without_log / 10000 * 1e6:.1f} us/write without")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--writes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.writes, args.limit)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
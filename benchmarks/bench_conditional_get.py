@@ -0,0 +1,67 @@
+"""Polling cost of the hot read endpoints, with and without If-None-Match.
+
+Every endpoint is fetched once for its ETag, then polled ``--requests`` times
+unconditionally and again with the tag, through the full HTTP stack
+(``TestClient``). A 304 skips the storage read, the response models and
+serialization, and sends no body.
+
+    python -m benchmarks.bench_conditional_get --courses 500
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, UserRecord
+from app.main import app
+from app.schemas.course import CourseAccess
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+
+def seed(courses):
+    reset()
+    storage = get_storage()
+    storage.users.add(UserRecord(id=1, name="User 1", email="user1@example.com", role=UserRole.USER))
+    for i in range(1, courses + 1):
+        storage.courses.add(CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+
+
+def poll(client, path, requests, headers):
+    size = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        size += len(client.get(path, headers=headers).content)
+    return (time.perf_counter() - start) / requests * 1e6, size / requests
+
+
+def run(courses, requests):
+    seed(courses)
+    client = TestClient(app)
+    rows = []
+    for path in ("/api/v1/users/1", "/api/v1/courses/1", "/api/v1/courses/access/public_access"):
+        etag = client.get(path).headers["ETag"]
+        full_us, full_bytes = poll(client, path, requests, {})
+        cached_us, cached_bytes = poll(client, path, requests, {"If-None-Match": etag})
+        rows.append({
+            "path": path.removeprefix("/api/v1"),
+            "200_us": round(full_us, 1),
+            "304_us": round(cached_us, 1),
+            "200_bytes": int(full_bytes),
+            "304_bytes": int(cached_bytes),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    rows = run(args.courses, args.requests)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Course read rendering with and without the response cache.
+
+Times ``CourseService.render_course`` and ``render_courses`` (what the
+``GET /courses/{id}`` and ``GET /courses/access/{access}`` handlers call)
+with the cache disabled and enabled, over a skewed mix of course ids. A
+fraction of reads is preceded by a course update, which invalidates that
+course and its listing. Service level, against a fresh memory backend.
+
+    python -m benchmarks.bench_course_cache --courses 2000 --reads 50000
+"""
+import argparse
+import random
+import time
+
+from app.core.db import set_storage
+from app.core.storage import CourseRecord, MemoryStorage
+from app.schemas.course import CourseAccess, CourseCreate
+from app.services.course import CourseService, course_cache
+from benchmarks._common import print_table
+
+
+def run(courses, reads, write_ratio, page_size):
+    storage = MemoryStorage()
+    previous = set_storage(storage)
+    rng = random.Random(42)
+    # Zipf-like: a few courses get most of the reads
+    ids = [min(courses, int(rng.paretovariate(1.2))) for _ in range(reads)]
+    writes = {i for i in range(reads) if rng.random() < write_ratio}
+    rows = []
+    try:
+        for i in range(1, courses + 1):
+            storage.courses.add(CourseRecord(i, f"Course {i}", f"C{i}", CourseAccess.PUBLIC_ACCESS))
+        storage.courses.ids.advance_past(courses)
+        for size in (0, course_cache.max_entries or 10000):
+            course_cache.max_entries = size
+            course_cache.clear()
+            start = time.perf_counter()
+            for n, course_id in enumerate(ids):
+                if n in writes:
+                    CourseService.update_course(
+                        course_id, CourseCreate(id=course_id, title=f"Course {course_id} ({n})",
+                                                code=f"C{course_id}", access=CourseAccess.PUBLIC_ACCESS))
+                CourseService.render_course(course_id)
+                if n % 10 == 0:
+                    CourseService.render_courses(CourseAccess.PUBLIC_ACCESS, 0, page_size)
+            elapsed = time.perf_counter() - start
+            stats = course_cache.stats()
+            rows.append({
+                "cache": "off" if size == 0 else f"{size} entries",
+                "reads": reads + reads // 10,
+                "us_per_read": round(elapsed / (reads + reads // 10) * 1e6, 2),
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "invalidations": stats["invalidations"],
+            })
+    finally:
+        set_storage(previous)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=50_000)
+    parser.add_argument("--write-ratio", type=float, default=0.01)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    rows = run(args.courses, args.reads, args.write_ratio, args.page_size)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
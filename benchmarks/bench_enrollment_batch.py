@@ -0,0 +1,81 @@
+"""Enrollment throughput: one request per enrollment versus the batch endpoint.
+
+Runs through the full HTTP stack (``TestClient``) so that per-request
+overhead (routing, JSON, pydantic) is part of the numbers, against the
+backend selected by ``APP_STORAGE_BACKEND``.
+
+    python -m benchmarks.bench_enrollment_batch --enrollments 20000
+"""
+import argparse
+import random
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, UserRecord
+from app.main import app
+from app.schemas.course import CourseAccess
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+
+def seed(users, courses):
+    reset()
+    storage = get_storage()
+    for i in range(1, users + 1):
+        storage.users.add(UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+    for i in range(1, courses + 1):
+        storage.courses.add(CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+    storage.users.ids.advance_past(users)
+    storage.courses.ids.advance_past(courses)
+
+
+def make_items(users, courses, count):
+    rng = random.Random(42)
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add((rng.randint(1, users), rng.randint(1, courses)))
+    return [{"user_id": u, "course_id": c, "role": "student"} for u, c in sorted(pairs)]
+
+
+def run(users, courses, count, batch_sizes):
+    client = TestClient(app)
+    items = make_items(users, courses, count)
+    rows = []
+    for batch_size in batch_sizes:
+        seed(users, courses)
+        start = time.perf_counter()
+        if batch_size == 1:
+            for item in items:
+                client.post("/api/v1/enrollments/", json=item)
+        else:
+            for first in range(0, len(items), batch_size):
+                client.post("/api/v1/enrollments/batch", json=items[first:first + batch_size])
+        elapsed = time.perf_counter() - start
+        assert get_storage().enrollments.count() == count
+        rows.append({
+            "endpoint": "single" if batch_size == 1 else "batch",
+            "batch_size": batch_size,
+            "enrollments": count,
+            "requests": -(-count // batch_size),
+            "enrollments_per_s": round(count / elapsed),
+            "us_per_enrollment": round(elapsed / count * 1e6, 2),
+        })
+    reset()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--enrollments", type=int, default=10_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.enrollments, args.batch_sizes)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Enrollment latency as the enrollment table grows.
+
+Grows the table through each requested size and, at every checkpoint, times a
+batch of fresh enrollments plus a batch of duplicate (409) attempts. With the
+(user_id, course_id) index both should stay flat regardless of table size.
+
+    python -m benchmarks.bench_enrollment_duplicates --sizes 1000 10000 100000
+"""
+import argparse
+
+from app.core.db import reset
+from app.schemas.course import CourseAccess, CourseCreate
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserCreate, UserRole
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+from app.services.user import UserService
+from benchmarks._common import print_table, summarize, time_calls
+
+USERS = 1000
+
+
+def seed(max_enrollments):
+    reset()
+    for i in range(1, USERS + 1):
+        UserService.create_user(UserCreate(
+            id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+    for i in range(1, max_enrollments // USERS + 3):
+        CourseService.create_course(CourseCreate(
+            id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+
+
+def pairs():
+    """Yield every (user_id, course_id) pair, course-major."""
+    course_id = 1
+    while True:
+        for user_id in range(1, USERS + 1):
+            yield user_id, course_id
+        course_id += 1
+
+
+def run(sizes, batch):
+    seed(max(sizes) + batch)
+    source = pairs()
+    enrolled = []
+    rows = []
+    for size in sorted(sizes):
+        while len(enrolled) < size:
+            user_id, course_id = next(source)
+            EnrollmentService.enroll_user_in_course(
+                EnrollmentCreate(user_id=user_id, course_id=course_id, role=Enrollmentrole.STUDENT))
+            enrolled.append((user_id, course_id))
+
+        fresh = [(EnrollmentCreate(user_id=u, course_id=c, role=Enrollmentrole.STUDENT),)
+                 for u, c in (next(source) for _ in range(batch))]
+        duplicates = [(EnrollmentCreate(user_id=u, course_id=c, role=Enrollmentrole.STUDENT),)
+                      for u, c in enrolled[:batch]]
+        created = summarize(time_calls(EnrollmentService.enroll_user_in_course, fresh))
+        conflict = summarize(time_calls(EnrollmentService.enroll_user_in_course, duplicates))
+        enrolled.extend((args[0].user_id, args[0].course_id) for args in fresh)
+        rows.append({
+            "table_size": size,
+            "create_p50_us": created["p50_us"],
+            "create_p99_us": created["p99_us"],
+            "409_p50_us": conflict["p50_us"],
+            "409_p99_us": conflict["p99_us"],
+        })
+    reset()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--batch", type=int, default=1_000)
+    args = parser.parse_args()
+    rows = run(args.sizes, args.batch)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
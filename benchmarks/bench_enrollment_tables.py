@@ -0,0 +1,118 @@
+"""Compare the dict and columnar enrollment tables of the memory backend.
+
+Reports the memory each table holds after loading the same enrollments
+(measured with tracemalloc, so it covers rows and indexes) and the
+service-level throughput of enrolling, duplicate checks and reads.
+
+    python -m benchmarks.bench_enrollment_tables --enrollments 200000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from fastapi import HTTPException
+
+from app.core.db import set_storage
+from app.core.storage import CourseRecord, MemoryStorage, UserRecord
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserRole
+from app.services.enrollment import EnrollmentService
+from benchmarks._common import print_table
+
+TABLES = ("dict", "columnar")
+
+
+def make_pairs(users, courses, enrollments):
+    """Distinct (user id, course id) pairs, in random order."""
+    rng = random.Random(42)
+    pairs = set()
+    while len(pairs) < enrollments:
+        pairs.add((rng.randint(1, users), rng.randint(1, courses)))
+    pairs = sorted(pairs)
+    rng.shuffle(pairs)
+    return pairs
+
+
+def new_storage(table, users, courses):
+    storage = MemoryStorage(enrollment_table=table)
+    storage.users.load([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, users + 1)])
+    storage.courses.load([
+        CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS)
+        for i in range(1, courses + 1)])
+    return storage
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return {"ops_per_s": round(count / elapsed), "us_per_op": round(elapsed / count * 1e6, 2)}
+
+
+def run(users, courses, enrollments, reads):
+    pairs = make_pairs(users, courses, enrollments)
+    requests = [EnrollmentCreate(user_id=u, course_id=c, role=Enrollmentrole.STUDENT) for u, c in pairs]
+    rng = random.Random(7)
+    lookups = [rng.randint(1, enrollments) for _ in range(reads)]
+    rows = []
+    for table in TABLES:
+        storage = new_storage(table, users, courses)
+        previous = set_storage(storage)
+        try:
+            def enroll():
+                for request in requests:
+                    EnrollmentService.enroll_user_in_course(request)
+
+            def duplicates():
+                for request in requests[:reads]:
+                    try:
+                        EnrollmentService.enroll_user_in_course(request)
+                    except HTTPException:
+                        pass
+
+            def get_enrollment():
+                for enrollment_id in lookups:
+                    EnrollmentService.get_enrollment_details(enrollment_id)
+
+            def course_rosters():
+                for enrollment_id in lookups:
+                    EnrollmentService.get_enrollments_for_course(enrollment_id % courses + 1, 0, 50)
+
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            result = timed(enroll, len(requests))
+            gc.collect()
+            held = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            rows.append({"table": table, "workload": "enroll", **result})
+            rows.append({"table": table, "workload": "enroll_409", **timed(duplicates, reads)})
+            rows.append({"table": table, "workload": "get_enrollment", **timed(get_enrollment, reads)})
+            rows.append({"table": table, "workload": "course_roster", **timed(course_rosters, reads)})
+            for row in rows[-4:]:
+                row["table_mb"] = round(held / 2**20, 1)
+                row["bytes_per_row"] = round(held / enrollments)
+        finally:
+            set_storage(previous)
+            storage.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--courses", type=int, default=2_000)
+    parser.add_argument("--enrollments", type=int, default=200_000)
+    parser.add_argument("--reads", type=int, default=20_000)
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.enrollments, args.reads)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
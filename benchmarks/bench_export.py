@@ -0,0 +1,91 @@
+"""Full user-table dump: the list endpoint's path versus the streaming NDJSON export.
+
+The list path is what ``GET /users/`` does without a limit: build every
+``User`` model, then validate and serialize the whole list against
+``response_model=list[User]``. The export path consumes
+``ExportService.export_table`` chunk by chunk, as the streaming response does.
+Peak memory is measured with ``tracemalloc`` on top of the loaded table, in
+a second pass so tracing does not skew the timings.
+
+    python -m benchmarks.bench_export --users 200000
+"""
+import argparse
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+
+from app.core.db import set_storage
+from app.core.storage import MemoryStorage, UserRecord
+from app.schemas.user import User, UserRole
+from app.services.export import ExportService, ExportTable
+from app.services.user import UserService
+from benchmarks._common import print_table
+
+
+def list_endpoint():
+    adapter = TypeAdapter(list[User])
+    body = adapter.dump_json(adapter.validate_python(UserService.get_all_users().items))
+    yield body
+
+
+def export(gzip):
+    return ExportService.export_table(ExportTable.USERS, gzip)
+
+
+def timed(chunks):
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+def peak_memory(chunks):
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        for _ in chunks:
+            pass
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def run(users):
+    storage = MemoryStorage()
+    previous = set_storage(storage)
+    rows = []
+    try:
+        storage.users.add_many(
+            [UserRecord(i, f"User {i}", f"user{i}@example.com", UserRole.USER) for i in range(1, users + 1)])
+        for name, make in (("list_endpoint", list_endpoint), ("export", lambda: export(False)),
+                           ("export_gzip", lambda: export(True))):
+            first, total, size = timed(make())
+            peak = peak_memory(make())
+            rows.append({
+                "path": name,
+                "users": users,
+                "first_byte_ms": round(first * 1e3, 2),
+                "total_s": round(total, 3),
+                "body_mb": round(size / 2**20, 1),
+                "peak_mb": round(peak / 2**20, 1),
+            })
+    finally:
+        set_storage(previous)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    args = parser.parse_args()
+    rows = run(args.users)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
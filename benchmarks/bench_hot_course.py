@@ -0,0 +1,123 @@
+"""A registration rush: many concurrent enrollers on one course with few seats.
+
+Every student posts one enrollment to the same course through the HTTP stack
+(``httpx.ASGITransport``, in-process), with ``--concurrency`` requests in
+flight. The first ``--capacity`` get a seat (201), the rest join the waitlist
+(202). Then the enrolled students deregister concurrently and every freed
+seat is handed to the head of the waitlist. Each run checks that the course
+was never oversubscribed and that nobody holds both a seat and a place in
+the queue. Runs against the backend selected by ``APP_STORAGE_BACKEND``.
+
+    python -m benchmarks.bench_hot_course --students 5000 --capacity 300
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, UserRecord
+from app.main import app
+from app.schemas.course import CourseAccess
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+
+def seed(students, capacity):
+    reset()
+    storage = get_storage()
+    storage.users.add_many([
+        UserRecord(id=i, name=f"Student {i}", email=f"student{i}@example.com", role=UserRole.USER)
+        for i in range(1, students + 1)])
+    storage.courses.add(CourseRecord(id=1, title="Hot course", code="HOT1", access=CourseAccess.PUBLIC_ACCESS,
+                                     capacity=capacity))
+    storage.users.ids.advance_past(students)
+    storage.courses.ids.advance_past(1)
+
+
+async def rush(requests, concurrency):
+    """Send every ``(method, path, body)``; return (elapsed seconds, latencies, status codes)."""
+    latencies, statuses = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(requests)
+
+        async def worker():
+            for method, path, body in queue:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses.append(response.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, statuses
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def check(capacity):
+    storage = get_storage()
+    enrolled = {e.user_id for e in storage.enrollments.list_for_course(1)}
+    waiting = {e.user_id for e in storage.waitlist.list_for_course(1)}
+    assert len(enrolled) <= capacity, f"oversubscribed: {len(enrolled)} > {capacity}"
+    assert not enrolled & waiting, "users both enrolled and waitlisted"
+    return len(enrolled), len(waiting)
+
+
+def run(students, capacity, concurrency_levels):
+    rows = []
+    for concurrency in concurrency_levels:
+        seed(students, capacity)
+        enrolls = [("POST", "/api/v1/enrollments/", {"user_id": i, "course_id": 1, "role": "student"})
+                   for i in range(1, students + 1)]
+        elapsed, latencies, statuses = asyncio.run(rush(enrolls, concurrency))
+        enrolled, waiting = check(capacity)
+        assert statuses.count(201) == enrolled == min(capacity, students)
+        assert statuses.count(202) == waiting
+        rows.append({
+            "phase": "enroll",
+            "concurrency": concurrency,
+            "requests": students,
+            "req_per_s": round(students / elapsed),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "enrolled": enrolled,
+            "waitlisted": waiting,
+        })
+
+        seats = get_storage().enrollments.list_for_course(1)
+        drops = [("DELETE", f"/api/v1/enrollments/{e.id}", None) for e in seats]
+        elapsed, latencies, statuses = asyncio.run(rush(drops, concurrency))
+        enrolled, remaining = check(capacity)
+        assert statuses.count(200) == len(drops)
+        assert enrolled == min(capacity, waiting) and remaining == waiting - enrolled
+        rows.append({
+            "phase": "deregister+promote",
+            "concurrency": concurrency,
+            "requests": len(drops),
+            "req_per_s": round(len(drops) / elapsed),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "enrolled": enrolled,
+            "waitlisted": remaining,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--capacity", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    args = parser.parse_args()
+    rows = run(args.students, args.capacity, args.concurrency)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""What recording metrics costs: requests and service calls with and without it.
+
+The HTTP rows drive the app concurrently over ``httpx.ASGITransport``,
+in-process, once as configured and once as a copy with the same routes but
+without ``MetricsMiddleware``, to isolate the middleware; service timers stay
+on in both. The service rows call ``UserService.get_user``, the cheapest
+timed method, through its timer and through the bare function
+(``__wrapped__``). Also times rendering ``/metrics`` once every route has a
+series.
+
+    python -m benchmarks.bench_metrics --requests 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.db import get_storage, reset
+from app.core.metrics import metrics
+from app.core.storage import UserRecord
+from app.main import app
+from app.schemas.user import UserRole
+from app.services.user import UserService
+from benchmarks._common import print_table
+
+
+async def drive(target, count, concurrency):
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = iter(range(count))
+
+        async def worker():
+            for i in queue:
+                response = await client.get(f"/api/v1/users/{i % 1000 + 1}")
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i % 1000 + 1)
+    return (time.perf_counter() - start) / calls
+
+
+def run(count, concurrency, calls):
+    reset()
+    get_storage().users.add_many([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, 1001)])
+    bare = FastAPI(routes=app.routes)
+
+    rows = []
+    # Best of three runs, alternating, so warm-up does not favour either app
+    best = {"without middleware": float("inf"), "with middleware": float("inf")}
+    for _ in range(3):
+        for name, target in (("without middleware", bare), ("with middleware", app)):
+            best[name] = min(best[name], asyncio.run(drive(target, count, concurrency)))
+    for name, elapsed in best.items():
+        rows.append({"path": f"GET /users/{{id}} {name}", "calls": count,
+                     "per_s": round(count / elapsed), "us_each": round(elapsed / count * 1e6, 2)})
+
+    timed = UserService.get_user
+    bare_call = getattr(timed, "__wrapped__", timed)
+    for name, fn in (("UserService.get_user bare", bare_call), ("UserService.get_user timed", timed)):
+        elapsed = min(per_call(fn, calls) for _ in range(3))
+        rows.append({"path": name, "calls": calls, "per_s": round(1 / elapsed), "us_each": round(elapsed * 1e6, 2)})
+
+    start = time.perf_counter()
+    size = len(metrics.render())
+    elapsed = time.perf_counter() - start
+    rows.append({"path": f"render /metrics ({size} bytes)", "calls": 1, "per_s": round(1 / elapsed),
+                 "us_each": round(elapsed * 1e6, 2)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    rows = run(args.requests, args.concurrency, args.calls)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost of fetching a page deep into the user list: skip/limit offsets versus cursors.
+
+An offset page has to walk past every earlier row (SQLite) or slice an index
+from the start of the table; a cursor page seeks straight to the last id seen.
+Both columns time the repository ``list`` call behind ``GET /users/``, with
+``skip`` for offsets and ``after`` (what a cursor decodes to) for cursors.
+
+    python -m benchmarks.bench_pagination --users 200000 --backend sqlite
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.core.storage import MemoryStorage, UserRecord
+from app.core.storage.sqlite import SQLiteStorage
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+PAGE_SIZE = 100
+REPEATS = 50
+
+
+def make_storage(backend, directory):
+    if backend == "sqlite":
+        return SQLiteStorage(os.path.join(directory, "bench.db"))
+    return MemoryStorage()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn()
+    return (time.perf_counter() - start) / REPEATS * 1e6
+
+
+def run(users, backend):
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        storage = make_storage(backend, directory)
+        try:
+            storage.users.add_many(
+                [UserRecord(i, f"User {i}", f"user{i}@example.com", UserRole.USER) for i in range(1, users + 1)])
+            for depth in (0, users // 10, users // 2, users - PAGE_SIZE):
+                offset_us = timed(lambda: storage.users.list(depth, PAGE_SIZE))
+                cursor_us = timed(lambda: storage.users.list(0, PAGE_SIZE, after=depth))
+                rows.append({
+                    "backend": backend,
+                    "depth": depth,
+                    "offset_us": round(offset_us, 1),
+                    "cursor_us": round(cursor_us, 1),
+                })
+        finally:
+            storage.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="sqlite")
+    args = parser.parse_args()
+    rows = run(args.users, args.backend)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""What request profiling costs when it is off, armed and on.
+
+"off" is the app as it runs without ``APP_PROFILE_DIR``: no middleware, just
+the context-variable check in ``app.core.aio``. "armed" wraps it in
+``ProfilingMiddleware`` with a token set but never sent, which is what
+every request pays when profiling is enabled. "profiled" profiles every
+request (sample rate 1) and writes each pstats file, which is the price of
+the requests actually picked. Requests are sent one at a time over
+``httpx.ASGITransport``, in-process.
+
+    python -m benchmarks.bench_profiling --requests 5000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from app.core.db import get_storage, reset
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.core.storage import UserRecord
+from app.main import app
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+
+async def drive(target, count):
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for i in range(count):
+            response = await client.get(f"/api/v1/users/{i % 1000 + 1}")
+            assert response.status_code == 200
+        return time.perf_counter() - start
+
+
+def run(count):
+    reset()
+    get_storage().users.add_many([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, 1001)])
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        targets = {
+            "off": (app, count),
+            "armed": (ProfilingMiddleware(app, ProfileStore(directory, token="s3cret")), count),
+            # Profiled requests are much slower; fewer of them give the same precision
+            "profiled": (ProfilingMiddleware(app, ProfileStore(directory, sample_rate=1.0, keep=10)), count // 10),
+        }
+        best = {name: float("inf") for name in targets}
+        for _ in range(3):
+            for name, (target, requests) in targets.items():
+                best[name] = min(best[name], asyncio.run(drive(target, requests)) / requests)
+    for name, elapsed in best.items():
+        rows.append({"profiling": name, "req_per_s": round(1 / elapsed), "us_per_req": round(elapsed * 1e6, 1),
+                     "vs_off": f"{elapsed / best['off']:.2f}x"})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    rows = run(args.requests)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Storage records versus pydantic models as the stored row type.
+
+For a synthetic dataset, reports the memory held by a memory-backend store
+when its rows are pydantic models (what the repositories stored before the
+``records`` module) versus slotted records, and the per-object cost of
+building each kind of row and of turning a record into its response model.
+
+    python -m benchmarks.bench_records --users 200000 --enrollments 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from app.core.storage import CourseRecord, EnrollmentRecord, MemoryStorage, UserRecord
+from app.schemas.course import Course, CourseAccess
+from app.schemas.enrollment import Enrollment, Enrollmentrole
+from app.schemas.user import User, UserRole
+from benchmarks._common import print_table
+
+KINDS = {
+    "users": (User, UserRecord, lambda i: dict(
+        id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)),
+    "courses": (Course, CourseRecord, lambda i: dict(
+        id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS)),
+    "enrollments": (Enrollment, EnrollmentRecord, lambda i: dict(
+        id=i, user_id=i, course_id=i % 1000 + 1, role=Enrollmentrole.STUDENT)),
+}
+
+
+def store_size(kind, build, count):
+    """Bytes held by a memory store after loading ``count`` rows made by ``build``."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    storage = MemoryStorage()
+    getattr(storage, kind).load([build(i) for i in range(1, count + 1)])
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    storage.clear()
+    return held
+
+
+def per_call_us(fn, args, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(args)
+    return round((time.perf_counter() - start) / repeat * 1e6, 3)
+
+
+def run(counts, repeat):
+    rows = []
+    for kind, (model_cls, record_cls, fields) in KINDS.items():
+        count = counts[kind]
+        sample = fields(1)
+        record = record_cls(**sample)
+        model_bytes = store_size(kind, lambda i: model_cls.model_construct(**fields(i)), count)
+        record_bytes = store_size(kind, lambda i: record_cls(**fields(i)), count)
+        rows.append({
+            "table": kind,
+            "rows": count,
+            "model_mb": round(model_bytes / 2**20, 1),
+            "record_mb": round(record_bytes / 2**20, 1),
+            "saved": f"{1 - record_bytes / model_bytes:.0%}",
+            "validate_us": per_call_us(lambda f: model_cls(**f), sample, repeat),
+            "model_construct_us": per_call_us(lambda f: model_cls.model_construct(**f), sample, repeat),
+            "record_us": per_call_us(lambda f: record_cls(**f), sample, repeat),
+            "to_model_us": per_call_us(lambda r: r.to_model(), record, repeat),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--courses", type=int, default=20_000)
+    parser.add_argument("--enrollments", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=100_000)
+    args = parser.parse_args()
+    counts = {"users": args.users, "courses": args.courses, "enrollments": args.enrollments}
+    rows = run(counts, args.repeat)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Per-response cost of FastAPI's response_model pass versus rendering straight to JSON.
+
+For each route, the content its service returns is turned into a response
+three ways:
+
+- "response_model": what FastAPI does when a route returns a model. It
+  validates the model again against the route's own response field,
+  serializes it to Python values and ``json.dumps`` it into a ``JSONResponse``.
+- "orjson": ``app.core.rendering.json_response`` with orjson, as the routes
+  now do.
+- "pydantic": the same without orjson installed (pydantic's serializer).
+
+"saved_us" is what each request saves over the response_model pass, and
+"request_us" is the whole in-process request (``httpx.ASGITransport``) as
+served now, for scale.
+
+    python -m benchmarks.bench_rendering --rows 100
+"""
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.core import rendering
+from app.core.db import get_storage
+from app.core.rendering import json_response
+from app.main import app
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+from app.services.user import UserService
+from benchmarks._common import print_table
+from benchmarks.scenarios import Sizes, seed
+
+
+def route_field(method, path):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route.secure_cloned_response_field
+    raise LookupError(f"{method} {path}")
+
+
+def best_of(fn, count, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        best = min(best, (time.perf_counter() - start) / count)
+    return best
+
+
+async def request_time(path, count):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(count):
+                response = await client.get(path)
+                assert response.status_code == 200, response.text
+            best = min(best, (time.perf_counter() - start) / count)
+        return best
+
+
+def run(rows, count):
+    seed(Sizes(users=max(rows, 1000), courses=10, enrollments_per_user=1))
+    course_id = get_storage().enrollments.get(1).course_id
+    cases = [
+        ("GET /users/{user_id}", "/api/v1/users/1", UserService.get_user(1)),
+        ("GET /users/", f"/api/v1/users/?limit={rows}", UserService.get_all_users(rows).items),
+        ("GET /courses/by-code/{code}", "/api/v1/courses/by-code/C1", CourseService.get_course_by_code("C1")),
+        ("GET /courses/{course_id}/enrollments", f"/api/v1/courses/{course_id}/enrollments?limit={rows}",
+         EnrollmentService.get_enrollments_for_course(course_id, limit=rows).items),
+        ("GET /courses/{course_id}/seats", f"/api/v1/courses/{course_id}/seats",
+         EnrollmentService.get_course_seats(course_id)),
+    ]
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for route, path, content in cases:
+            field = route_field("GET", "/api/v1" + route.split(" ", 1)[1])
+
+            def validated():
+                return JSONResponse(loop.run_until_complete(
+                    serialize_response(field=field, response_content=content, is_coroutine=True)))
+
+            assert validated().body == json_response(content).body
+            validated_s = best_of(validated, count)
+            orjson_s = best_of(lambda: json_response(content), count)
+            with mock.patch.object(rendering, "orjson", None):
+                pydantic_s = best_of(lambda: json_response(content), count)
+            request_s = asyncio.run(request_time(path, count))
+            results.append({
+                "route": route,
+                "items": len(content) if isinstance(content, list) else 1,
+                "response_model_us": round(validated_s * 1e6, 1),
+                "orjson_us": round(orjson_s * 1e6, 1),
+                "pydantic_us": round(pydantic_s * 1e6, 1),
+                "saved_us": round((validated_s - orjson_s) * 1e6, 1),
+                "request_us": round(request_s * 1e6, 1),
+            })
+    finally:
+        loop.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="Items on the listing pages")
+    parser.add_argument("--count", type=int, default=500, help="Responses rendered per timing")
+    args = parser.parse_args()
+    rows = run(args.rows, args.count)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
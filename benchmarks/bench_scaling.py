@@ -0,0 +1,255 @@
+"""How the cost of each service call grows with the size of the tables.
+
+Calls ``UserService``, ``CourseService``, ``EnrollmentService`` and
+``ChangeService`` methods directly (no HTTP) against tables seeded at each
+of ``--sizes`` rows (users and enrollments; a tenth as many courses), and
+fits the per-call time against the table size as ``time ~ n ** exponent``
+(least squares on log-log), over all sizes and over the largest two. An
+exponent near 0 is constant or logarithmic time, near 1 linear.
+
+Every operation states the growth it should have. When one expected to be
+constant-time or logarithmic fits an exponent above ``--max-exponent``
+either way, the run exits 1: a lookup that quietly became a scan fails here
+before it shows up as a slow endpoint. Calls are spread over the table and
+timed in batches with the garbage collector paused, keeping the best batch;
+writes are undone between batches so the tables keep their size. It runs
+against the configured storage backend (``APP_STORAGE_BACKEND``,
+``APP_ENROLLMENT_TABLE``).
+
+    python -m benchmarks.bench_scaling --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import gc
+import math
+import random
+import sys
+import time
+from typing import Callable, NamedTuple, Optional
+
+from app.core.changes import changes
+from app.core.db import get_storage
+from app.core.pagination import encode_cursor
+from app.schemas.change import ChangeEntity
+from app.schemas.course import CourseAccess, CourseCreate
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserCreate, UserRole
+from app.services.change import ChangeService
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+from app.services.user import UserService
+from benchmarks._common import print_table
+from benchmarks.scenarios import Sizes, seed
+
+CONSTANT = "O(1)"
+LOGARITHMIC = "O(log n)"
+LINEAR = "O(n)"
+
+PAGE_SIZE = 50
+
+
+class Op(NamedTuple):
+    name: str
+    expected: str
+    # (rng, sizes, batch number, count) -> the argument of each call in a batch
+    arguments: Callable
+    call: Callable
+    # Undoes a batch of writes, given its arguments and results
+    undo: Optional[Callable] = None
+
+
+def courses_for(users: int) -> int:
+    return max(10, users // 10)
+
+
+def spread(rng, count, low, high):
+    return [rng.randint(low, high) for _ in range(count)]
+
+
+def distinct(rng, count, low, high):
+    return rng.sample(range(low, high + 1), count)
+
+
+def deleting(name: str, table: Callable, delete: Callable, rows: Callable = lambda sizes: sizes.users,
+             restore: Callable = lambda table, records: table.add_many(records)) -> Op:
+    """A delete by id, timed on distinct ids; each record is read first, to be added back after the batch.
+
+    Deletes must stay cheap at a million rows: they run with the storage lock held, stalling every writer.
+    """
+    def arguments(rng, sizes, batch, count):
+        size = rows(sizes)
+        return [(record_id, table().get(record_id)) for record_id in distinct(rng, min(count, size // 2), 1, size)]
+
+    def undo(args, results):
+        restore(table(), [record for _, record in args])
+    return Op(name, LOGARITHMIC, arguments, lambda arg: delete(arg[0]), undo)
+
+
+def operations() -> list[Op]:
+    storage = get_storage
+
+    def unique(prefix):
+        return lambda rng, sizes, batch, count: [f"{prefix}{batch}X{i}" for i in range(count)]
+
+    return [
+        Op("UserService.get_user", CONSTANT,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.users),
+           UserService.get_user),
+        Op("UserService.create_user", CONSTANT,
+           lambda rng, sizes, batch, count: [
+               UserCreate(id=1, name=key, email=f"{key}@example.com", role=UserRole.USER)
+               for key in unique("new")(rng, sizes, batch, count)],
+           UserService.create_user,
+           lambda args, results: [storage().users.delete(user.id) for user in results]),
+        Op("UserService.get_all_users (cursor)", LOGARITHMIC,
+           lambda rng, sizes, batch, count: [
+               encode_cursor("users", last_id) for last_id in spread(rng, count, 1, sizes.users - PAGE_SIZE)],
+           lambda cursor: UserService.get_all_users(PAGE_SIZE, cursor)),
+        deleting("UserService.delete_user", lambda: storage().users, UserService.delete_user),
+        Op("CourseService.get_course", CONSTANT,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.courses),
+           CourseService.get_course),
+        Op("CourseService.get_course_by_code", CONSTANT,
+           lambda rng, sizes, batch, count: [f"C{i}" for i in spread(rng, count, 1, sizes.courses)],
+           CourseService.get_course_by_code),
+        Op("CourseService.create_course", CONSTANT,
+           lambda rng, sizes, batch, count: [
+               CourseCreate(id=1, title=code, code=code, access=CourseAccess.PUBLIC_ACCESS)
+               for code in unique("N")(rng, sizes, batch, count)],
+           CourseService.create_course,
+           lambda args, results: [storage().courses.delete(course.id) for course in results]),
+        deleting("CourseService.delete_course", lambda: storage().courses, CourseService.delete_course,
+                 lambda sizes: sizes.courses, lambda courses, records: courses.write_many(records, [])),
+        Op("CourseService.retrieve_all_courses (cursor)", LOGARITHMIC,
+           lambda rng, sizes, batch, count: [
+               encode_cursor(f"courses:{CourseAccess.PUBLIC_ACCESS.value}", last_id)
+               for last_id in spread(rng, count, 1, sizes.courses - PAGE_SIZE)],
+           lambda cursor: CourseService.retrieve_all_courses(CourseAccess.PUBLIC_ACCESS, limit=PAGE_SIZE,
+                                                             cursor=cursor)),
+        Op("EnrollmentService.enroll_user_in_course", LOGARITHMIC,
+           # Seeded user ``u`` is in course ``(u * 7) % courses + 1``; the next course is free
+           lambda rng, sizes, batch, count: [
+               EnrollmentCreate(user_id=user_id, course_id=(user_id * 7 + 1) % sizes.courses + 1,
+                                role=Enrollmentrole.STUDENT)
+               for user_id in distinct(rng, count, 1, sizes.users)],
+           EnrollmentService.enroll_user_in_course,
+           lambda args, results: [storage().enrollments.delete(enrollment.id) for enrollment in results]),
+        Op("EnrollmentService.get_enrollment_details", CONSTANT,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.users),
+           EnrollmentService.get_enrollment_details),
+        Op("EnrollmentService.get_enrollments_for_user", LOGARITHMIC,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.users),
+           lambda user_id: EnrollmentService.get_enrollments_for_user(user_id, limit=PAGE_SIZE)),
+        Op("EnrollmentService.get_enrollments_for_course", LOGARITHMIC,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.courses),
+           lambda course_id: EnrollmentService.get_enrollments_for_course(course_id, limit=PAGE_SIZE)),
+        Op("EnrollmentService.get_course_seats", CONSTANT,
+           lambda rng, sizes, batch, count: spread(rng, count, 1, sizes.courses),
+           EnrollmentService.get_course_seats),
+        deleting("EnrollmentService.deregister_student_from_course", lambda: storage().enrollments,
+                 EnrollmentService.deregister_student_from_course),
+        Op("ChangeService.get_changes", LOGARITHMIC,
+           lambda rng, sizes, batch, count: spread(rng, count, changes.floor, changes.head - PAGE_SIZE),
+           lambda since: ChangeService.get_changes(since, PAGE_SIZE)),
+    ]
+
+
+def time_batch(op: Op, args: list) -> tuple[float, list]:
+    """Mean seconds per call over one batch, with the collector paused as ``timeit`` does."""
+    call = op.call
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        results = [call(arg) for arg in args]
+        elapsed = time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+    return elapsed / len(args), results
+
+
+def measure(sizes: Sizes, ops: list[Op], calls: int, repeats: int, rng) -> dict:
+    # Distinct-id writes must not run out of rows at the smallest size
+    count = min(calls, sizes.users // 2)
+    timings = {}
+    for op in ops:
+        best = math.inf
+        for batch in range(repeats):
+            args = op.arguments(rng, sizes, batch, count)
+            per_call, results = time_batch(op, args)
+            if op.undo is not None:
+                op.undo(args, results)
+            best = min(best, per_call)
+        timings[op.name] = best
+    return timings
+
+
+def fit_exponent(sizes: list[int], seconds: list[float]) -> float:
+    """The slope of ``log(seconds)`` against ``log(size)``: ``k`` in ``time ~ size ** k``."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(value) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def growth(exponent: float) -> str:
+    if exponent < 0.2:
+        return "O(1)/O(log n)"
+    if exponent < 0.8:
+        return "sublinear"
+    if exponent < 1.3:
+        return LINEAR
+    return "superlinear"
+
+
+def run(table_sizes: list[int], calls: int, repeats: int, max_exponent: float) -> tuple[list[dict], list[str]]:
+    rng = random.Random(1)
+    timings = {}
+    for users in table_sizes:
+        sizes = Sizes(users=users, courses=courses_for(users), enrollments_per_user=1)
+        seed(sizes)
+        # The change log holds one entry per record, up to its size limit
+        changes.record(ChangeEntity.USER, *range(1, users + 1))
+        ops = operations()
+        timings[users] = measure(sizes, ops, calls, repeats, rng)
+        print(f"measured {users} rows", file=sys.stderr)
+
+    rows, failures = [], []
+    for op in ops:
+        seconds = [timings[users][op.name] for users in table_sizes]
+        exponent = fit_exponent(table_sizes, seconds)
+        # A fixed per-call cost hides a linear term at small sizes; the largest two show where it is heading
+        tail = fit_exponent(table_sizes[-2:], seconds[-2:])
+        row = {"operation": op.name, "expected": op.expected}
+        row.update({f"us@{users}": round(value * 1e6, 2) for users, value in zip(table_sizes, seconds)})
+        row.update({"exponent": round(exponent, 2) + 0.0, "tail": round(tail, 2) + 0.0, "fitted": growth(tail)})
+        if op.expected in (CONSTANT, LOGARITHMIC) and max(exponent, tail) > max_exponent:
+            row["fitted"] += " !"
+            failures.append(f"{op.name}: expected {op.expected}, grows as n^{max(exponent, tail):.2f}")
+        rows.append(row)
+    return rows, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="Users and enrollments seeded per run (a tenth as many courses)")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per timed batch")
+    parser.add_argument("--repeats", type=int, default=5, help="Batches per operation; the best is kept")
+    parser.add_argument("--max-exponent", type=float, default=0.5,
+                        help="Fail when a constant-time or logarithmic operation fits a larger exponent")
+    args = parser.parse_args()
+    if len(args.sizes) < 2:
+        parser.error("--sizes needs at least two sizes to fit a curve")
+
+    rows, failures = run(sorted(args.sizes), args.calls, args.repeats, args.max_exponent)
+    print_table(rows, list(rows[0]))
+    if failures:
+        print("Scaling worse than expected:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cold-start time of the memory backend from a snapshot versus log replay.
+
+Builds a synthetic dataset, writes it both as a snapshot and as a
+write-ahead log, then times loading each into a fresh store.
+
+    python -m benchmarks.bench_snapshot --users 100000 --courses 5000 --enrollments 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.core.storage import CourseRecord, EnrollmentRecord, MemoryStorage, UserRecord
+from app.core.storage.snapshot import load_snapshot, write_snapshot
+from app.core.storage.wal import WriteAheadLog, replay
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+from benchmarks._common import print_table
+
+
+def build(users, courses, enrollments):
+    storage = MemoryStorage()
+    storage.users.load([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, users + 1)])
+    storage.courses.load([
+        CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS)
+        for i in range(1, courses + 1)])
+    per_user = max(1, enrollments // users)
+    storage.enrollments.load([
+        EnrollmentRecord(
+            id=i + 1, user_id=i // per_user + 1, course_id=i % courses + 1, role=Enrollmentrole.STUDENT)
+        for i in range(enrollments)])
+    return storage
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - start, 3)
+
+
+def run(users, courses, enrollments, with_log):
+    rows = []
+    source = build(users, courses, enrollments)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "snapshot.bin")
+        write_s = timed(lambda: write_snapshot(source, snapshot_path))
+        load_s = timed(lambda: load_snapshot(MemoryStorage(), snapshot_path))
+        rows.append({"method": "snapshot", "write_s": write_s, "load_s": load_s,
+                     "size_mb": round(os.path.getsize(snapshot_path) / 1e6, 1)})
+
+        if with_log:
+            log_path = os.path.join(tmp, "wal.log")
+
+            def write_log():
+                log = WriteAheadLog(log_path, "none")
+                source.attach_log(log)
+                for repository in (source.users, source.courses, source.enrollments):
+                    for record in repository.rows.values():
+                        repository.journal.put(record)
+                log.close()
+
+            write_s = timed(write_log)
+            load_s = timed(lambda: replay(MemoryStorage(), log_path))
+            rows.append({"method": "wal replay", "write_s": write_s, "load_s": load_s,
+                         "size_mb": round(os.path.getsize(log_path) / 1e6, 1)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--courses", type=int, default=5_000)
+    parser.add_argument("--enrollments", type=int, default=1_000_000)
+    parser.add_argument("--skip-log", action="store_true", help="only measure the snapshot")
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.enrollments, not args.skip_log)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare storage backends on the same service-level workloads.
+
+Every workload runs through the services against each backend in turn, so
+the numbers include validation and index maintenance, not just raw storage.
+
+    python -m benchmarks.bench_storage_backends --users 5000 --courses 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.core.db import set_storage
+from app.core.storage import MemoryStorage
+from app.core.storage.sqlite import SQLiteStorage
+from app.schemas.course import CourseAccess, CourseCreate
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserCreate, UserRole
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+from app.services.user import UserService
+from benchmarks._common import print_table
+
+
+def workloads(users, courses, reads):
+    """Return (name, operation count, callable) triples, run in order against one backend."""
+    rng = random.Random(42)
+    pairs = [(u, rng.randint(1, courses)) for u in range(1, users + 1)]
+    lookups = [rng.randint(1, users) for _ in range(reads)]
+
+    def create_users():
+        for i in range(1, users + 1):
+            UserService.create_user(UserCreate(
+                id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+
+    def create_courses():
+        for i in range(1, courses + 1):
+            CourseService.create_course(CourseCreate(
+                id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+
+    def enroll():
+        for user_id, course_id in pairs:
+            EnrollmentService.enroll_user_in_course(EnrollmentCreate(
+                user_id=user_id, course_id=course_id, role=Enrollmentrole.STUDENT))
+
+    def duplicate_enroll():
+        for user_id, course_id in pairs[:reads]:
+            try:
+                EnrollmentService.enroll_user_in_course(EnrollmentCreate(
+                    user_id=user_id, course_id=course_id, role=Enrollmentrole.STUDENT))
+            except Exception:
+                pass
+
+    def get_users():
+        for user_id in lookups:
+            UserService.get_user(user_id)
+
+    def course_rosters():
+        for course_id in lookups:
+            EnrollmentService.get_enrollments_for_course(course_id % courses + 1, 0, 50)
+
+    def access_listing():
+        for _ in range(reads // 10):
+            CourseService.retrieve_all_courses(CourseAccess.PUBLIC_ACCESS, 0, 100)
+
+    return [
+        ("create_user", users, create_users),
+        ("create_course", courses, create_courses),
+        ("enroll", users, enroll),
+        ("enroll_409", min(reads, users), duplicate_enroll),
+        ("get_user", reads, get_users),
+        ("course_roster", reads, course_rosters),
+        ("access_listing", reads // 10, access_listing),
+    ]
+
+
+def run(users, courses, reads):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", MemoryStorage()),
+            ("memory-columnar", MemoryStorage(enrollment_table="columnar")),
+            ("sqlite", SQLiteStorage(os.path.join(tmp, "bench.db"))),
+        ]
+        for backend_name, storage in backends:
+            previous = set_storage(storage)
+            try:
+                for name, count, fn in workloads(users, courses, reads):
+                    start = time.perf_counter()
+                    fn()
+                    elapsed = time.perf_counter() - start
+                    rows.append({
+                        "backend": backend_name,
+                        "workload": name,
+                        "ops": count,
+                        "ops_per_s": round(count / elapsed),
+                        "us_per_op": round(elapsed / count * 1e6, 2),
+                    })
+            finally:
+                set_storage(previous)
+                storage.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=5_000)
+    args = parser.parse_args()
+    rows = run(args.users, args.courses, args.reads)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Write throughput of the memory backend under each write-ahead-log fsync policy.
+
+Enrolls users through EnrollmentService from one or more threads with the log
+attached, then times replaying the resulting log into a fresh store.
+
+    python -m benchmarks.bench_wal --ops 20000 --threads 1 8 32
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.db import set_storage
+from app.core.storage import CourseRecord, MemoryStorage, UserRecord
+from app.core.storage.wal import FSYNC_POLICIES, WriteAheadLog, replay
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import EnrollmentCreate, Enrollmentrole
+from app.schemas.user import UserRole
+from app.services.enrollment import EnrollmentService
+from benchmarks._common import print_table
+
+COURSES = 100
+
+
+def seeded_storage(ops):
+    storage = MemoryStorage()
+    for i in range(1, ops // COURSES + 2):
+        storage.users.put(UserRecord(
+            id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+    for i in range(1, COURSES + 1):
+        storage.courses.put(CourseRecord(
+            id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+    return storage
+
+
+def enroll_all(ops, threads):
+    requests = [EnrollmentCreate(user_id=i // COURSES + 1, course_id=i % COURSES + 1, role=Enrollmentrole.STUDENT)
+                for i in range(ops)]
+    chunks = [requests[t::threads] for t in range(threads)]
+
+    def worker(chunk):
+        for request in chunk:
+            EnrollmentService.enroll_user_in_course(request)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, chunks))
+    return time.perf_counter() - start
+
+
+def run(ops, thread_counts, commit_window, interval):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for policy in ("off",) + FSYNC_POLICIES:
+            for threads in thread_counts:
+                path = os.path.join(tmp, f"{policy}-{threads}.log")
+                storage = seeded_storage(ops)
+                if policy != "off":
+                    storage.attach_log(WriteAheadLog(path, policy, commit_window, interval))
+                previous = set_storage(storage)
+                try:
+                    elapsed = enroll_all(ops, threads)
+                finally:
+                    set_storage(previous)
+                    storage.close()
+
+                row = {"policy": policy, "threads": threads, "ops_per_s": round(ops / elapsed),
+                       "log_mb": "-", "replay_s": "-"}
+                if policy != "off":
+                    start = time.perf_counter()
+                    replay(seeded_storage(ops), path)
+                    row["replay_s"] = round(time.perf_counter() - start, 3)
+                    row["log_mb"] = round(os.path.getsize(path) / 1e6, 2)
+                rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--group-commit-ms", type=float, default=0.0)
+    parser.add_argument("--fsync-interval-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    rows = run(args.ops, args.threads, args.group_commit_ms / 1000, args.fsync_interval_ms / 1000)
+    print_table(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Load generator: concurrent virtual users driving the ASGI app in process.
+
+Each scenario from ``benchmarks/scenarios.py`` seeds its data, then
+``--vus`` virtual users run its script back to back for ``--duration``
+seconds over ``httpx.ASGITransport`` (no sockets). Requests finished during
+the first ``--warmup`` seconds are not counted. The report gives req/s and
+latency percentiles per scenario and per endpoint, as JSON on stdout or in
+``--out``.
+
+``--save-baseline`` stores the report, and ``--baseline`` compares a run
+against a stored one. A scenario regresses when its throughput drops, or
+its p50 or p99 rises, by more than ``--tolerance``. The comparison is
+printed and the exit status is 1. Compare runs from the same machine,
+backend and sizes only.
+
+    python -m benchmarks.loadgen --scenario browse rush --vus 32 --duration 10 --save-baseline baseline.json
+    python -m benchmarks.loadgen --scenario browse rush --vus 32 --duration 10 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from app.core.config import settings
+from app.main import app
+from benchmarks._common import percentile
+from benchmarks.scenarios import SCENARIOS, Sizes
+
+
+class Recorder:
+    """Latencies and unexpected statuses per endpoint label, for requests finished after the warm-up."""
+
+    def __init__(self, counted_from: float):
+        self.counted_from = counted_from
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label: str, started: float, finished: float, ok: bool):
+        if finished < self.counted_from:
+            return
+        self.latencies[label].append(finished - started)
+        if not ok:
+            self.errors[label] += 1
+
+
+class Session:
+    """One virtual user: its client, its random generator and the responses it has cached."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, vu: int, seed: int):
+        self.client = client
+        self.recorder = recorder
+        self.vu = vu
+        self.rng = random.Random(seed * 1000003 + vu)
+        self.etags = {}
+        self.cached = {}
+
+    async def request(self, method: str, path: str, label: str, expect=(200,), conditional=False,
+                      **kwargs) -> httpx.Response:
+        """Send a request, recording its latency under ``label``; a status not in ``expect`` is an error.
+
+        ``conditional`` sends the ETag last returned for ``path`` in ``If-None-Match`` and answers a 304 with the
+        cached response, as a caching client would.
+        """
+        headers = kwargs.pop("headers", {})
+        if conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        clock = time.perf_counter
+        started = clock()
+        response = await self.client.request(method, path, headers=headers, **kwargs)
+        self.recorder.record(label, started, clock(), response.status_code in expect)
+        if conditional:
+            if response.status_code == 304 and path in self.cached:
+                # Serve the body (and headers, e.g. the next cursor) kept from the last 200
+                response = self.cached[path]
+            elif "ETag" in response.headers:
+                self.etags[path] = response.headers["ETag"]
+                self.cached[path] = response
+        # A request served without blocking never suspends the coroutine; over a socket it would, and
+        # without this one virtual user could hold the event loop (and threadpool results) indefinitely
+        await asyncio.sleep(0)
+        return response
+
+
+def latency_summary(latencies: list[float], seconds: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "req_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0) * 1000, 3),
+    }
+
+
+async def drive(scenario, state, vus: int, duration: float, warmup: float, seed: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+        start = time.perf_counter()
+        recorder = Recorder(start + warmup)
+        deadline = start + warmup + duration
+
+        async def virtual_user(vu):
+            session = Session(client, recorder, vu, seed)
+            while time.perf_counter() < deadline:
+                await scenario.iteration(session, state)
+
+        await asyncio.gather(*(virtual_user(vu) for vu in range(vus)))
+        # The last iterations may run past the deadline; count the time they took
+        measured = time.perf_counter() - recorder.counted_from
+
+    everything = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    return {
+        **latency_summary(everything, measured),
+        "errors": sum(recorder.errors.values()),
+        "seconds": round(measured, 3),
+        "endpoints": {
+            label: {**latency_summary(latencies, measured), "errors": recorder.errors[label]}
+            for label, latencies in sorted(recorder.latencies.items())},
+    }
+
+
+def run(names: list[str], sizes: Sizes, vus: int, duration: float, warmup: float, seed: int) -> dict:
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "storage_backend": settings.storage_backend,
+            "enrollment_table": settings.enrollment_table,
+        },
+        "config": {"vus": vus, "duration_s": duration, "warmup_s": warmup, "seed": seed, "sizes": vars(sizes)},
+        "scenarios": {},
+    }
+    for name in names:
+        scenario = SCENARIOS[name]
+        state = scenario.setup(sizes)
+        result = asyncio.run(drive(scenario, state, vus, duration, warmup, seed))
+        report["scenarios"][name] = {"description": scenario.description, **result}
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """The regressions of ``report`` against ``baseline``, one line each."""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if result["req_per_s"] < before["req_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['req_per_s']} -> {result['req_per_s']} req/s")
+        for key in ("p50_ms", "p99_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {before[key]} -> {result[key]}")
+    return regressions
+
+
+def print_summary(report: dict, baseline: dict = None):
+    for name, result in report["scenarios"].items():
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        change = ""
+        if before:
+            change = f"  (baseline {before['req_per_s']} req/s, p50 {before['p50_ms']} ms, p99 {before['p99_ms']} ms)"
+        print(f"{name}: {result['req_per_s']} req/s, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+              f"{result['errors']} errors{change}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--vus", type=int, default=32, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds run before measuring")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=Sizes.users)
+    parser.add_argument("--courses", type=int, default=Sizes.courses)
+    parser.add_argument("--enrollments-per-user", type=int, default=Sizes.enrollments_per_user)
+    parser.add_argument("--popular", type=int, default=Sizes.popular)
+    parser.add_argument("--capacity", type=int, default=Sizes.capacity)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Also store the report as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative drop in req/s or rise in p50/p99 before flagging a regression")
+    args = parser.parse_args()
+
+    sizes = Sizes(users=args.users, courses=args.courses, enrollments_per_user=args.enrollments_per_user,
+                  popular=args.popular, capacity=args.capacity)
+    report = run(args.scenario, sizes, args.vus, args.duration, args.warmup, args.seed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+
+    print_summary(report, baseline)
+    if report.get("regressions"):
+        print("Regressions:\n  " + "\n  ".join(report["regressions"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
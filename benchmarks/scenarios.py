@@ -0,0 +1,149 @@
+"""Scenario scripts for the load generator (``benchmarks/loadgen.py``).
+
+A scenario seeds the storage backend directly, then each virtual user runs
+``iteration`` in a loop until the run ends, making requests through its
+``Session``. Requests are labelled by route template, not by path, so the
+report has one row per endpoint. Randomness comes from the session's own
+seeded generator, so a run is repeatable up to task interleaving.
+"""
+import itertools
+from dataclasses import dataclass
+
+from app.core.db import get_storage, reset
+from app.core.storage import CourseRecord, EnrollmentRecord, UserRecord
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+
+@dataclass(frozen=True)
+class Sizes:
+    users: int = 10000
+    courses: int = 500
+    # Enrollments seeded per user, in distinct courses
+    enrollments_per_user: int = 3
+    # Courses with a capacity that the registration rush converges on
+    popular: int = 5
+    capacity: int = 200
+
+
+def seed(sizes: Sizes, capacities: dict = None):
+    """Fresh tables: users, public courses (``capacities`` maps course id to seats) and enrollments."""
+    reset()
+    capacities = capacities or {}
+    storage = get_storage()
+    storage.users.add_many([
+        UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER)
+        for i in range(1, sizes.users + 1)])
+    storage.courses.write_many([
+        CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS,
+                     capacity=capacities.get(i))
+        for i in range(1, sizes.courses + 1)], [])
+    per_user = min(sizes.enrollments_per_user, sizes.courses - len(capacities))
+    ids = itertools.count(1)
+    # Seeded enrollments avoid the capacity-limited courses, which start empty
+    open_courses = [i for i in range(1, sizes.courses + 1) if i not in capacities]
+    storage.enrollments.add_many([
+        EnrollmentRecord(id=next(ids), user_id=user_id,
+                         course_id=open_courses[(user_id * 7 + k) % len(open_courses)], role=Enrollmentrole.STUDENT)
+        for user_id in range(1, sizes.users + 1) for k in range(per_user)])
+    storage.users.ids.advance_past(sizes.users)
+    storage.courses.ids.advance_past(sizes.courses)
+    storage.enrollments.ids.advance_past(sizes.users * per_user)
+
+
+def skewed_weights(count: int) -> list[float]:
+    """Cumulative Zipf-like weights: the first courses are read far more often than the rest."""
+    return list(itertools.accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+class Scenario:
+    name = ""
+    description = ""
+
+    def setup(self, sizes: Sizes) -> dict:
+        """Seed the storage and return the state shared by every virtual user."""
+        raise NotImplementedError
+
+    async def iteration(self, session, state: dict):
+        raise NotImplementedError
+
+
+class BrowseCatalog(Scenario):
+    name = "browse"
+    description = "Students page through the public catalog and open popular courses, revalidating with ETags"
+
+    def setup(self, sizes):
+        seed(sizes)
+        return {"courses": list(range(1, sizes.courses + 1)), "weights": skewed_weights(sizes.courses),
+                "users": sizes.users}
+
+    async def iteration(self, session, state):
+        rng = session.rng
+        await browse(session, state)
+        # Now and then a student checks their own enrollments
+        if rng.random() < 0.2:
+            await session.request("GET", f"/api/v1/users/{rng.randint(1, state['users'])}/enrollments",
+                                  "GET /users/{user_id}/enrollments")
+
+
+async def browse(session, state):
+    rng = session.rng
+    response = await session.request("GET", "/api/v1/courses/access/public_access?limit=50",
+                                     "GET /courses/access/{access}", expect=(200, 304), conditional=True)
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor and rng.random() < 0.3:
+        await session.request("GET", f"/api/v1/courses/access/public_access?limit=50&cursor={cursor}",
+                              "GET /courses/access/{access}?cursor")
+    course_id = rng.choices(state["courses"], cum_weights=state["weights"])[0]
+    await session.request("GET", f"/api/v1/courses/{course_id}", "GET /courses/{course_id}",
+                          expect=(200, 304), conditional=True)
+    if rng.random() < 0.5:
+        await session.request("GET", f"/api/v1/courses/{course_id}/enrollments?limit=20",
+                              "GET /courses/{course_id}/enrollments")
+
+
+class RegistrationRush(Scenario):
+    name = "rush"
+    description = "Every student enrolls in two of a few capacity-limited courses; some drop out again"
+
+    def setup(self, sizes):
+        popular = list(range(1, min(sizes.popular, sizes.courses) + 1))
+        seed(sizes, {course_id: sizes.capacity for course_id in popular})
+        return {"popular": popular, "users": itertools.cycle(range(1, sizes.users + 1))}
+
+    async def iteration(self, session, state):
+        rng = session.rng
+        user_id = next(state["users"])
+        enrolled = []
+        for course_id in rng.sample(state["popular"], min(2, len(state["popular"]))):
+            # 201 with a seat, 202 on the waitlist, 409 once the user is in (the users cycle)
+            response = await session.request(
+                "POST", "/api/v1/enrollments/", "POST /enrollments/", expect=(201, 202, 409),
+                json={"user_id": user_id, "course_id": course_id, "role": "student"})
+            if response.status_code == 201:
+                enrolled.append(response.json()["id"])
+            await session.request("GET", f"/api/v1/courses/{course_id}/seats", "GET /courses/{course_id}/seats")
+        if enrolled and rng.random() < 0.1:
+            await session.request("DELETE", f"/api/v1/enrollments/{enrolled[0]}", "DELETE /enrollments/{id}")
+
+
+class CatalogRollover(Scenario):
+    name = "rollover"
+    description = "One admin upserts the whole catalog term after term while students keep browsing"
+
+    def setup(self, sizes):
+        seed(sizes)
+        return {"courses": list(range(1, sizes.courses + 1)), "weights": skewed_weights(sizes.courses),
+                "terms": itertools.count(1)}
+
+    async def iteration(self, session, state):
+        if session.vu != 0:
+            return await browse(session, state)
+        term = next(state["terms"])
+        await session.request("PUT", "/api/v1/courses/catalog", "PUT /courses/catalog", json=[
+            {"title": f"Course {course_id} (term {term})", "code": f"C{course_id}", "access": "public_access"}
+            for course_id in state["courses"]])
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (BrowseCatalog(), RegistrationRush(), CatalogRollover())}
@@ -1,7 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from app.core.db import user, course, enrollment
+from app.core.db import reset
 
 
 @pytest.fixture
@@ -13,14 +13,10 @@ def client():
 @pytest.fixture
 def clear_db():
     """Clear the in-memory database before each test."""
-    user.clear()
-    course.clear()
-    enrollment.clear()
+    reset()
     yield
     # Cleanup after test
-    user.clear()
-    course.clear()
-    enrollment.clear()
+    reset()
 
 
 @pytest.fixture
@@ -0,0 +1,61 @@
+from app.core.cache import CachedBody, ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def body(text):
+    return CachedBody(text.encode(), {})
+
+
+class TestResponseCache:
+    """Test cases for the rendered-response cache."""
+    
+    def test_hit_needs_current_validator(self):
+        """Test an entry is only served for the validator it was stored with."""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        cache.put("a", "v1", body("one"))
+    
+        assert cache.get("a", "v1").body == b"one"
+        assert cache.get("a", "v2") is None
+        # The stale entry is gone, not kept for the old validator
+        assert cache.get("a", "v1") is None
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    
+    
+    def test_least_recently_used_is_evicted(self):
+        """Test a full cache evicts the entry read least recently."""
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", "v", body("a"))
+        cache.put("b", "v", body("b"))
+        cache.get("a", "v")
+        cache.put("c", "v", body("c"))
+    
+        assert cache.get("b", "v") is None
+        assert cache.get("a", "v") is not None
+        assert cache.stats()["evictions"] == 1
+    
+    
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed."""
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=10, ttl_seconds=5, clock=clock)
+        cache.put("a", "v", body("a"))
+        clock.now = 4.9
+        assert cache.get("a", "v") is not None
+        clock.now = 5.0
+        assert cache.get("a", "v") is None
+        assert cache.stats()["expirations"] == 1
+    
+    
+    def test_disabled_cache_stores_nothing(self):
+        """Test a cache with no room passes values through."""
+        cache = ResponseCache(max_entries=0, ttl_seconds=60)
+        assert cache.put("a", "v", body("a")).body == b"a"
+        assert cache.get("a", "v") is None
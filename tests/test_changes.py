@@ -0,0 +1,173 @@
+import pytest
+
+from app.core.changes import ChangeLog, ChangesExpired
+
+
+class FakeClock:
+    def __init__(self, now=1.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def keys(batch):
+    return [key for _, key in batch.changes]
+
+
+class TestChangeLog:
+    """Test cases for the compacted change sequence."""
+    
+    def test_only_latest_change_of_a_record_is_kept(self):
+        """Test recording a record again moves it to the end of the sequence."""
+        log = ChangeLog(max_entries=10)
+        start = log.head
+        log.record("user", 1, 2)
+        log.record("course", 1)
+        log.record("user", 1)
+    
+        batch = log.since(start, 10)
+        assert keys(batch) == [("user", 2), ("course", 1), ("user", 1)]
+        assert [seq for seq, _ in batch.changes] == [start + 2, start + 3, start + 4]
+        assert (batch.next_since, batch.has_more) == (log.head, False)
+        assert len(log) == 3
+    
+    
+    def test_reads_in_batches(self):
+        """Test a limit splits the changes and next_since resumes after the last one returned."""
+        log = ChangeLog(max_entries=100)
+        start = log.head
+        log.record("enrollment", *range(1, 8))
+    
+        first = log.since(start, 5)
+        assert keys(first) == [("enrollment", i) for i in range(1, 6)]
+        assert first.has_more
+        second = log.since(first.next_since, 5)
+        assert keys(second) == [("enrollment", 6), ("enrollment", 7)]
+        assert not second.has_more
+        assert log.since(second.next_since, 5).changes == []
+    
+    
+    def test_full_log_drops_oldest_and_raises_floor(self):
+        """Test the log stays bounded and reading from before its floor is refused."""
+        log = ChangeLog(max_entries=3)
+        start = log.head
+        log.record("user", *range(1, 6))
+    
+        assert len(log) == 3
+        assert log.floor == start + 2
+        with pytest.raises(ChangesExpired):
+            log.since(start, 10)
+        assert keys(log.since(log.floor, 10)) == [("user", 3), ("user", 4), ("user", 5)]
+    
+    
+    def test_compaction_keeps_reads_correct(self):
+        """Test superseded changes are compacted away without changing what is read."""
+        log = ChangeLog(max_entries=100)
+        start = log.head
+        for _ in range(200):
+            log.record("course", 1, 2, 3)
+    
+        assert len(log._seqs) <= 2 * len(log) + 64
+        assert keys(log.since(start, 10)) == [("course", 1), ("course", 2), ("course", 3)]
+    
+    
+    def test_sequence_outlives_a_restart(self):
+        """Test a new log starts past an older one's sequences, so stale consumers get expired."""
+        clock = FakeClock()
+        old = ChangeLog(max_entries=10, clock=clock)
+        old.record("user", 1, 2, 3)
+        clock.now += 1
+        new = ChangeLog(max_entries=10, clock=clock)
+    
+        assert new.floor > old.head
+        with pytest.raises(ChangesExpired):
+            new.since(old.head, 10)
+        # Nor does a sequence from the future pass
+        with pytest.raises(ChangesExpired):
+            new.since(new.head + 1, 10)
+    
+    
+    def test_reset_never_reuses_a_sequence(self):
+        """Test a reset starts past the last sequence even if the clock has not moved."""
+        log = ChangeLog(max_entries=10, clock=FakeClock())
+        log.record("user", *range(1, 6))
+        head = log.head
+        log.reset()
+    
+        assert log.floor > head
+        assert len(log) == 0
+
+
+class TestChangesEndpoint:
+    """Test cases for GET /changes."""
+    
+    def test_without_since_returns_current_position(self, client, clear_db):
+        """Test omitting since returns no changes, only where to follow from."""
+        client.post("/api/v1/users/", json={"id": 1, "name": "A", "email": "a@example.com", "role": "student"})
+        response = client.get("/api/v1/changes/")
+    
+        assert response.status_code == 200
+        body = response.json()
+        assert body["changes"] == [] and body["has_more"] is False
+        assert client.get(f"/api/v1/changes/?since={body['next_since']}").json()["changes"] == []
+    
+    
+    def test_creates_updates_and_deletes_are_reported(self, client, clear_db, test_user_data, test_course_data):
+        """Test each write shows up once with the current record, and deletes as tombstones."""
+        since = client.get("/api/v1/changes/").json()["next_since"]
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        enrollment = client.post("/api/v1/enrollments/", json={"user_id": 1, "course_id": 1, "role": "student"}).json()
+        client.put("/api/v1/courses/1", json={**test_course_data, "title": "Python 102"})
+        client.delete(f"/api/v1/enrollments/{enrollment['id']}")
+    
+        body = client.get(f"/api/v1/changes/?since={since}").json()
+        changes = [(c["entity"], c["id"], c["deleted"]) for c in body["changes"]]
+        assert changes == [("user", 1, False), ("course", 1, False), ("enrollment", enrollment["id"], True)]
+        assert body["changes"][1]["data"]["title"] == "Python 102"
+        assert body["changes"][2]["data"] is None
+        seqs = [c["seq"] for c in body["changes"]]
+        assert seqs == sorted(seqs) and body["next_since"] >= seqs[-1]
+    
+        client.delete("/api/v1/users/1")
+        later = client.get(f"/api/v1/changes/?since={body['next_since']}").json()["changes"]
+        assert [(c["entity"], c["id"], c["deleted"]) for c in later] == [("user", 1, True)]
+    
+    
+    def test_bulk_writes_are_reported(self, client, clear_db):
+        """Test batch enrollments and catalog upserts record every record they write."""
+        since = client.get("/api/v1/changes/").json()["next_since"]
+        client.put("/api/v1/courses/catalog", json=[
+            {"title": f"Course {i}", "code": f"C{i}", "access": "public_access"} for i in range(1, 4)])
+        client.post("/api/v1/users/", json={"id": 1, "name": "A", "email": "a@example.com", "role": "student"})
+        client.post("/api/v1/enrollments/batch", json=[
+            {"user_id": 1, "course_id": c, "role": "student"} for c in (1, 2, 2)])
+    
+        changes = client.get(f"/api/v1/changes/?since={since}").json()["changes"]
+        assert [(c["entity"], c["id"]) for c in changes] == [
+            ("course", 1), ("course", 2), ("course", 3), ("user", 1), ("enrollment", 1), ("enrollment", 2)]
+    
+    
+    def test_paging_through_changes(self, client, clear_db):
+        """Test following next_since with a limit walks every change exactly once."""
+        since = client.get("/api/v1/changes/").json()["next_since"]
+        for i in range(1, 8):
+            client.post("/api/v1/users/", json={"id": i, "name": f"U{i}", "email": f"u{i}@example.com", "role": "student"})
+    
+        seen = []
+        while True:
+            body = client.get(f"/api/v1/changes/?since={since}&limit=3").json()
+            seen.extend(c["id"] for c in body["changes"])
+            since = body["next_since"]
+            if not body["has_more"]:
+                break
+        assert seen == list(range(1, 8))
+    
+    
+    def test_expired_since_is_gone(self, client, clear_db):
+        """Test asking from before the retained changes answers 410."""
+        response = client.get("/api/v1/changes/?since=0")
+    
+        assert response.status_code == 410
+        assert "resync" in response.json()["detail"]
@@ -0,0 +1,256 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.db import get_storage
+from app.core.storage import CourseRecord, UserRecord
+from app.main import app
+from app.schemas.course import CourseAccess, CourseCreate
+from app.schemas.enrollment import EnrollmentCreate, WaitlistEntry
+from app.schemas.user import UserRole
+from app.services.course import CourseService
+from app.services.enrollment import EnrollmentService
+
+THREADS = 8
+
+
+def seed(users, courses):
+    storage = get_storage()
+    for i in range(1, users + 1):
+        storage.users.add(UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+    for i in range(1, courses + 1):
+        storage.courses.add(CourseRecord(id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.PUBLIC_ACCESS))
+    storage.users.ids.advance_past(users)
+    storage.courses.ids.advance_past(courses)
+
+
+def hammer(fn, calls):
+    """Run every call from THREADS threads released at once, returning each outcome."""
+    start = threading.Barrier(THREADS)
+
+    def worker(chunk):
+        start.wait()
+        outcomes = []
+        for args in chunk:
+            try:
+                outcomes.append(fn(*args))
+            except HTTPException as exc:
+                outcomes.append(exc.status_code)
+        return outcomes
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        chunks = pool.map(worker, [calls[i::THREADS] for i in range(THREADS)])
+        return [outcome for chunk in chunks for outcome in chunk]
+
+
+class TestConcurrentWrites:
+    """Test cases for writes racing each other."""
+    
+    def test_racing_enrollments_create_each_pair_once(self, clear_db):
+        """Test concurrent enrollments of the same pairs neither lose nor duplicate writes."""
+        seed(users=20, courses=10)
+        pairs = [(u, c) for u in range(1, 21) for c in range(1, 11)]
+        # Every pair is attempted by every thread
+        calls = [(EnrollmentCreate(user_id=u, course_id=c, role="student"),)
+                 for _ in range(THREADS) for u, c in pairs]
+        outcomes = hammer(EnrollmentService.enroll_user_in_course, calls)
+    
+        created = [outcome for outcome in outcomes if not isinstance(outcome, int)]
+        assert len(created) == len(pairs)
+        assert outcomes.count(409) == len(calls) - len(pairs)
+        assert len({enrollment.id for enrollment in created}) == len(pairs)
+        assert {(e.user_id, e.course_id) for e in created} == set(pairs)
+        assert get_storage().enrollments.count() == len(pairs)
+    
+    
+    def test_enrollment_never_outlives_course_delete(self, clear_db):
+        """Test an enrollment racing a course delete either lands first or is rejected."""
+        seed(users=50, courses=1)
+        deleted = threading.Event()
+        late = []
+    
+        def enroll(user_id):
+            try:
+                EnrollmentService.enroll_user_in_course(
+                    EnrollmentCreate(user_id=user_id, course_id=1, role="student"))
+            except HTTPException as exc:
+                return exc.status_code
+            # The delete holds the course stripe, so it cannot have finished before this insert
+            if deleted.is_set():
+                late.append(user_id)
+            return 201
+    
+        def delete():
+            CourseService.delete_course(1)
+            deleted.set()
+            return 200
+    
+        # The delete is queued in the middle of the enrollments
+        calls = [(enroll, user_id) for user_id in range(1, 51)]
+        calls.insert(25, (delete,))
+        outcomes = hammer(lambda fn, *args: fn(*args), calls)
+    
+        assert late == []
+        assert set(outcomes) <= {200, 201, 404}
+        assert outcomes.count(201) == get_storage().enrollments.count()
+    
+    
+    def test_hot_course_never_oversubscribes(self, clear_db):
+        """Test racing enrollments fill exactly the capacity and queue everyone else once."""
+        seed(users=400, courses=1)
+        get_storage().courses.replace(
+            CourseRecord(id=1, title="Course 1", code="C1", access=CourseAccess.PUBLIC_ACCESS, capacity=50))
+        calls = [(EnrollmentCreate(user_id=u, course_id=1, role="student"),) for u in range(1, 401)]
+        outcomes = hammer(EnrollmentService.enroll_user_in_course, calls)
+        
+        storage = get_storage()
+        assert sum(isinstance(outcome, WaitlistEntry) for outcome in outcomes) == 350
+        assert storage.enrollments.count_for_course(1) == 50
+        queue = storage.waitlist.list_for_course(1)
+        assert len(queue) == 350
+        assert {e.user_id for e in queue}.isdisjoint(e.user_id for e in storage.enrollments.list_for_course(1))
+        
+        # Deregistering from several threads hands each freed seat to the next in line
+        hammer(EnrollmentService.deregister_student_from_course,
+               [(e.id,) for e in storage.enrollments.list_for_course(1)[:20]])
+        assert storage.enrollments.count_for_course(1) == 50
+        assert [e.id for e in storage.waitlist.list_for_course(1)] == [e.id for e in queue[20:]]
+    
+    
+    def test_concurrent_course_updates_leave_cache_consistent(self, client, clear_db):
+        """Test the cached course matches storage after racing updates."""
+        seed(users=0, courses=1)
+        calls = [(1, CourseCreate(id=1, title=f"Title {n}", code="C1", access=CourseAccess.PUBLIC_ACCESS))
+                 for n in range(200)]
+        hammer(CourseService.update_course, calls)
+    
+        stored = get_storage().courses.get(1)
+        assert client.get("/api/v1/courses/1").json()["title"] == stored.title
+    
+    
+    def test_listing_while_inserting(self, clear_db):
+        """Test keyset listings stay ordered and complete while rows are being added."""
+        seed(users=0, courses=0)
+        storage = get_storage()
+        done = threading.Event()
+    
+        def insert():
+            for i in range(1, 2001):
+                storage.users.add(UserRecord(id=i, name=f"User {i}", email=f"user{i}@example.com", role=UserRole.USER))
+            done.set()
+    
+        writer = threading.Thread(target=insert)
+        writer.start()
+        while not done.is_set():
+            ids = [user.id for user in storage.users.list(0, 500)]
+            # Rows are inserted in id order, so any page read mid-insert is a prefix
+            assert ids == list(range(1, len(ids) + 1))
+        writer.join()
+        assert storage.users.count() == 2000
+    
+    
+    def test_reads_while_deleting(self, clear_db):
+        """Test listings and code lookups never trip over a row deleted while they run."""
+        seed(users=2000, courses=2000)
+        storage = get_storage()
+        done = threading.Event()
+    
+        def delete():
+            for i in range(1, 2001):
+                storage.users.delete(i)
+                storage.courses.delete(i)
+            done.set()
+    
+        interval = sys.getswitchinterval()
+        # Switch threads as often as possible, so reads land between a delete's steps
+        sys.setswitchinterval(1e-6)
+        try:
+            writer = threading.Thread(target=delete)
+            writer.start()
+            checked = 0
+            while not done.is_set():
+                ids = [user.id for user in storage.users.list(0, 500)]
+                assert ids == sorted(ids)
+                found = storage.courses.get_by_code(f"C{checked % 2000 + 1}")
+                assert found is None or found.code == f"C{checked % 2000 + 1}"
+                assert all(course.access == CourseAccess.PUBLIC_ACCESS
+                           for course in storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS, 0, 500))
+                checked += 1
+            writer.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert storage.users.count() == 0 and storage.courses.count() == 0
+    
+    
+    def test_access_listing_while_moving(self, clear_db):
+        """Test a course moved out of an access listing never reappears in it, across index rebuilds."""
+        seed(users=0, courses=4000)
+        storage = get_storage()
+        moved = [0]
+        done = threading.Event()
+    
+        def move():
+            for i in range(1, 4001):
+                storage.courses.replace(CourseRecord(
+                    id=i, title=f"Course {i}", code=f"C{i}", access=CourseAccess.ADMIN_ONLY_ACCESS))
+                moved[0] = i
+            done.set()
+    
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            writer = threading.Thread(target=move)
+            writer.start()
+            while not done.is_set():
+                already_moved = moved[0]
+                listed = storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS, 0, 50)
+                assert all(course.id > already_moved for course in listed)
+            writer.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS) == []
+
+
+class TestAsyncRequestPath:
+    """Test cases for concurrent requests through the async handlers."""
+    
+    def test_concurrent_creates_get_unique_ids(self, clear_db):
+        """Test many in-flight POSTs all succeed with distinct ids."""
+    
+        async def create_all():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(
+                    client.post("/api/v1/users/", json={
+                        "id": i, "name": f"User {i}", "email": f"user{i}@example.com", "role": "student"})
+                    for i in range(1, 201)))
+    
+        responses = asyncio.run(create_all())
+    
+        assert {response.status_code for response in responses} == {201}
+        assert len({response.json()["id"] for response in responses}) == 200
+        assert get_storage().users.count() == 200
+    
+    
+    def test_concurrent_reads_and_enrollments(self, clear_db):
+        """Test reads interleaved with enrollments see only committed enrollments."""
+        seed(users=40, courses=1)
+    
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                writes = [client.post("/api/v1/enrollments/", json={
+                    "user_id": i, "course_id": 1, "role": "student"}) for i in range(1, 41)]
+                reads = [client.get(f"/api/v1/users/{i}/enrollments") for i in range(1, 41)]
+                return await asyncio.gather(*writes, *reads)
+    
+        responses = asyncio.run(run())
+    
+        assert [response.status_code for response in responses[:40]] == [201] * 40
+        assert all(response.status_code == 200 for response in responses[40:])
+        assert all(len(response.json()) <= 1 for response in responses[40:])
+        assert get_storage().enrollments.count() == 40
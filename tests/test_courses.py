@@ -1,5 +1,7 @@
 import pytest
 from fastapi import status
+from app.core.versions import versions
+from app.services.course import CourseService
 
 
 class TestCourseEndpoints:
@@ -207,3 +209,225 @@ class TestCourseEndpoints:
         }
         response = client.post("/api/v1/courses/", json=course_data)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    
+    def test_create_course_duplicate_code_fails(self, client, clear_db, test_course_data):
+        """Test course creation fails when the code is already taken."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        
+        duplicate = {**test_course_data, "title": "Python Again"}
+        response = client.post("/api/v1/courses/", json=duplicate)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    
+    def test_create_course_code_reusable_after_delete(self, client, clear_db, test_course_data):
+        """Test a deleted course releases its code."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.delete("/api/v1/courses/1")
+        
+        response = client.post("/api/v1/courses/", json=test_course_data)
+        assert response.status_code == status.HTTP_201_CREATED
+    
+    
+    def test_update_course_duplicate_code_fails(self, client, clear_db, test_course_data):
+        """Test updating a course to another course's code fails."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        other = {"id": 2, "title": "Java 101", "code": "JV101", "access": "public_access"}
+        client.post("/api/v1/courses/", json=other)
+        
+        response = client.put("/api/v1/courses/2", json={**other, "code": "PY101"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    
+    def test_get_course_by_code(self, client, clear_db, test_course_data):
+        """Test retrieving a course by its code."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        
+        response = client.get("/api/v1/courses/by-code/py101")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == 1
+        assert response.json()["code"] == "PY101"
+    
+    
+    def test_get_course_by_code_after_update(self, client, clear_db, test_course_data):
+        """Test the code lookup follows a course whose code was changed."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.put("/api/v1/courses/1", json={**test_course_data, "code": "PY102"})
+        
+        assert client.get("/api/v1/courses/by-code/PY101").status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/api/v1/courses/by-code/PY102").json()["id"] == 1
+    
+    
+    def test_get_course_by_code_not_found(self, client, clear_db):
+        """Test retrieving a course by an unknown code."""
+        response = client.get("/api/v1/courses/by-code/NOPE1")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
+    def test_get_courses_by_access_partitions(self, client, clear_db, test_course_data):
+        """Test access listings only contain courses of that access level, in id order."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.post("/api/v1/courses/", json={"id": 2, "title": "Secret", "code": "SEC1", "access": "admin_only_access"})
+        client.post("/api/v1/courses/", json={"id": 3, "title": "Java 101", "code": "JV101", "access": "public_access"})
+        
+        public = client.get("/api/v1/courses/access/public_access").json()
+        admin_only = client.get("/api/v1/courses/access/admin_only_access").json()
+        assert [c["id"] for c in public] == [1, 3]
+        assert [c["id"] for c in admin_only] == [2]
+        
+        page = client.get("/api/v1/courses/access/public_access", params={"skip": 1, "limit": 1}).json()
+        assert [c["id"] for c in page] == [3]
+    
+    
+    def test_update_course_moves_access_partition(self, client, clear_db, test_course_data):
+        """Test changing a course's access level moves it between listings."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.put("/api/v1/courses/1", json={**test_course_data, "access": "admin_only_access"})
+        
+        assert client.get("/api/v1/courses/access/public_access").json() == []
+        assert [c["id"] for c in client.get("/api/v1/courses/access/admin_only_access").json()] == [1]
+        
+        client.delete("/api/v1/courses/1")
+        assert client.get("/api/v1/courses/access/admin_only_access").json() == []
+    
+    
+    def test_get_courses_by_access_cursor_pages(self, client, clear_db, test_course_data):
+        """Test a cursor page skips courses that moved out of the listing and keeps its place."""
+        for code in ("PY101", "JV101", "RS101", "GO101"):
+            client.post("/api/v1/courses/", json={**test_course_data, "code": code})
+        
+        first = client.get("/api/v1/courses/access/public_access", params={"limit": 2})
+        assert [c["id"] for c in first.json()] == [1, 2]
+        
+        client.put("/api/v1/courses/3", json={**test_course_data, "code": "RS101", "access": "admin_only_access"})
+        # Without a limit a cursor still returns a bounded page
+        second = client.get("/api/v1/courses/access/public_access", params={"cursor": first.headers["X-Next-Cursor"]})
+        assert second.status_code == status.HTTP_200_OK
+        assert [c["id"] for c in second.json()] == [4]
+        assert "X-Next-Cursor" not in second.headers
+    
+    
+    def test_get_course_conditional(self, client, clear_db, test_course_data):
+        """Test If-None-Match gets a 304 until the course is updated or deleted."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        etag = client.get("/api/v1/courses/1").headers["ETag"]
+        
+        response = client.get("/api/v1/courses/1", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        
+        client.put("/api/v1/courses/1", json={**test_course_data, "title": "Python 102"})
+        response = client.get("/api/v1/courses/1", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["title"] == "Python 102"
+        assert response.headers["ETag"] != etag
+        
+        client.delete("/api/v1/courses/1")
+        response = client.get("/api/v1/courses/1", headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
+    def test_get_courses_by_access_conditional(self, client, clear_db, test_course_data):
+        """Test the access listings revalidate until any course changes."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        etag = client.get("/api/v1/courses/access/public_access").headers["ETag"]
+        
+        response = client.get("/api/v1/courses/access/public_access", headers={"If-None-Match": f'W/{etag}'})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        client.put("/api/v1/courses/catalog",
+                   json=[{"title": "Java 101", "code": "JV101", "access": "public_access"}])
+        response = client.get("/api/v1/courses/access/public_access", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert [c["code"] for c in response.json()] == ["PY101", "JV101"]
+    
+    
+    def test_course_reads_are_cached(self, client, clear_db, test_course_data):
+        """Test course reads are served from the cache until the course changes."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        before = client.get("/api/v1/courses/cache/stats").json()
+        
+        first = client.get("/api/v1/courses/1")
+        second = client.get("/api/v1/courses/1")
+        assert first.json() == second.json() == {**test_course_data, "id": 1, "capacity": None}
+        assert second.headers["ETag"] == first.headers["ETag"]
+        
+        client.put("/api/v1/courses/1", json={**test_course_data, "title": "Python 102"})
+        assert client.get("/api/v1/courses/1").json()["title"] == "Python 102"
+        
+        after = client.get("/api/v1/courses/cache/stats").json()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 2
+    
+    
+    def test_course_cache_invalidates_only_the_changed_listing(self, client, clear_db, test_course_data):
+        """Test a write to one access level leaves the other level's cached listing in place."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.get("/api/v1/courses/access/public_access")
+        client.get("/api/v1/courses/access/admin_only_access")
+        
+        client.post("/api/v1/courses/", json={"id": 2, "title": "Secret", "code": "SEC1", "access": "admin_only_access"})
+        before = client.get("/api/v1/courses/cache/stats").json()
+        assert [c["id"] for c in client.get("/api/v1/courses/access/public_access").json()] == [1]
+        assert [c["id"] for c in client.get("/api/v1/courses/access/admin_only_access").json()] == [2]
+        after = client.get("/api/v1/courses/cache/stats").json()
+        assert after["hits"] - before["hits"] == 1
+        assert after["invalidations"] - before["invalidations"] == 1
+    
+    
+    def test_cached_admin_only_course_stays_restricted(self, client, clear_db):
+        """Test a cached admin-only course is still refused to a student."""
+        client.post("/api/v1/courses/", json={"id": 1, "title": "Secret", "code": "SEC1", "access": "admin_only_access"})
+        CourseService.render_course(1)
+        
+        response = client.get("/api/v1/courses/1")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "ETag" not in response.headers
+    
+    
+    def test_conditional_get_course_missing_or_forbidden(self, client, clear_db):
+        """Test If-None-Match: * or a guessed tag cannot turn a 404 or a 403 into a 304."""
+        client.post("/api/v1/courses/", json={"id": 1, "title": "Secret", "code": "SEC1", "access": "admin_only_access"})
+        guessed = versions.etag(("course", 1))
+        
+        response = client.get("/api/v1/courses/9999", headers={"If-None-Match": "*"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        for tag in ("*", guessed):
+            response = client.get("/api/v1/courses/1", headers={"If-None-Match": tag})
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    
+    def test_upsert_catalog(self, client, clear_db, test_course_data):
+        """Test a catalog upsert creates new codes, updates changed ones and reports the diff."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.post("/api/v1/courses/", json={"id": 2, "title": "Java 101", "code": "JV101", "access": "public_access"})
+        
+        catalog = [
+            {"title": "Python 101", "code": "PY101", "access": "admin_only_access"},
+            {"title": "Java 101", "code": "JV101", "access": "public_access"},
+            {"title": "Rust 101", "code": "RS101", "access": "public_access"},
+        ]
+        response = client.put("/api/v1/courses/catalog", json=catalog)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "created": ["RS101"], "updated": ["PY101"], "access_changed": ["PY101"], "unchanged": 1}
+        
+        assert client.get("/api/v1/courses/by-code/RS101").json()["id"] == 3
+        assert [c["code"] for c in client.get("/api/v1/courses/access/public_access").json()] == ["JV101", "RS101"]
+        assert [c["id"] for c in client.get("/api/v1/courses/access/admin_only_access").json()] == [1]
+        
+        again = client.put("/api/v1/courses/catalog", json=catalog).json()
+        assert again == {"created": [], "updated": [], "access_changed": [], "unchanged": 3}
+    
+    
+    def test_upsert_catalog_repeated_code(self, client, clear_db):
+        """Test a catalog repeating a code is rejected without writing anything."""
+        catalog = [
+            {"title": "Python 101", "code": "PY101", "access": "public_access"},
+            {"title": "Python 102", "code": "PY101", "access": "public_access"},
+        ]
+        response = client.put("/api/v1/courses/catalog", json=catalog)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "PY101" in response.json()["detail"]
+        assert client.get("/api/v1/courses/access/public_access").json() == []
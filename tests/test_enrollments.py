@@ -1,5 +1,9 @@
+import json
 import pytest
 from fastapi import status
+from app.core.db import get_storage
+from app.services.enrollment import EnrollmentService
+from app.services.export import ExportService, ExportTable
 
 
 class TestEnrollmentEndpoints:
@@ -183,3 +187,261 @@ class TestEnrollmentEndpoints:
         # Validate response contains id
         assert "id" in data
         assert data["id"] > 0
+    
+    
+    def test_reenroll_after_deregistration(self, client, clear_db, test_user_data, test_course_data, test_enrollment_data):
+        """Test a deregistered user can enroll in the same course again."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        enrollment_id = client.post("/api/v1/enrollments/", json=test_enrollment_data).json()["id"]
+        
+        EnrollmentService.deregister_student_from_course(enrollment_id)
+        
+        response = client.post("/api/v1/enrollments/", json=test_enrollment_data)
+        assert response.status_code == status.HTTP_201_CREATED
+    
+    
+    def test_get_course_enrollments(self, client, clear_db, test_user_data, test_admin_data, test_course_data):
+        """Test listing the roster of a course."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/users/", json=test_admin_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        for user_id in (1, 2):
+            client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": 1, "role": "student"})
+        
+        response = client.get("/api/v1/courses/1/enrollments")
+        assert response.status_code == status.HTTP_200_OK
+        assert [e["user_id"] for e in response.json()] == [1, 2]
+        
+        page = client.get("/api/v1/courses/1/enrollments", params={"skip": 1, "limit": 1})
+        assert [e["user_id"] for e in page.json()] == [2]
+    
+    
+    def test_get_course_enrollments_cursor_pages(self, client, clear_db, test_course_data):
+        """Test walking a course roster with a cursor while students enroll."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        for i in range(4):
+            client.post("/api/v1/users/", json={"id": i + 1, "name": f"User {i}", "email": f"user{i}@example.com", "role": "student"})
+        for user_id in (1, 2, 3):
+            client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": 1, "role": "student"})
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+            response = client.get("/api/v1/courses/1/enrollments", params=params)
+            seen += [e["user_id"] for e in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            if len(seen) == 2:
+                client.post("/api/v1/enrollments/", json={"user_id": 4, "course_id": 1, "role": "student"})
+        assert seen == [1, 2, 3, 4]
+    
+    
+    def test_get_course_enrollments_course_not_found(self, client, clear_db):
+        """Test listing the roster of a non-existent course."""
+        response = client.get("/api/v1/courses/999/enrollments")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
+    def test_get_user_enrollments(self, client, clear_db, test_user_data, test_course_data, test_enrollment_data):
+        """Test listing the enrollments of a user, before and after deregistration."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        enrollment_id = client.post("/api/v1/enrollments/", json=test_enrollment_data).json()["id"]
+        
+        response = client.get("/api/v1/users/1/enrollments")
+        assert response.status_code == status.HTTP_200_OK
+        assert [e["id"] for e in response.json()] == [enrollment_id]
+        
+        EnrollmentService.admin_deregister_student_from_course(enrollment_id)
+        assert client.get("/api/v1/users/1/enrollments").json() == []
+    
+    
+    def test_get_user_enrollments_user_not_found(self, client, clear_db):
+        """Test listing the enrollments of a non-existent user."""
+        response = client.get("/api/v1/users/999/enrollments")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
+    def test_batch_enroll_reports_each_item(self, client, clear_db, test_user_data, test_admin_data, test_course_data):
+        """Test a batch creates what it can and reports 404 and 409 per item."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/users/", json=test_admin_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.post("/api/v1/enrollments/", json={"user_id": 1, "course_id": 1, "role": "student"})
+        
+        batch = [
+            {"user_id": 2, "course_id": 1, "role": "administrator"},
+            {"user_id": 1, "course_id": 1, "role": "student"},
+            {"user_id": 999, "course_id": 1, "role": "student"},
+            {"user_id": 2, "course_id": 999, "role": "student"},
+            {"user_id": 2, "course_id": 1, "role": "student"},
+        ]
+        response = client.post("/api/v1/enrollments/batch", json=batch)
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["created"], data["failed"]) == (1, 4)
+        assert [r["status_code"] for r in data["results"]] == [201, 409, 404, 404, 409]
+        assert [r["index"] for r in data["results"]] == [0, 1, 2, 3, 4]
+        assert data["results"][0]["enrollment"]["role"] == "administrator"
+        assert data["results"][2]["detail"] == "User not found"
+        assert data["results"][3]["detail"] == "Course not found"
+        assert [e["user_id"] for e in client.get("/api/v1/courses/1/enrollments").json()] == [1, 2]
+    
+    
+    def test_batch_enroll_invalid_item(self, client, clear_db):
+        """Test a batch with a malformed item is rejected as a whole."""
+        response = client.post("/api/v1/enrollments/batch", json=[{"user_id": 1, "course_id": 1}])
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    
+    def test_batch_enroll_too_large(self, client, clear_db, monkeypatch):
+        """Test a batch over the size limit is rejected."""
+        monkeypatch.setattr("app.services.enrollment.MAX_BATCH_SIZE", 2)
+        batch = [{"user_id": i, "course_id": 1, "role": "student"} for i in range(1, 4)]
+        response = client.post("/api/v1/enrollments/batch", json=batch)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    
+    def test_export_enrollments_page_by_page(self, client, clear_db, test_course_data):
+        """Test an export reads page by page and picks up rows added while it runs."""
+        client.post("/api/v1/courses/", json=test_course_data)
+        for i in range(1, 6):
+            client.post("/api/v1/users/", json={"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "role": "student"})
+        for user_id in (1, 2, 3):
+            client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": 1, "role": "student"})
+        
+        chunks = ExportService.export_table(ExportTable.ENROLLMENTS, page_size=2)
+        first = next(chunks)
+        assert first.count(b"\n") == 2
+        client.post("/api/v1/enrollments/", json={"user_id": 4, "course_id": 1, "role": "student"})
+        rows = [json.loads(line) for line in (first + b"".join(chunks)).splitlines()]
+        assert [row["user_id"] for row in rows] == [1, 2, 3, 4]
+        
+        response = client.get("/api/v1/enrollments/export")
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.text.splitlines()) == 4
+
+
+def create_students(client, count):
+    for i in range(1, count + 1):
+        client.post("/api/v1/users/", json={
+            "id": i, "name": f"Student {i}", "email": f"student{i}@example.com", "role": "student"})
+
+
+def enroll(client, user_id, course_id=1):
+    return client.post("/api/v1/enrollments/", json={"user_id": user_id, "course_id": course_id, "role": "student"})
+
+
+class TestCourseCapacity:
+    """Test cases for seat capacity and waitlists."""
+    
+    def test_full_course_waitlists_in_order(self, client, clear_db, test_course_data):
+        """Test enrollments past the capacity join the waitlist in arrival order."""
+        create_students(client, 4)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 2})
+        
+        assert [enroll(client, i).status_code for i in (1, 2)] == [201, 201]
+        third, fourth = enroll(client, 3), enroll(client, 4)
+        assert third.status_code == fourth.status_code == status.HTTP_202_ACCEPTED
+        assert [third.json()["position"], fourth.json()["position"]] == [1, 2]
+        assert third.json()["user_id"] == 3
+        
+        assert client.get("/api/v1/courses/1/seats").json() == {
+            "course_id": 1, "capacity": 2, "enrolled": 2, "available": 0, "waitlisted": 2}
+        waitlist = client.get("/api/v1/courses/1/waitlist").json()
+        assert [(entry["user_id"], entry["position"]) for entry in waitlist] == [(3, 1), (4, 2)]
+    
+    
+    def test_already_waitlisted(self, client, clear_db, test_course_data):
+        """Test joining a waitlist twice is rejected."""
+        create_students(client, 2)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 1})
+        enroll(client, 1)
+        enroll(client, 2)
+        
+        response = enroll(client, 2)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["detail"] == "User is already on the waitlist for this course"
+    
+    
+    def test_deregistration_promotes_head_of_waitlist(self, client, clear_db, test_course_data):
+        """Test a freed seat goes to the first user on the waitlist."""
+        create_students(client, 4)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 2})
+        first = enroll(client, 1).json()
+        enroll(client, 2)
+        enroll(client, 3)
+        entry = enroll(client, 4).json()
+        
+        response = client.delete(f"/api/v1/enrollments/{first['id']}")
+        assert response.status_code == status.HTTP_200_OK
+        assert [e["user_id"] for e in client.get("/api/v1/courses/1/enrollments").json()] == [2, 3]
+        assert [(e["user_id"], e["position"]) for e in client.get("/api/v1/courses/1/waitlist").json()] == [(4, 1)]
+        
+        assert client.delete(f"/api/v1/enrollments/waitlist/{entry['id']}").status_code == status.HTTP_200_OK
+        assert client.delete(f"/api/v1/enrollments/waitlist/{entry['id']}").status_code == status.HTTP_404_NOT_FOUND
+        assert client.get("/api/v1/courses/1/seats").json()["waitlisted"] == 0
+    
+    
+    def test_newcomer_does_not_jump_the_queue(self, client, clear_db, test_course_data):
+        """Test a seat freed while users wait is not taken by a new enrollment."""
+        create_students(client, 3)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 1})
+        enroll(client, 1)
+        enroll(client, 2)
+        # Freed directly in storage, so no promotion has run yet
+        get_storage().enrollments.delete(1)
+        
+        response = enroll(client, 3)
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        # User 2 was promoted as user 3 joined
+        assert response.json()["position"] == 1
+        assert [e["user_id"] for e in client.get("/api/v1/courses/1/enrollments").json()] == [2]
+        assert [e["user_id"] for e in client.get("/api/v1/courses/1/waitlist").json()] == [3]
+    
+    
+    def test_raising_capacity_promotes(self, client, clear_db, test_course_data):
+        """Test raising a course's capacity enrolls waiting users."""
+        create_students(client, 3)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 1})
+        for i in (1, 2, 3):
+            enroll(client, i)
+        
+        client.put("/api/v1/courses/1", json={**test_course_data, "capacity": 2})
+        assert client.get("/api/v1/courses/1/seats").json() == {
+            "course_id": 1, "capacity": 2, "enrolled": 2, "available": 0, "waitlisted": 1}
+        
+        client.put("/api/v1/courses/1", json=test_course_data)
+        assert [e["user_id"] for e in client.get("/api/v1/courses/1/enrollments").json()] == [1, 2, 3]
+    
+    
+    def test_deleting_course_drops_its_waitlist(self, client, clear_db, test_course_data):
+        """Test deleting a course removes its waitlist entries and leaves other queues alone."""
+        create_students(client, 3)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 1})
+        client.post("/api/v1/courses/", json={**test_course_data, "code": "OTHER", "capacity": 1})
+        for i in (1, 2, 3):
+            enroll(client, i)
+        client.post("/api/v1/enrollments/", json={"user_id": 1, "course_id": 2, "role": "student"})
+        entry = client.post("/api/v1/enrollments/", json={"user_id": 2, "course_id": 2, "role": "student"}).json()
+        
+        assert client.delete("/api/v1/courses/1").status_code == status.HTTP_204_NO_CONTENT
+        waitlist = get_storage().waitlist
+        assert waitlist.find(2, 1) is None and waitlist.find(3, 1) is None
+        assert waitlist.count_for_course(1) == 0
+        assert [e.id for e in waitlist.list_for_course(2)] == [entry["id"]]
+    
+    
+    def test_batch_enroll_waitlists_overflow(self, client, clear_db, test_course_data):
+        """Test a batch into a full course reports the overflow as waitlisted."""
+        create_students(client, 3)
+        client.post("/api/v1/courses/", json={**test_course_data, "capacity": 1})
+        
+        items = [{"user_id": i, "course_id": 1, "role": "student"} for i in (1, 2, 3, 2)]
+        data = client.post("/api/v1/enrollments/batch", json=items).json()
+        assert (data["created"], data["waitlisted"], data["failed"]) == (1, 2, 1)
+        assert [item["status_code"] for item in data["results"]] == [201, 202, 202, 409]
+        assert data["results"][2]["waitlist_entry"]["position"] == 2
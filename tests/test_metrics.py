@@ -0,0 +1,93 @@
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, metrics
+
+
+def series(text, name):
+    """The sample lines of one metric in a rendered exposition."""
+    return [line for line in text.splitlines() if line.startswith(name) and not line.startswith("#")]
+
+
+class TestMetricTypes:
+    """Test cases for the metric types and their text rendering."""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in every bucket at or above them, with sum and count."""
+        histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(("/a",), value)
+    
+        assert histogram.render() == [
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a",le="0.1"} 2',
+            'latency_seconds_bucket{route="/a",le="1.0"} 3',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+            'latency_seconds_sum{route="/a"} 3.65',
+            'latency_seconds_count{route="/a"} 4',
+        ]
+    
+    
+    def test_label_values_are_escaped(self):
+        """Test quotes, backslashes and newlines in label values cannot break the format."""
+        counter = Counter("calls_total", "Calls.", ("name",))
+        counter.inc(('say "hi"\\\n',))
+    
+        assert counter.render()[-1] == 'calls_total{name="say \\"hi\\"\\\\\\n"} 1'
+
+
+@pytest.mark.skipif(not settings.metrics_enabled, reason="Metrics are turned off (APP_METRICS=0)")
+class TestMetricsEndpoint:
+    """Test cases for request and service metrics served at /metrics."""
+    
+    def test_requests_are_labelled_by_route_template(self, client, clear_db, test_user_data):
+        """Test requests to different ids share one series per route and status."""
+        ok = ("GET", "/api/v1/users/{user_id}", 200)
+        missing = ("GET", "/api/v1/users/{user_id}", 404)
+        before = metrics.request_duration.count(ok), metrics.request_duration.count(missing)
+        client.post("/api/v1/users/", json=test_user_data)
+        client.get("/api/v1/users/1")
+        client.get("/api/v1/users/1")
+        client.get("/api/v1/users/99")
+    
+        assert metrics.request_duration.count(ok) - before[0] == 2
+        assert metrics.request_duration.count(missing) - before[1] == 1
+        text = client.get("/metrics").text
+        assert not any("/api/v1/users/99" in line for line in series(text, "http_request_duration_seconds"))
+    
+    
+    def test_unmatched_paths_share_one_series(self, client):
+        """Test requests to unknown paths do not create a series per path."""
+        before = metrics.request_duration.count(("GET", "unmatched", 404))
+        client.get("/no/such/path")
+        client.get("/another/unknown/path")
+    
+        assert metrics.request_duration.count(("GET", "unmatched", 404)) - before == 2
+    
+    
+    def test_service_calls_are_timed(self, client, clear_db, test_enrollment_data, populated_db):
+        """Test service methods record their duration, and raised errors separately."""
+        name = ("EnrollmentService.enroll_user_in_course",)
+        before = metrics.service_duration.count(name), metrics.service_exceptions.value(name)
+        client.post("/api/v1/enrollments/", json=test_enrollment_data)
+        client.post("/api/v1/enrollments/", json=test_enrollment_data)
+    
+        assert metrics.service_duration.count(name) - before[0] == 2
+        assert metrics.service_exceptions.value(name) - before[1] == 1
+    
+    
+    def test_exposition_format(self, client):
+        """Test /metrics is Prometheus text with the gauges and histograms declared."""
+        response = client.get("/metrics")
+    
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for name, kind in (("http_request_duration_seconds", "histogram"), ("http_requests_in_flight", "gauge"),
+                           ("threadpool_queue_depth", "gauge"), ("threadpool_busy_threads", "gauge"),
+                           ("service_call_duration_seconds", "histogram")):
+            assert f"# TYPE {name} {kind}" in text
+        # Only the scrape itself is in flight
+        assert series(text, "http_requests_in_flight") == ["http_requests_in_flight 1"]
+        assert int(series(text, "threadpool_max_threads")[0].split()[1]) > 0
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.main import app
+from app.services.user import UserService
+
+
+def profiled_client(store):
+    return TestClient(ProfilingMiddleware(app, store))
+
+
+def functions(path):
+    return {function for _, _, function in pstats.Stats(path).stats}
+
+
+class TestProfiling:
+    """Test cases for opt-in per-request profiling."""
+    
+    def test_header_with_token_profiles_the_request(self, clear_db, tmp_path, test_user_data):
+        """Test a request sending the token gets a profile id and a pstats file covering the service call."""
+        store = ProfileStore(str(tmp_path), token="s3cret")
+        response = profiled_client(store).post(
+            "/api/v1/users/", json=test_user_data, headers={"X-Profile": "s3cret"})
+    
+        assert response.status_code == 201
+        saved = store.get(response.headers["X-Profile-Id"])
+        assert (saved.method, saved.path, saved.status, saved.trigger) == ("POST", "/api/v1/users/", 201, "header")
+        assert os.path.exists(saved.file)
+        # Profiled in its worker thread and added to the request's profile
+        assert "create_user" in functions(saved.file)
+        assert saved.top and saved.hotspots
+    
+    
+    def test_profiled_writes_stay_off_the_event_loop(self, clear_db, tmp_path, test_user_data, monkeypatch):
+        """Test a profiled request still runs its writes in the threadpool."""
+        on_event_loop = []
+        create_user = UserService.create_user
+    
+        def create_user_off_loop(user_create):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(True)
+            except RuntimeError:
+                on_event_loop.append(False)
+            return create_user(user_create)
+    
+        monkeypatch.setattr(UserService, "create_user", staticmethod(create_user_off_loop))
+        store = ProfileStore(str(tmp_path), token="s3cret")
+        response = profiled_client(store).post(
+            "/api/v1/users/", json=test_user_data, headers={"X-Profile": "s3cret"})
+    
+        assert response.status_code == 201
+        assert on_event_loop == [False]
+        assert "create_user_off_loop" in functions(store.get(response.headers["X-Profile-Id"]).file)
+    
+    
+    def test_requests_without_the_token_are_not_profiled(self, clear_db, tmp_path):
+        """Test a missing or wrong token leaves the request alone."""
+        store = ProfileStore(str(tmp_path), token="s3cret")
+        client = profiled_client(store)
+    
+        assert "X-Profile-Id" not in client.get("/api/v1/users/").headers
+        assert "X-Profile-Id" not in client.get("/api/v1/users/", headers={"X-Profile": "guess"}).headers
+        assert store.recent() == []
+        assert os.listdir(tmp_path) == []
+    
+    
+    def test_sampling_and_retention(self, clear_db, tmp_path):
+        """Test sampled requests are profiled and only the newest profiles are kept."""
+        store = ProfileStore(str(tmp_path), sample_rate=1.0, keep=2)
+        client = profiled_client(store)
+        ids = [client.get("/api/v1/users/").headers["X-Profile-Id"] for _ in range(3)]
+    
+        assert [saved.id for saved in store.recent()] == ids[:0:-1]
+        assert {saved.trigger for saved in store.recent()} == {"sample"}
+        assert sorted(os.listdir(tmp_path)) == sorted(f"{profile_id}.prof" for profile_id in ids[1:])
+    
+    
+    def test_listing_and_download(self, client, clear_db, tmp_path, monkeypatch):
+        """Test the admin endpoints list recent profiles and serve their files."""
+        store = ProfileStore(str(tmp_path), sample_rate=1.0)
+        monkeypatch.setattr("app.router.profile.profiles", store)
+        profile_id = profiled_client(store).get("/api/v1/courses/access/public_access").headers["X-Profile-Id"]
+    
+        listed = client.get("/api/v1/profiles/").json()
+        assert [(p["id"], p["path"], p["status"]) for p in listed] == [
+            (profile_id, "/api/v1/courses/access/public_access", 200)]
+        assert {"function", "calls", "total_ms", "cumulative_ms"} <= listed[0]["top"][0].keys()
+        download = client.get(f"/api/v1/profiles/{profile_id}")
+        assert download.status_code == 200
+        assert download.content == (tmp_path / f"{profile_id}.prof").read_bytes()
+        assert client.get("/api/v1/profiles/0-0").status_code == 404
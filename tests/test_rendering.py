@@ -0,0 +1,62 @@
+import pytest
+
+from app.core import rendering
+from app.core.rendering import render_json
+from app.core.storage import CourseRecord, EnrollmentRecord, UserRecord, WaitlistRecord
+from app.schemas.course import Course, CourseAccess
+from app.schemas.enrollment import Enrollment, EnrollmentBatchItem, EnrollmentBatchResult, Enrollmentrole
+from app.schemas.user import User, UserRole
+from app.main import app
+
+
+def models():
+    enrollment = EnrollmentRecord(id=3, user_id=1, course_id=2, role=Enrollmentrole.STUDENT).to_model()
+    return [
+        UserRecord(id=1, name="Zoë Müller 名", email="zoe@example.com", role=UserRole.USER).to_model(),
+        CourseRecord(id=2, title="Python 101", code="PY101", access=CourseAccess.PUBLIC_ACCESS,
+                     capacity=None).to_model(),
+        enrollment,
+        WaitlistRecord(id=4, user_id=5, course_id=2, role=Enrollmentrole.STUDENT).to_model(1),
+        EnrollmentBatchResult(created=1, failed=0, results=[
+            EnrollmentBatchItem(index=0, status_code=201, enrollment=enrollment)]),
+    ]
+
+
+class TestRendering:
+    """Test cases for rendering response bodies without the response_model pass."""
+    
+    @pytest.mark.parametrize("encoder", ["default", "pydantic"])
+    def test_bodies_match_pydantic_serialization(self, encoder, monkeypatch):
+        """Test every encoder gives the bytes pydantic itself would, alone and in lists."""
+        if encoder == "pydantic":
+            monkeypatch.setattr(rendering, "orjson", None)
+        for model in models():
+            assert render_json(model) == model.model_dump_json().encode()
+        assert render_json(models()[:3]) == b"[" + b",".join(m.model_dump_json().encode() for m in models()[:3]) + b"]"
+    
+    
+    def test_routes_return_what_response_model_would(self, populated_db):
+        """Test fast-path bodies validate against the response models and keep their headers."""
+        client = populated_db
+        response = client.get("/api/v1/users/1")
+        assert response.headers["content-type"] == "application/json"
+        assert "ETag" in response.headers
+        assert User.model_validate(response.json()).model_dump(mode="json") == response.json()
+    
+        listing = client.get("/api/v1/users/?limit=1")
+        assert len(listing.json()) == 1 and "X-Next-Cursor" in listing.headers
+    
+        enrolled = client.post("/api/v1/enrollments/", json={"user_id": 1, "course_id": 1, "role": "student"})
+        assert enrolled.status_code == 201
+        assert Enrollment.model_validate(enrolled.json()).model_dump(mode="json") == enrolled.json()
+        course = client.get("/api/v1/courses/by-code/PY101").json()
+        assert Course.model_validate(course).model_dump(mode="json") == course
+    
+    
+    def test_response_models_still_documented(self):
+        """Test routes returning responses directly keep their response_model in the OpenAPI schema."""
+        paths = app.openapi()["paths"]
+        schema = paths["/api/v1/users/{user_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema == {"$ref": "#/components/schemas/User"}
+        created = paths["/api/v1/courses/"]["post"]["responses"]["201"]["content"]["application/json"]["schema"]
+        assert created == {"$ref": "#/components/schemas/Course"}
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.core.sequence import IdSequence
+
+
+class TestIdSequence:
+    """Test cases for the id allocator."""
+    
+    def test_next_id_is_monotonic(self):
+        """Test ids are handed out in increasing order starting at 1."""
+        sequence = IdSequence()
+        assert [sequence.next_id() for _ in range(3)] == [1, 2, 3]
+    
+    
+    def test_reserve_block(self):
+        """Test reserving a block returns consecutive ids and skips past them."""
+        sequence = IdSequence()
+        sequence.next_id()
+        assert list(sequence.reserve(3)) == [2, 3, 4]
+        assert sequence.next_id() == 5
+    
+    
+    def test_reserve_negative_count_fails(self):
+        """Test reserving a negative number of ids is rejected."""
+        with pytest.raises(ValueError):
+            IdSequence().reserve(-1)
+    
+    
+    def test_advance_past(self):
+        """Test advance_past never moves the sequence backwards."""
+        sequence = IdSequence()
+        sequence.advance_past(10)
+        sequence.advance_past(5)
+        assert sequence.next_id() == 11
+    
+    
+    def test_concurrent_allocation_is_unique(self):
+        """Test concurrent callers never receive the same id."""
+        sequence = IdSequence()
+        
+        def allocate(_):
+            ids = [sequence.next_id() for _ in range(500)]
+            ids.extend(sequence.reserve(50))
+            return ids
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = [i for ids in pool.map(allocate, range(16)) for i in ids]
+        
+        assert len(results) == len(set(results)) == 16 * 550
@@ -0,0 +1,194 @@
+import threading
+import zlib
+
+import pytest
+from app.core.config import Settings
+from app.core.storage import snapshot
+from app.core.storage import (
+    CourseRecord, EnrollmentRecord, MemoryStorage, UserRecord, WaitlistRecord, codec, create_storage, wal)
+from app.core.storage.snapshot import (
+    HEADER_V1, MAGIC, SnapshotError, SnapshotWriter, load_snapshot, write_snapshot)
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+
+def add_user(storage, user_id):
+    storage.users.add(UserRecord(id=user_id, name=f"User {user_id}", email=f"user{user_id}@example.com", role=UserRole.USER))
+
+
+def populate(storage):
+    for user_id in (1, 2, 3):
+        add_user(storage, user_id)
+    storage.users.delete(3)
+    storage.courses.add(CourseRecord(id=1, title="Python 101", code="PY101", access=CourseAccess.PUBLIC_ACCESS))
+    storage.courses.add(CourseRecord(id=2, title="Secret", code="SEC1", access=CourseAccess.ADMIN_ONLY_ACCESS, capacity=1))
+    storage.enrollments.add(EnrollmentRecord(id=1, user_id=1, course_id=1, role=Enrollmentrole.STUDENT))
+    storage.enrollments.add(EnrollmentRecord(id=2, user_id=2, course_id=1, role=Enrollmentrole.ADMIN))
+    storage.waitlist.add(WaitlistRecord(id=1, user_id=2, course_id=2, role=Enrollmentrole.STUDENT))
+    storage.waitlist.add(WaitlistRecord(id=2, user_id=1, course_id=2, role=Enrollmentrole.STUDENT))
+    for repository in (storage.users, storage.courses, storage.enrollments, storage.waitlist):
+        repository.ids.advance_past(3)
+
+
+class TestSnapshot:
+    """Test cases for memory backend snapshots."""
+    
+    def test_roundtrip(self, tmp_path):
+        """Test a loaded snapshot has the same records, indexes and sequences."""
+        path = str(tmp_path / "snap.bin")
+        storage = MemoryStorage()
+        populate(storage)
+        info = write_snapshot(storage, path)
+        assert (info.users, info.courses, info.enrollments, info.waitlist) == (2, 2, 2, 2)
+        
+        restored = MemoryStorage()
+        load_snapshot(restored, path)
+        
+        assert restored.users.list() == storage.users.list()
+        assert restored.courses.get_by_code("sec1").id == 2
+        assert [c.id for c in restored.courses.list_by_access(CourseAccess.PUBLIC_ACCESS)] == [1]
+        assert restored.enrollments.find(2, 1).role == Enrollmentrole.ADMIN
+        assert [e.id for e in restored.enrollments.list_for_user(1)] == [1]
+        assert restored.users.ids.next_id() == 4
+        assert restored.enrollments.ids.next_id() == 4
+        assert restored.courses.get(2).capacity == 1
+        assert [e.user_id for e in restored.waitlist.list_for_course(2)] == [2, 1]
+        assert restored.waitlist.ids.next_id() == 4
+    
+    
+    def test_corrupt_snapshot_rejected(self, tmp_path):
+        """Test a snapshot with a flipped byte fails its checksum."""
+        path = tmp_path / "snap.bin"
+        storage = MemoryStorage()
+        populate(storage)
+        write_snapshot(storage, str(path))
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        
+        with pytest.raises(SnapshotError):
+            load_snapshot(MemoryStorage(), str(path))
+    
+    
+    def test_not_a_snapshot(self, tmp_path):
+        """Test a file without the snapshot magic is rejected."""
+        path = tmp_path / "snap.bin"
+        path.write_bytes(b"x" * 200)
+        
+        with pytest.raises(SnapshotError):
+            load_snapshot(MemoryStorage(), str(path))
+    
+    
+    def test_startup_from_snapshot_and_log(self, tmp_path):
+        """Test startup restores the snapshot, then replays only the log written after it."""
+        settings = Settings(
+            wal_path=str(tmp_path / "wal.log"), wal_fsync="none",
+            snapshot_path=str(tmp_path / "snap.bin"), snapshot_interval_s=0)
+        storage = create_storage(settings)
+        populate(storage)
+        writer = SnapshotWriter(storage, settings.snapshot_path, interval=3600)
+        writer.stop(final_snapshot=True)
+        add_user(storage, 10)
+        storage.close()
+        
+        restored = create_storage(settings)
+        assert [u.id for u in restored.users.list()] == [1, 2, 10]
+        assert restored.enrollments.count() == 2
+        assert restored.users.ids.next_id() == 11
+        restored.close()
+    
+    
+    def test_rename_is_durable_before_log_compaction(self, tmp_path, monkeypatch):
+        """Test the snapshot's directory is fsynced after the rename and before the log is compacted."""
+        settings = Settings(
+            wal_path=str(tmp_path / "wal.log"), wal_fsync="none",
+            snapshot_path=str(tmp_path / "snap.bin"), snapshot_interval_s=0)
+        storage = create_storage(settings)
+        populate(storage)
+        steps = []
+        sync_directory, compact = wal.sync_directory, storage.log.compact
+        monkeypatch.setattr(wal, "sync_directory", lambda path: (steps.append(("sync", path)), sync_directory(path)))
+        monkeypatch.setattr(storage.log, "compact", lambda lsn: (steps.append(("compact", lsn)), compact(lsn)))
+        
+        writer = SnapshotWriter(storage, settings.snapshot_path, interval=3600)
+        writer.stop(final_snapshot=True)
+        assert steps[:2] == [("sync", settings.snapshot_path), ("compact", storage.log.lsn)]
+        storage.close()
+    
+    
+    def test_writer_survives_failed_snapshot(self, tmp_path, monkeypatch, caplog):
+        """Test a failing snapshot is logged and the writer keeps taking snapshots."""
+        storage = MemoryStorage()
+        populate(storage)
+        written = threading.Event()
+        
+        def write(storage, path):
+            if not caplog.records:
+                raise OSError(28, "No space left on device")
+            info = write_snapshot(storage, path)
+            written.set()
+            return info
+        
+        monkeypatch.setattr(snapshot, "write_snapshot", write)
+        writer = SnapshotWriter(storage, str(tmp_path / "snap.bin"), interval=0.001)
+        assert written.wait(5)
+        writer.stop(final_snapshot=False)
+        assert "No space left on device" in caplog.text
+    
+    
+    def test_snapshot_of_lazily_loaded_rows(self, tmp_path):
+        """Test rows still backed by a snapshot can be changed and snapshotted again."""
+        first, second = str(tmp_path / "first.bin"), str(tmp_path / "second.bin")
+        storage = MemoryStorage()
+        populate(storage)
+        write_snapshot(storage, first)
+        
+        loaded = MemoryStorage()
+        load_snapshot(loaded, first)
+        loaded.enrollments.delete(1)
+        loaded.enrollments.add(EnrollmentRecord(id=4, user_id=1, course_id=2, role=Enrollmentrole.STUDENT))
+        assert 1 not in loaded.enrollments.rows
+        assert [e.id for e in loaded.enrollments.list()] == [2, 4]
+        write_snapshot(loaded, second)
+        
+        restored = MemoryStorage()
+        load_snapshot(restored, second)
+        assert [e.id for e in restored.enrollments.list()] == [2, 4]
+        assert restored.enrollments.find(1, 2).id == 4
+        assert restored.enrollments.find(1, 1) is None
+    
+    
+    def test_columnar_roundtrip(self, tmp_path):
+        """Test a columnar enrollment table writes and loads the same snapshot as the dict table."""
+        path = str(tmp_path / "snap.bin")
+        storage = MemoryStorage(enrollment_table="columnar")
+        populate(storage)
+        storage.enrollments.delete(1)
+        write_snapshot(storage, path)
+        
+        for table in ("dict", "columnar"):
+            restored = MemoryStorage(enrollment_table=table)
+            load_snapshot(restored, path)
+            assert [e.id for e in restored.enrollments.list()] == [2]
+            assert restored.enrollments.find(2, 1).role == Enrollmentrole.ADMIN
+            assert restored.enrollments.ids.next_id() == 4
+    
+    
+    def test_loads_version_1(self, tmp_path):
+        """Test a snapshot written before capacities and waitlists still loads."""
+        path = tmp_path / "snap.bin"
+        course = CourseRecord(id=1, title="Python 101", code="PY101", access=CourseAccess.PUBLIC_ACCESS)
+        users = codec.encode_user(UserRecord(id=1, name="Ann", email="ann@example.com", role=UserRole.USER))
+        # Version 1 courses stop right before the capacity
+        courses = codec.encode_course(course)[:-codec.ID.size]
+        header = HEADER_V1.pack(MAGIC, 1, 0, 7, 2, 2, 1, 1, 1, 0, len(users), len(courses), 0,
+                                zlib.crc32(users + courses))
+        path.write_bytes(header + users + courses)
+        
+        restored = MemoryStorage()
+        info = load_snapshot(restored, str(path))
+        assert (info.lsn, info.users, info.courses, info.waitlist) == (7, 1, 1, 0)
+        assert restored.courses.get(1) == course
+        assert restored.users.get(1).name == "Ann"
+        assert restored.waitlist.ids.next_id() == 1
@@ -0,0 +1,374 @@
+import sqlite3
+
+import pytest
+from app.core.storage import (
+    ConflictError, CourseRecord, EnrollmentRecord, MemoryStorage, UserRecord, WaitlistRecord)
+from app.core.storage.memory import SortedIds
+from app.core.storage.sqlite import SQLiteStorage
+from app.schemas.course import Course, CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+
+@pytest.fixture(params=["memory", "columnar", "sqlite"])
+def storage(request, tmp_path):
+    """Each storage backend, empty."""
+    if request.param == "memory":
+        backend = MemoryStorage()
+    elif request.param == "columnar":
+        backend = MemoryStorage(enrollment_table="columnar")
+    else:
+        backend = SQLiteStorage(str(tmp_path / "test.db"), pool_size=2)
+    yield backend
+    backend.close()
+
+
+def make_user(user_id):
+    return UserRecord(id=user_id, name=f"User {user_id}", email=f"user{user_id}@example.com", role=UserRole.USER)
+
+
+def make_course(course_id, code, access=CourseAccess.PUBLIC_ACCESS, capacity=None):
+    return CourseRecord(id=course_id, title=f"Course {course_id}", code=code, access=access, capacity=capacity)
+
+
+def make_enrollment(enrollment_id, user_id, course_id):
+    return EnrollmentRecord(id=enrollment_id, user_id=user_id, course_id=course_id, role=Enrollmentrole.STUDENT)
+
+
+def make_entry(entry_id, user_id, course_id):
+    return WaitlistRecord(id=entry_id, user_id=user_id, course_id=course_id, role=Enrollmentrole.STUDENT)
+
+
+class TestStorageBackends:
+    """Contract tests every storage backend must pass."""
+    
+    def test_user_roundtrip(self, storage):
+        """Test adding, reading, listing and deleting users."""
+        for user_id in (1, 2, 3):
+            storage.users.add(make_user(user_id))
+        
+        assert storage.users.get(2) == make_user(2)
+        assert storage.users.exists(3)
+        assert [u.id for u in storage.users.list(skip=1, limit=1)] == [2]
+        assert storage.users.delete(2) == make_user(2)
+        assert storage.users.delete(2) is None
+        assert storage.users.count() == 2
+    
+    
+    def test_course_code_unique_case_insensitive(self, storage):
+        """Test course codes are unique and looked up case-insensitively."""
+        storage.courses.add(make_course(1, "PY101"))
+        
+        with pytest.raises(ConflictError):
+            storage.courses.add(make_course(2, "PY101"))
+        assert storage.courses.get_by_code("py101").id == 1
+    
+    
+    def test_course_replace_moves_code_and_access(self, storage):
+        """Test replacing a course updates the code lookup and access listings."""
+        storage.courses.add(make_course(1, "PY101"))
+        storage.courses.add(make_course(2, "JV101"))
+        
+        storage.courses.replace(make_course(1, "PY102", CourseAccess.ADMIN_ONLY_ACCESS))
+        
+        assert storage.courses.get_by_code("PY101") is None
+        assert storage.courses.get_by_code("PY102").id == 1
+        assert [c.id for c in storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS)] == [2]
+        assert [c.id for c in storage.courses.list_by_access(CourseAccess.ADMIN_ONLY_ACCESS)] == [1]
+        with pytest.raises(ConflictError):
+            storage.courses.replace(make_course(2, "PY102"))
+    
+    
+    def test_enrollment_indexes(self, storage):
+        """Test enrollment pair lookups and per-course/per-user listings."""
+        storage.enrollments.add(make_enrollment(1, 1, 1))
+        storage.enrollments.add(make_enrollment(2, 2, 1))
+        storage.enrollments.add(make_enrollment(3, 1, 2))
+        
+        with pytest.raises(ConflictError):
+            storage.enrollments.add(make_enrollment(4, 1, 1))
+        assert storage.enrollments.find(2, 1).id == 2
+        assert [e.id for e in storage.enrollments.list_for_course(1)] == [1, 2]
+        assert [e.id for e in storage.enrollments.list_for_user(1)] == [1, 3]
+        
+        storage.enrollments.delete(1)
+        assert storage.enrollments.find(1, 1) is None
+        assert [e.id for e in storage.enrollments.list_for_course(1)] == [2]
+    
+    
+    def test_batch_helpers(self, storage):
+        """Test existence checks by set and batched enrollment inserts."""
+        storage.users.add(make_user(1))
+        storage.users.add(make_user(2))
+        storage.courses.add(make_course(1, "PY101"))
+        assert storage.users.existing([1, 2, 3, 2]) == {1, 2}
+        assert storage.courses.existing([]) == set()
+        
+        storage.enrollments.add(make_enrollment(1, 1, 1))
+        added = storage.enrollments.add_many([
+            make_enrollment(2, 2, 1), make_enrollment(3, 1, 1), make_enrollment(4, 2, 1)])
+        assert added == [True, False, False]
+        assert [e.id for e in storage.enrollments.list_for_course(1)] == [1, 2]
+    
+    
+    def test_listings_resume_after_id(self, storage):
+        """Test keyset listings start past ``after`` even when that row is gone."""
+        for i in range(1, 6):
+            storage.users.add(make_user(i))
+            storage.courses.add(make_course(i, f"PY10{i}"))
+            storage.enrollments.add(make_enrollment(i, i, 1))
+        storage.users.delete(2)
+        storage.enrollments.delete(2)
+        
+        assert [u.id for u in storage.users.list(limit=2, after=2)] == [3, 4]
+        assert [u.id for u in storage.users.list(after=1)] == [3, 4, 5]
+        assert [c.id for c in storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS, 1, 2, after=2)] == [4, 5]
+        assert [e.id for e in storage.enrollments.list_for_course(1, limit=1, after=2)] == [3]
+        assert storage.enrollments.list_for_user(1, after=1) == []
+    
+    
+    def test_course_write_many_is_all_or_nothing(self, storage):
+        """Test batched course writes apply together and a clashing code rolls them all back."""
+        storage.courses.add(make_course(1, "PY101"))
+        storage.courses.write_many(
+            [make_course(2, "JV101")], [make_course(1, "PY101", CourseAccess.ADMIN_ONLY_ACCESS)])
+        assert set(storage.courses.get_many_by_code(["py101", "JV101", "RS101"])) == {"py101", "jv101"}
+        assert [c.id for c in storage.courses.list_by_access(CourseAccess.ADMIN_ONLY_ACCESS)] == [1]
+        
+        with pytest.raises(ConflictError):
+            storage.courses.write_many([make_course(3, "RS101"), make_course(4, "jv101")], [])
+        assert storage.courses.get(3) is None
+        assert storage.courses.count() == 2
+    
+    
+    def test_course_write_many_rejects_deleted_update(self, storage):
+        """Test updating a course deleted in the meantime conflicts and rolls back the whole batch."""
+        storage.courses.add(make_course(1, "PY101"))
+        storage.courses.add(make_course(2, "JV101"))
+        storage.courses.delete(2)
+        
+        with pytest.raises(ConflictError):
+            storage.courses.write_many(
+                [make_course(3, "RS101")],
+                [make_course(1, "PY101", CourseAccess.ADMIN_ONLY_ACCESS), make_course(2, "JV101")])
+        assert storage.courses.get(1).access == CourseAccess.PUBLIC_ACCESS
+        assert storage.courses.get(2) is None and storage.courses.get(3) is None
+    
+    
+    def test_course_capacity_roundtrip(self, storage):
+        """Test a course's capacity is stored, replaced and cleared."""
+        storage.courses.add(make_course(1, "PY101", capacity=30))
+        assert storage.courses.get(1).capacity == 30
+        
+        storage.courses.replace(make_course(1, "PY101"))
+        assert storage.courses.get_by_code("PY101").capacity is None
+    
+    
+    def test_add_within_capacity(self, storage):
+        """Test enrollments stop at the capacity and duplicates still conflict."""
+        assert storage.enrollments.add_within_capacity(make_enrollment(1, 1, 1), 2)
+        assert storage.enrollments.add_within_capacity(make_enrollment(2, 2, 1), 2)
+        assert not storage.enrollments.add_within_capacity(make_enrollment(3, 3, 1), 2)
+        assert storage.enrollments.add_within_capacity(make_enrollment(4, 3, 2), 2)
+        with pytest.raises(ConflictError):
+            storage.enrollments.add_within_capacity(make_enrollment(5, 3, 2), 2)
+        
+        assert storage.enrollments.count_for_course(1) == 2
+        assert storage.enrollments.get(3) is None
+    
+    
+    def test_waitlist_queue(self, storage):
+        """Test waitlist entries queue per course in id order."""
+        for entry in (make_entry(1, 1, 1), make_entry(2, 2, 1), make_entry(3, 1, 2), make_entry(4, 3, 1)):
+            storage.waitlist.add(entry)
+        with pytest.raises(ConflictError):
+            storage.waitlist.add(make_entry(5, 2, 1))
+        
+        assert storage.waitlist.first(1) == make_entry(1, 1, 1)
+        assert storage.waitlist.position(make_entry(4, 3, 1)) == 3
+        assert storage.waitlist.delete(1) == make_entry(1, 1, 1)
+        assert storage.waitlist.first(1).id == 2
+        assert storage.waitlist.position(make_entry(4, 3, 1)) == 2
+        assert [e.id for e in storage.waitlist.list_for_course(1, after=2)] == [4]
+        assert storage.waitlist.find(1, 2).id == 3
+        assert storage.waitlist.find(1, 1) is None
+        assert (storage.waitlist.count_for_course(1), storage.waitlist.count()) == (2, 3)
+        assert storage.waitlist.first(3) is None
+    
+    
+    def test_clear_restarts_sequences(self, storage):
+        """Test clearing empties every table and restarts ids at 1."""
+        storage.users.add(make_user(storage.users.ids.next_id()))
+        storage.waitlist.add(make_entry(storage.waitlist.ids.next_id(), 1, 1))
+        storage.clear()
+        
+        assert storage.users.count() == storage.waitlist.count() == 0
+        assert storage.users.ids.next_id() == 1
+        assert storage.waitlist.ids.next_id() == 1
+
+
+class TestSQLiteStorage:
+    """Behaviour specific to the SQLite backend."""
+    
+    def test_data_survives_reopen(self, tmp_path):
+        """Test records and sequences persist across reopening the database."""
+        path = str(tmp_path / "test.db")
+        first = SQLiteStorage(path)
+        first.users.add(make_user(first.users.ids.next_id()))
+        first.close()
+        
+        second = SQLiteStorage(path)
+        assert second.users.get(1) == make_user(1)
+        assert second.users.ids.next_id() > 1
+        second.close()
+    
+    
+    def test_sequences_unique_across_connections(self, tmp_path):
+        """Test two storages sharing one file never hand out the same id."""
+        path = str(tmp_path / "test.db")
+        first, second = SQLiteStorage(path), SQLiteStorage(path)
+        
+        ids = [first.users.ids.next_id() for _ in range(100)]
+        ids += [second.users.ids.next_id() for _ in range(100)]
+        ids += list(first.users.ids.reserve(100)) + list(second.users.ids.reserve(100))
+        
+        assert len(ids) == len(set(ids))
+        first.close()
+        second.close()
+    
+    
+    def test_database_from_before_capacities(self, tmp_path):
+        """Test opening a database whose courses table predates capacities adds the column."""
+        path = str(tmp_path / "test.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE courses (id INTEGER PRIMARY KEY, title TEXT NOT NULL, "
+                     "code TEXT NOT NULL, access TEXT NOT NULL)")
+        conn.execute("INSERT INTO courses VALUES (1, 'Course 1', 'PY101', 'public_access')")
+        conn.commit()
+        conn.close()
+        
+        storage = SQLiteStorage(path)
+        assert storage.courses.get(1) == make_course(1, "PY101")
+        storage.courses.add(make_course(2, "JV101", capacity=10))
+        assert storage.courses.get(2).capacity == 10
+        storage.close()
+
+
+class TestColumnarEnrollments:
+    """Test cases for the columnar enrollment table."""
+    
+    def test_out_of_order_ids(self):
+        """Test rows added out of id order are still found and listed in id order."""
+        storage = MemoryStorage(enrollment_table="columnar")
+        for enrollment_id in (5, 2, 9, 1):
+            storage.enrollments.add(EnrollmentRecord(id=enrollment_id, user_id=enrollment_id, course_id=1, role=Enrollmentrole.STUDENT))
+        assert [e.id for e in storage.enrollments.list()] == [1, 2, 5, 9]
+        assert [e.id for e in storage.enrollments.list_for_course(1)] == [1, 2, 5, 9]
+        assert storage.enrollments.find(9, 1).id == 9
+    
+    
+    def test_tombstones_are_compacted(self):
+        """Test deleted rows are hidden and eventually dropped from the columns."""
+        storage = MemoryStorage(enrollment_table="columnar")
+        enrollments = storage.enrollments
+        for enrollment_id in range(1, 3001):
+            enrollments.add(EnrollmentRecord(id=enrollment_id, user_id=enrollment_id, course_id=7, role=Enrollmentrole.STUDENT))
+        for enrollment_id in range(1, 3001, 2):
+            assert enrollments.delete(enrollment_id).id == enrollment_id
+        assert enrollments.delete(1) is None
+        assert enrollments.count() == 1500
+        assert len(enrollments.id_column) < 3000
+        assert enrollments.get(1) is None
+        assert enrollments.get(2).user_id == 2
+        assert [e.id for e in enrollments.list(skip=1, limit=2)] == [4, 6]
+        assert len(enrollments.list_for_course(7)) == 1500
+        enrollments.add(EnrollmentRecord(id=1, user_id=1, course_id=7, role=Enrollmentrole.ADMIN))
+        assert enrollments.find(1, 7).role == Enrollmentrole.ADMIN
+    
+    
+    def test_large_course_ids(self):
+        """Test pairs whose course id does not fit the packed key stay distinct."""
+        storage = MemoryStorage(enrollment_table="columnar")
+        storage.enrollments.add(EnrollmentRecord(id=1, user_id=1, course_id=2**40, role=Enrollmentrole.STUDENT))
+        storage.enrollments.add(EnrollmentRecord(id=2, user_id=1, course_id=1, role=Enrollmentrole.STUDENT))
+        assert storage.enrollments.find(1, 2**40).id == 1
+        assert storage.enrollments.find(1, 1).id == 2
+
+
+class TestSortedIds:
+    """Test cases for the tombstoned id lists behind memory-backend keyset scans."""
+    
+    def test_pages_skip_tombstones(self):
+        """Test offset and keyset pages count only live ids before and after compaction."""
+        ids = SortedIds(list(range(1, 101)))
+        for record_id in (2, 3, 50):
+            ids.remove(record_id)
+        assert ids.state[1] and len(ids) == 97
+        assert ids.page(0, 3) == [1, 4, 5]
+        assert ids.page(1, 2, after=1) == [5, 6]
+        assert ids.page(2, None, after=96) == [99, 100]
+        assert ids.page(0, 3, after=48) == [49, 51, 52]
+        assert list(ids)[:3] == [1, 4, 5]
+        
+        ids.add(3)
+        assert ids.page(0, 3) == [1, 3, 4]
+        for record_id in range(4, 20):
+            ids.remove(record_id)
+        # Rebuilt without tombstones once more than one id in TOMBSTONE_RATIO was dead
+        assert len(ids.state[0]) < 97 and len(ids.state[1]) < 16
+        assert len(ids) == 82
+        assert ids.page(0, 2, after=1) == [3, 20]
+    
+    
+    def test_page_across_rebuild(self):
+        """Test a page read while the list is rebuilt keeps to the ids and tombstones it started with."""
+        
+        class Rebuilding(list):
+            def __getitem__(self, key):
+                if not moved:
+                    # A writer moves 9 away mid-read, tipping the list into a rebuild
+                    moved.append(9)
+                    ids.remove(9)
+                return list.__getitem__(self, key)
+        
+        moved = []
+        ids = SortedIds(Rebuilding(range(1, 16)))
+        ids.remove(2)
+        assert ids.page(0, 4) == [1, 3, 4, 5]
+        assert moved and not ids.state[1]
+        assert ids.page(6, 2) == [8, 10]
+    
+    
+    def test_deleted_rows_leave_listings(self):
+        """Test deleted and re-added memory rows list in id order."""
+        storage = MemoryStorage()
+        for i in range(1, 21):
+            storage.users.add(make_user(i))
+            storage.courses.add(make_course(i, f"C{i}"))
+        storage.users.delete(5)
+        storage.courses.delete(5)
+        storage.users.add(make_user(5))
+        storage.courses.delete(6)
+        
+        assert [u.id for u in storage.users.list(limit=6)] == [1, 2, 3, 4, 5, 6]
+        assert [c.id for c in storage.courses.list_by_access(CourseAccess.PUBLIC_ACCESS, 0, 3, after=3)] == [4, 7, 8]
+        assert storage.courses.count() == 18
+
+
+class TestRecords:
+    """Test cases for the storage record types."""
+    
+    def test_to_model_matches_validated_model(self):
+        """Test a record converts to the same model validation would build, and back."""
+        record = make_course(1, "PY101")
+        model = record.to_model()
+        assert model == Course(id=1, title="Course 1", code="PY101", access=CourseAccess.PUBLIC_ACCESS)
+        assert model.model_dump() == {
+            "id": 1, "title": "Course 1", "code": "PY101", "access": CourseAccess.PUBLIC_ACCESS, "capacity": None}
+        assert CourseRecord.from_model(model) == record
+    
+    
+    def test_records_have_no_instance_dict(self):
+        """Test records are slotted."""
+        for record in (make_user(1), make_course(1, "PY101"), make_enrollment(1, 1, 1)):
+            assert not hasattr(record, "__dict__")
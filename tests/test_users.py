@@ -1,5 +1,12 @@
+import gzip
+import json
 import pytest
+from argparse import Namespace
 from fastapi import status
+from app.cli import export, import_users
+from app.core.streaming import LineSplitter, accepts_gzip
+from app.schemas.user import UserCreate
+from app.services.user import UserService
 
 
 class TestUserEndpoints:
@@ -70,6 +77,38 @@ class TestUserEndpoints:
         assert response.json() == []
     
     
+    def test_get_all_users_cursor_pages(self, client, clear_db):
+        """Test walking users with a cursor while users are added and removed."""
+        for i in range(5):
+            client.post("/api/v1/users/", json={"id": i + 1, "name": f"User {i}", "email": f"user{i}@example.com", "role": "student"})
+        
+        first = client.get("/api/v1/users/", params={"limit": 2})
+        assert [u["id"] for u in first.json()] == [1, 2]
+        cursor = first.headers["X-Next-Cursor"]
+        
+        # Deleting the last row seen and adding a new one must not shift the next page
+        client.delete("/api/v1/users/2")
+        client.post("/api/v1/users/", json={"id": 6, "name": "Late", "email": "late@example.com", "role": "student"})
+        second = client.get("/api/v1/users/", params={"limit": 2, "cursor": cursor})
+        assert [u["id"] for u in second.json()] == [3, 4]
+        
+        last = client.get("/api/v1/users/", params={"limit": 2, "cursor": second.headers["X-Next-Cursor"]})
+        assert [u["id"] for u in last.json()] == [5, 6]
+        assert "X-Next-Cursor" not in last.headers
+    
+    
+    def test_get_all_users_invalid_cursor(self, client, clear_db, test_user_data, test_course_data):
+        """Test a malformed cursor or one from another listing is rejected."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/courses/", json=test_course_data)
+        client.post("/api/v1/courses/", json={**test_course_data, "code": "JV101"})
+        course_cursor = client.get("/api/v1/courses/access/public_access", params={"limit": 1}).headers["X-Next-Cursor"]
+        
+        for cursor in ("not a cursor", course_cursor):
+            response = client.get("/api/v1/users/", params={"cursor": cursor})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    
     def test_get_user_by_id(self, client, clear_db, test_user_data):
         """Test retrieving a specific user."""
         # Create a user
@@ -114,6 +153,28 @@ class TestUserEndpoints:
         assert get_response.status_code == status.HTTP_404_NOT_FOUND
     
     
+    def test_get_user_conditional(self, client, clear_db, test_user_data):
+        """Test If-None-Match gets a 304 for an unchanged user and a 404 once it is deleted."""
+        client.post("/api/v1/users/", json=test_user_data)
+        etag = client.get("/api/v1/users/1").headers["ETag"]
+        
+        response = client.get("/api/v1/users/1", headers={"If-None-Match": f'"stale", {etag}'})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        
+        client.delete("/api/v1/users/1")
+        response = client.get("/api/v1/users/1", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
+    def test_get_user_conditional_wildcard(self, client, clear_db, test_user_data):
+        """Test If-None-Match: * only gets a 304 for a user that exists."""
+        client.post("/api/v1/users/", json=test_user_data)
+        
+        assert client.get("/api/v1/users/1", headers={"If-None-Match": "*"}).status_code == status.HTTP_304_NOT_MODIFIED
+        response = client.get("/api/v1/users/9999", headers={"If-None-Match": "*"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    
     def test_delete_user_not_found(self, client, clear_db):
         """Test deleting a non-existent user."""
         response = client.delete("/api/v1/users/999")
@@ -130,3 +191,145 @@ class TestUserEndpoints:
         }
         response = client.post("/api/v1/users/", json=invalid_user)
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    
+    def test_user_ids_not_reused_after_delete(self, client, clear_db, test_user_data, test_admin_data):
+        """Test creating a user after a delete does not overwrite an existing user."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/users/", json=test_admin_data)
+        client.delete("/api/v1/users/1")
+        
+        response = client.post("/api/v1/users/", json={**test_user_data, "email": "new@example.com"})
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["id"] == 3
+        assert client.get("/api/v1/users/2").json()["email"] == test_admin_data["email"]
+    
+    
+    def test_import_users_ndjson(self, client, clear_db):
+        """Test an NDJSON import creates valid lines and reports the rest with line numbers."""
+        body = "\n".join([
+            json.dumps({"name": "Ann", "email": "ann@example.com", "role": "student"}),
+            "",
+            "not json",
+            json.dumps({"name": "Bob", "email": "not-an-email", "role": "student"}),
+            json.dumps({"name": "Cy", "email": "cy@example.com", "role": "administrator"}),
+        ])
+        response = client.post("/api/v1/users/import", params={"chunk_size": 2}, content=body)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [(e["event"], e.get("line")) for e in events] == [
+            ("progress", None), ("error", 3), ("error", 4), ("progress", None), ("progress", None), ("done", None)]
+        assert "email" in events[2]["detail"]
+        assert events[-1] == {"event": "done", "lines": 5, "created": 2, "failed": 2}
+        assert [u["name"] for u in client.get("/api/v1/users/").json()] == ["Ann", "Cy"]
+    
+    
+    def test_import_users_csv(self, client, clear_db):
+        """Test a CSV import maps columns by header, in any order."""
+        body = "email,role,name\r\nann@example.com,student,\"Lee, Ann\"\r\nbob@example.com,nobody,Bob\r\n"
+        response = client.post("/api/v1/users/import", params={"format": "csv"}, content=body)
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[0]["event"] == "error" and events[0]["line"] == 3
+        assert events[-1] == {"event": "done", "lines": 3, "created": 1, "failed": 1}
+        assert client.get("/api/v1/users/1").json()["name"] == "Lee, Ann"
+    
+    
+    def test_import_users_csv_bad_header(self, client, clear_db):
+        """Test a CSV import without the required columns stops at the header."""
+        body = "name,mail\nAnn,ann@example.com\n"
+        response = client.post("/api/v1/users/import", params={"format": "csv"}, content=body)
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert "email, role" in events[0]["detail"]
+        assert events[-1]["created"] == 0
+        assert client.get("/api/v1/users/").json() == []
+    
+    
+    def test_import_users_cli(self, clear_db, tmp_path, capsys):
+        """Test the CLI importer streams a file into storage."""
+        path = tmp_path / "users.ndjson"
+        path.write_text("\n".join(
+            json.dumps({"name": f"User {i}", "email": f"user{i}@example.com", "role": "student"})
+            for i in range(1, 26)))
+        code = import_users(Namespace(path=str(path), format="ndjson", chunk_size=10, progress=False))
+        assert code == 0
+        assert json.loads(capsys.readouterr().out) == {"event": "done", "lines": 25, "created": 25, "failed": 0}
+    
+    
+    def test_export_users_ndjson(self, client, clear_db, test_user_data, test_admin_data):
+        """Test exporting users streams one JSON object per line, in id order."""
+        client.post("/api/v1/users/", json=test_user_data)
+        client.post("/api/v1/users/", json=test_admin_data)
+        
+        response = client.get("/api/v1/users/export", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "content-encoding" not in response.headers
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["email"] for row in rows] == [test_user_data["email"], test_admin_data["email"]]
+        assert rows[0] == {**test_user_data, "id": 1}
+    
+    
+    def test_export_users_gzip(self, client, clear_db, test_user_data):
+        """Test the export is gzipped when the client accepts it."""
+        client.post("/api/v1/users/", json=test_user_data)
+        
+        with client.stream("GET", "/api/v1/users/export", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            body = gzip.decompress(b"".join(response.iter_raw()))
+        assert json.loads(body)["name"] == test_user_data["name"]
+    
+    
+    def test_export_users_malformed_q_value(self, client, clear_db, test_user_data):
+        """Test a malformed q-value is ignored and the export is sent uncompressed."""
+        client.post("/api/v1/users/", json=test_user_data)
+        
+        response = client.get("/api/v1/users/export", headers={"Accept-Encoding": "gzip;q=x"})
+        assert response.status_code == status.HTTP_200_OK
+        assert "content-encoding" not in response.headers
+        assert json.loads(response.text)["name"] == test_user_data["name"]
+    
+    
+    def test_export_cli(self, clear_db, tmp_path, test_user_data):
+        """Test the CLI writes a gzipped export to a file."""
+        UserService.create_user(UserCreate(**test_user_data))
+        path = tmp_path / "users.ndjson.gz"
+        assert export(Namespace(table="users", output=str(path), gzip=True)) == 0
+        assert json.loads(gzip.decompress(path.read_bytes()))["id"] == 1
+
+
+class TestLineSplitter:
+    """Test cases for splitting streamed bodies into lines."""
+    
+    def test_lines_across_blocks(self):
+        """Test lines split across blocks are joined, and the last line needs no newline."""
+        splitter = LineSplitter(max_line_bytes=100)
+        assert splitter.feed(b"ab") == []
+        assert splitter.feed(b"c\nde\nf") == ["abc", "de"]
+        assert splitter.close() == ["f"]
+    
+    
+    def test_long_line_is_dropped(self):
+        """Test an over-long line comes back as None without being buffered."""
+        splitter = LineSplitter(max_line_bytes=4)
+        assert splitter.feed(b"abc") == []
+        assert splitter.feed(b"defgh") == []
+        assert splitter._buffer == bytearray()
+        assert splitter.feed(b"ij\nok\n") == [None, "ok"]
+    
+    
+    def test_accepts_gzip(self):
+        """Test Accept-Encoding parsing, including an explicit refusal."""
+        assert accepts_gzip("gzip, deflate, br")
+        assert accepts_gzip("br;q=1.0, *;q=0.5")
+        assert not accepts_gzip("gzip;q=0, identity")
+        assert not accepts_gzip(None)
+        assert not accepts_gzip("gzip;q=x")
+        assert not accepts_gzip("gzip;q=")
+    
+    
+    def test_accepts_gzip_explicit_beats_wildcard(self):
+        """Test an explicit gzip entry decides over a wildcard, wherever each appears."""
+        assert accepts_gzip("*;q=0, gzip")
+        assert not accepts_gzip("*, gzip;q=0")
+        assert not accepts_gzip("*;q=0, br")
@@ -0,0 +1,170 @@
+import pytest
+from app.core.storage import (
+    ConflictError, CourseRecord, EnrollmentRecord, MemoryStorage, UserRecord, WaitlistRecord, codec, wal)
+from app.core.storage.wal import FSYNC_POLICIES, open_log
+from app.schemas.course import CourseAccess
+from app.schemas.enrollment import Enrollmentrole
+from app.schemas.user import UserRole
+
+
+def populate(storage):
+    storage.users.add(UserRecord(id=1, name="Ann", email="ann@example.com", role=UserRole.USER))
+    storage.users.add(UserRecord(id=2, name="Bob", email="bob@example.com", role=UserRole.ADMIN))
+    storage.courses.add(CourseRecord(id=1, title="Python 101", code="PY101", access=CourseAccess.PUBLIC_ACCESS))
+    storage.courses.replace(CourseRecord(id=1, title="Python 102", code="PY102", access=CourseAccess.ADMIN_ONLY_ACCESS))
+    storage.enrollments.add(EnrollmentRecord(id=1, user_id=1, course_id=1, role=Enrollmentrole.STUDENT))
+    storage.enrollments.add(EnrollmentRecord(id=2, user_id=2, course_id=1, role=Enrollmentrole.ADMIN))
+    storage.enrollments.delete(1)
+    storage.users.delete(2)
+
+
+class TestWriteAheadLog:
+    """Test cases for the write-ahead log of the memory backend."""
+    
+    @pytest.mark.parametrize("fsync", FSYNC_POLICIES)
+    def test_replay_rebuilds_tables_and_indexes(self, tmp_path, fsync):
+        """Test replaying the log restores records, indexes and sequences."""
+        path = str(tmp_path / "wal.log")
+        storage = MemoryStorage()
+        open_log(storage, path, fsync, interval=0.001)
+        populate(storage)
+        storage.close()
+        
+        restored = MemoryStorage()
+        open_log(restored, path, fsync, interval=0.001)
+        
+        assert [u.id for u in restored.users.list()] == [1]
+        assert restored.courses.get_by_code("PY102").title == "Python 102"
+        assert restored.courses.get_by_code("PY101") is None
+        assert [c.id for c in restored.courses.list_by_access(CourseAccess.ADMIN_ONLY_ACCESS)] == [1]
+        assert restored.enrollments.find(1, 1) is None
+        assert [e.id for e in restored.enrollments.list_for_course(1)] == [2]
+        assert restored.enrollments.ids.next_id() == 3
+        with pytest.raises(ConflictError):
+            restored.enrollments.add(EnrollmentRecord(id=3, user_id=2, course_id=1, role=Enrollmentrole.STUDENT))
+        restored.close()
+    
+    
+    def test_replay_clear(self, tmp_path):
+        """Test a cleared store stays cleared after replay."""
+        path = str(tmp_path / "wal.log")
+        storage = MemoryStorage()
+        open_log(storage, path, "none")
+        populate(storage)
+        storage.clear()
+        storage.users.add(UserRecord(id=1, name="Cy", email="cy@example.com", role=UserRole.USER))
+        storage.close()
+        
+        restored = MemoryStorage()
+        open_log(restored, path, "none")
+        assert [u.name for u in restored.users.list()] == ["Cy"]
+        assert restored.courses.count() == 0
+        restored.close()
+    
+    
+    def test_torn_tail_is_discarded(self, tmp_path):
+        """Test a partially written last record is dropped and the log stays appendable."""
+        path = tmp_path / "wal.log"
+        storage = MemoryStorage()
+        open_log(storage, str(path), "none")
+        populate(storage)
+        storage.close()
+        intact = path.read_bytes()
+        path.write_bytes(intact + intact[:10])
+        
+        restored = MemoryStorage()
+        open_log(restored, str(path), "none")
+        assert path.read_bytes() == intact
+        restored.users.add(UserRecord(id=5, name="Di", email="di@example.com", role=UserRole.USER))
+        restored.close()
+        
+        again = MemoryStorage()
+        open_log(again, str(path), "none")
+        assert [u.id for u in again.users.list()] == [1, 5]
+        again.close()
+    
+    
+    def test_records_across_read_blocks(self, tmp_path, monkeypatch):
+        """Test records split across scan blocks replay, and a torn tail still ends the scan."""
+        path = tmp_path / "wal.log"
+        storage = MemoryStorage()
+        open_log(storage, str(path), "none")
+        populate(storage)
+        storage.close()
+        intact = path.read_bytes()
+        path.write_bytes(intact + intact[:20])
+        
+        monkeypatch.setattr(wal, "SCAN_BLOCK", 7)
+        ends = [end for _, _, end in wal.read_log(str(path))]
+        assert ends[-1] == len(intact) and len(ends) == 8
+        restored = MemoryStorage()
+        open_log(restored, str(path), "none")
+        assert [u.id for u in restored.users.list()] == [1]
+        assert [e.id for e in restored.enrollments.list()] == [2]
+        restored.close()
+    
+    
+    def test_replay_waitlist_and_capacity(self, tmp_path):
+        """Test course capacities and waitlist entries survive replay."""
+        path = str(tmp_path / "wal.log")
+        storage = MemoryStorage()
+        open_log(storage, path, "none")
+        storage.courses.add(CourseRecord(id=1, title="Python 101", code="PY101",
+                                         access=CourseAccess.PUBLIC_ACCESS, capacity=25))
+        for entry_id in (1, 2, 3):
+            storage.waitlist.add(WaitlistRecord(id=entry_id, user_id=entry_id, course_id=1, role=Enrollmentrole.STUDENT))
+        storage.waitlist.delete(1)
+        storage.close()
+        
+        restored = MemoryStorage()
+        open_log(restored, path, "none")
+        assert restored.courses.get(1).capacity == 25
+        assert [e.id for e in restored.waitlist.list_for_course(1)] == [2, 3]
+        assert restored.waitlist.ids.next_id() == 4
+        restored.close()
+    
+    
+    def test_replay_course_logged_before_capacities(self, tmp_path):
+        """Test a course record without a capacity, as logged by older versions, still replays."""
+        path = str(tmp_path / "wal.log")
+        course = CourseRecord(id=1, title="Python 101", code="PY101", access=CourseAccess.PUBLIC_ACCESS)
+        log = wal.WriteAheadLog(path, "none")
+        # The older encoding stops right before the capacity
+        log.append(wal.OP.pack(wal.OP_PUT, wal.TABLE_COURSES) + codec.encode_course(course)[:-codec.ID.size])
+        log.close()
+        
+        restored = MemoryStorage()
+        open_log(restored, path, "none")
+        assert restored.courses.get(1) == course
+        restored.close()
+    
+    
+    @pytest.mark.parametrize("fsync", FSYNC_POLICIES)
+    def test_compact_while_appending(self, tmp_path, monkeypatch, fsync):
+        """Test compaction keeps later records, including ones appended while it copies the log."""
+        path = str(tmp_path / "wal.log")
+        storage = MemoryStorage()
+        log = open_log(storage, path, fsync, interval=0.001)
+        populate(storage)
+        covered = log.lsn
+        storage.users.add(UserRecord(id=3, name="Cy", email="cy@example.com", role=UserRole.USER))
+        scan = wal._scan
+        
+        def scan_while_appending(path, limit=None):
+            for i, frame in enumerate(scan(path, limit)):
+                if i == 0:
+                    # Appends must not wait for the copy
+                    storage.users.add(UserRecord(id=4, name="Di", email="di@example.com", role=UserRole.USER))
+                yield frame
+        
+        monkeypatch.setattr(wal, "_scan", scan_while_appending)
+        log.compact(covered)
+        monkeypatch.undo()
+        storage.users.add(UserRecord(id=5, name="Ed", email="ed@example.com", role=UserRole.USER))
+        storage.close()
+        
+        assert [lsn for lsn, _, _ in wal.read_log(path)] == [covered + 1, covered + 2, covered + 3]
+        restored = MemoryStorage()
+        open_log(restored, path, fsync, interval=0.001)
+        assert [u.id for u in restored.users.list()] == [3, 4, 5]
+        restored.close()